@@ -28,6 +28,12 @@ resource "aws_api_gateway_resource" "prompt_item" {
   path_part   = "{id}"
 }
 
+resource "aws_api_gateway_resource" "prompts_search" {
+  rest_api_id = aws_api_gateway_rest_api.prompts.id
+  parent_id   = aws_api_gateway_resource.prompts_collection.id
+  path_part   = "search"
+}
+
 resource "aws_api_gateway_method" "prompts_get" {
   rest_api_id   = aws_api_gateway_rest_api.prompts.id
   resource_id   = aws_api_gateway_resource.prompts_collection.id
@@ -108,6 +114,22 @@ resource "aws_api_gateway_integration" "prompt_item_delete" {
   uri                     = aws_lambda_function.prompt_api.invoke_arn
 }
 
+resource "aws_api_gateway_method" "prompts_search_get" {
+  rest_api_id   = aws_api_gateway_rest_api.prompts.id
+  resource_id   = aws_api_gateway_resource.prompts_search.id
+  http_method   = "GET"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "prompts_search_get" {
+  rest_api_id             = aws_api_gateway_rest_api.prompts.id
+  resource_id             = aws_api_gateway_resource.prompts_search.id
+  http_method             = aws_api_gateway_method.prompts_search_get.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_function.prompt_api.invoke_arn
+}
+
 resource "aws_api_gateway_method" "prompts_options" {
   rest_api_id   = aws_api_gateway_rest_api.prompts.id
   resource_id   = aws_api_gateway_resource.prompts_collection.id
@@ -196,6 +218,50 @@ resource "aws_api_gateway_integration_response" "prompt_item_options" {
   }
 }
 
+resource "aws_api_gateway_method" "prompts_search_options" {
+  rest_api_id   = aws_api_gateway_rest_api.prompts.id
+  resource_id   = aws_api_gateway_resource.prompts_search.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "prompts_search_options" {
+  rest_api_id = aws_api_gateway_rest_api.prompts.id
+  resource_id = aws_api_gateway_resource.prompts_search.id
+  http_method = aws_api_gateway_method.prompts_search_options.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = jsonencode({ statusCode = 200 })
+  }
+}
+
+resource "aws_api_gateway_method_response" "prompts_search_options" {
+  rest_api_id = aws_api_gateway_rest_api.prompts.id
+  resource_id = aws_api_gateway_resource.prompts_search.id
+  http_method = aws_api_gateway_method.prompts_search_options.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "prompts_search_options" {
+  rest_api_id = aws_api_gateway_rest_api.prompts.id
+  resource_id = aws_api_gateway_resource.prompts_search.id
+  http_method = aws_api_gateway_method.prompts_search_options.http_method
+  status_code = aws_api_gateway_method_response.prompts_search_options.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,Authorization,X-Amz-Date,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'OPTIONS,GET'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'${var.cors_allow_origin}'"
+  }
+}
+
 resource "aws_api_gateway_gateway_response" "default_4xx" {
   rest_api_id   = aws_api_gateway_rest_api.prompts.id
   response_type = "DEFAULT_4XX"
@@ -230,6 +296,8 @@ resource "aws_api_gateway_deployment" "prompts" {
       aws_api_gateway_integration.prompt_item_delete.id,
       aws_api_gateway_integration.prompts_options.id,
       aws_api_gateway_integration.prompt_item_options.id,
+      aws_api_gateway_integration.prompts_search_get.id,
+      aws_api_gateway_integration.prompts_search_options.id,
       aws_api_gateway_gateway_response.default_4xx.id,
       aws_api_gateway_gateway_response.default_5xx.id,
     ]))
@@ -247,6 +315,8 @@ resource "aws_api_gateway_deployment" "prompts" {
     aws_api_gateway_integration.prompt_item_delete,
     aws_api_gateway_integration_response.prompts_options,
     aws_api_gateway_integration_response.prompt_item_options,
+    aws_api_gateway_integration.prompts_search_get,
+    aws_api_gateway_integration_response.prompts_search_options,
   ]
 }
 
@@ -3,6 +3,10 @@ resource "aws_dynamodb_table" "prompts" {
   billing_mode = "PAY_PER_REQUEST"
   hash_key     = "id"
 
+  # search_indexer（と stream モードの tag_index_processor）がこのストリームを読む
+  stream_enabled   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
+
   attribute {
     name = "id"
     type = "S"
@@ -41,6 +41,7 @@ resource "aws_iam_role_policy" "prompt_api_lambda_dynamodb" {
         Effect = "Allow"
         Action = [
           "dynamodb:GetItem",
+          "dynamodb:BatchGetItem",
           "dynamodb:PutItem",
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
@@ -53,4 +54,184 @@ resource "aws_iam_role_policy" "prompt_api_lambda_dynamodb" {
       }
     ]
   })
-}
\ No newline at end of file
+}
+
+resource "aws_iam_role" "tag_index_processor" {
+  count = var.tag_index_mode == "stream" ? 1 : 0
+
+  name = "${var.project_name}-prompts-tag-index-${var.environment}"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = "sts:AssumeRole"
+        Principal = {
+          Service = "lambda.amazonaws.com"
+        }
+      }
+    ]
+  })
+
+  tags = merge(
+    {
+      Name      = "${var.project_name}-prompts-tag-index-${var.environment}"
+      Component = "IAM"
+      Purpose   = "Tag index processor execution role"
+    },
+    var.additional_tags,
+  )
+}
+
+resource "aws_iam_role_policy_attachment" "tag_index_processor_logs" {
+  count = var.tag_index_mode == "stream" ? 1 : 0
+
+  role       = aws_iam_role.tag_index_processor[0].name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+}
+
+resource "aws_iam_role_policy" "tag_index_processor" {
+  count = var.tag_index_mode == "stream" ? 1 : 0
+
+  name = "${var.project_name}-prompts-tag-index-${var.environment}"
+  role = aws_iam_role.tag_index_processor[0].id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Sid    = "AllowPromptStreamRead"
+        Effect = "Allow"
+        Action = [
+          "dynamodb:DescribeStream",
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:ListStreams",
+        ]
+        Resource = aws_dynamodb_table.prompts.stream_arn
+      },
+      {
+        Sid    = "AllowTagIndexWrites"
+        Effect = "Allow"
+        Action = [
+          "dynamodb:BatchWriteItem",
+          "dynamodb:PutItem",
+          "dynamodb:DeleteItem",
+          "dynamodb:UpdateItem",
+        ]
+        Resource = aws_dynamodb_table.prompts.arn
+      },
+      {
+        Sid      = "AllowFailureDestination"
+        Effect   = "Allow"
+        Action   = "sqs:SendMessage"
+        Resource = aws_sqs_queue.tag_index_processor_dlq[0].arn
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy" "prompt_api_lambda_search_index" {
+  name = "${var.project_name}-prompts-search-read-${var.environment}"
+  role = aws_iam_role.prompt_api_lambda.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Sid      = "AllowSearchIndexRead"
+        Effect   = "Allow"
+        Action   = "s3:GetObject"
+        Resource = "${aws_s3_bucket.search_index.arn}/${local.search_index_key}"
+      },
+      {
+        # Lets a missing snapshot come back as 404 instead of 403
+        Sid      = "AllowSearchIndexList"
+        Effect   = "Allow"
+        Action   = "s3:ListBucket"
+        Resource = aws_s3_bucket.search_index.arn
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role" "search_indexer" {
+  name = "${var.project_name}-prompts-search-indexer-${var.environment}"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = "sts:AssumeRole"
+        Principal = {
+          Service = "lambda.amazonaws.com"
+        }
+      }
+    ]
+  })
+
+  tags = merge(
+    {
+      Name      = "${var.project_name}-prompts-search-indexer-${var.environment}"
+      Component = "IAM"
+      Purpose   = "Search indexer execution role"
+    },
+    var.additional_tags,
+  )
+}
+
+resource "aws_iam_role_policy_attachment" "search_indexer_logs" {
+  role       = aws_iam_role.search_indexer.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+}
+
+resource "aws_iam_role_policy" "search_indexer" {
+  name = "${var.project_name}-prompts-search-indexer-${var.environment}"
+  role = aws_iam_role.search_indexer.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Sid    = "AllowPromptStreamRead"
+        Effect = "Allow"
+        Action = [
+          "dynamodb:DescribeStream",
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:ListStreams",
+        ]
+        Resource = aws_dynamodb_table.prompts.stream_arn
+      },
+      {
+        Sid      = "AllowPromptScan"
+        Effect   = "Allow"
+        Action   = "dynamodb:Scan"
+        Resource = aws_dynamodb_table.prompts.arn
+      },
+      {
+        Sid    = "AllowSearchIndexReadWrite"
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+          "s3:PutObject",
+        ]
+        Resource = "${aws_s3_bucket.search_index.arn}/${local.search_index_key}"
+      },
+      {
+        Sid      = "AllowSearchIndexList"
+        Effect   = "Allow"
+        Action   = "s3:ListBucket"
+        Resource = aws_s3_bucket.search_index.arn
+      },
+      {
+        Sid      = "AllowFailureDestination"
+        Effect   = "Allow"
+        Action   = "sqs:SendMessage"
+        Resource = aws_sqs_queue.search_indexer_dlq.arn
+      }
+    ]
+  })
+}
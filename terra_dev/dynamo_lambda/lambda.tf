@@ -1,3 +1,7 @@
+locals {
+  search_index_key = "search/prompts-index.json.gz"
+}
+
 data "archive_file" "prompt_api" {
   type        = "zip"
   source_dir  = "${path.module}/src"
@@ -31,11 +35,22 @@ resource "aws_lambda_function" "prompt_api" {
 
   environment {
     variables = {
-      PROMPTS_TABLE_NAME        = aws_dynamodb_table.prompts.name
-      ACCESS_PATTERN_INDEX_NAME = "access_pattern_index"
-      DEFAULT_PROMPT_LIST_LIMIT = tostring(var.default_prompt_list_limit)
-      MAX_PROMPT_LIST_LIMIT     = tostring(var.max_prompt_list_limit)
-      CORS_ALLOW_ORIGIN         = var.cors_allow_origin
+      PROMPTS_TABLE_NAME             = aws_dynamodb_table.prompts.name
+      ACCESS_PATTERN_INDEX_NAME      = "access_pattern_index"
+      DEFAULT_PROMPT_LIST_LIMIT      = tostring(var.default_prompt_list_limit)
+      MAX_PROMPT_LIST_LIMIT          = tostring(var.max_prompt_list_limit)
+      MAX_TAGS_PER_PROMPT            = tostring(var.max_tags_per_prompt)
+      MAX_FILTER_TAGS                = tostring(var.max_filter_tags)
+      MAX_LIST_SCAN_ITEMS            = tostring(var.max_list_scan_items)
+      TAG_INDEX_MODE                 = var.tag_index_mode
+      PROMPT_LIST_SHARDS             = tostring(var.prompt_list_shards)
+      CACHE_TTL_SECONDS              = tostring(var.cache_ttl_seconds)
+      CACHE_GENERATION_CHECK_SECONDS = tostring(var.cache_generation_check_seconds)
+      CACHE_GENERATION_SHARDS        = tostring(var.cache_generation_shards)
+      SEARCH_INDEX_BUCKET            = aws_s3_bucket.search_index.id
+      SEARCH_INDEX_KEY               = local.search_index_key
+      SEARCH_INDEX_REFRESH_SECONDS   = tostring(var.search_index_refresh_seconds)
+      CORS_ALLOW_ORIGIN              = var.cors_allow_origin
     }
   }
 
@@ -49,4 +64,183 @@ resource "aws_lambda_function" "prompt_api" {
     },
     var.additional_tags,
   )
-}
\ No newline at end of file
+}
+
+resource "aws_cloudwatch_log_group" "tag_index_processor" {
+  count = var.tag_index_mode == "stream" ? 1 : 0
+
+  name              = "/aws/lambda/${var.project_name}-prompts-tag-index-${var.environment}"
+  retention_in_days = var.log_retention_days
+
+  tags = merge(
+    {
+      Name      = "${var.project_name}-prompts-tag-index-logs-${var.environment}"
+      Component = "Observability"
+      Purpose   = "Lambda logs"
+    },
+    var.additional_tags,
+  )
+}
+
+resource "aws_lambda_function" "tag_index_processor" {
+  count = var.tag_index_mode == "stream" ? 1 : 0
+
+  function_name = "${var.project_name}-prompts-tag-index-${var.environment}"
+  role          = aws_iam_role.tag_index_processor[0].arn
+  handler       = "tag_index_processor.lambda_handler"
+  runtime       = "python3.12"
+  timeout       = 60
+  memory_size   = var.lambda_memory_size
+
+  filename         = data.archive_file.prompt_api.output_path
+  source_code_hash = data.archive_file.prompt_api.output_base64sha256
+
+  environment {
+    variables = {
+      PROMPTS_TABLE_NAME      = aws_dynamodb_table.prompts.name
+      CACHE_GENERATION_SHARDS = tostring(var.cache_generation_shards)
+    }
+  }
+
+  depends_on = [aws_cloudwatch_log_group.tag_index_processor]
+
+  tags = merge(
+    {
+      Name      = "${var.project_name}-prompts-tag-index-${var.environment}"
+      Component = "Lambda"
+      Purpose   = "Tag index maintenance from DynamoDB Streams"
+    },
+    var.additional_tags,
+  )
+}
+
+resource "aws_sqs_queue" "tag_index_processor_dlq" {
+  count = var.tag_index_mode == "stream" ? 1 : 0
+
+  name                      = "${var.project_name}-prompts-tag-index-dlq-${var.environment}"
+  message_retention_seconds = 1209600
+
+  tags = merge(
+    {
+      Name      = "${var.project_name}-prompts-tag-index-dlq-${var.environment}"
+      Component = "Messaging"
+      Purpose   = "Stream batches the tag index processor gave up on"
+    },
+    var.additional_tags,
+  )
+}
+
+resource "aws_lambda_event_source_mapping" "tag_index_processor" {
+  count = var.tag_index_mode == "stream" ? 1 : 0
+
+  event_source_arn                   = aws_dynamodb_table.prompts.stream_arn
+  function_name                      = aws_lambda_function.tag_index_processor[0].arn
+  starting_position                  = "TRIM_HORIZON"
+  batch_size                         = var.tag_index_batch_size
+  maximum_batching_window_in_seconds = var.tag_index_batching_window_seconds
+  maximum_retry_attempts             = 10
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  # タグ索引アイテム自身の変更では起動しない（PROMPT アイテムの変更だけを渡す）
+  filter_criteria {
+    filter {
+      pattern = jsonencode({ dynamodb = { NewImage = { entity_type = { S = ["PROMPT"] } } } })
+    }
+
+    filter {
+      pattern = jsonencode({ dynamodb = { OldImage = { entity_type = { S = ["PROMPT"] } } } })
+    }
+  }
+
+  destination_config {
+    on_failure {
+      destination_arn = aws_sqs_queue.tag_index_processor_dlq[0].arn
+    }
+  }
+}
+
+resource "aws_cloudwatch_log_group" "search_indexer" {
+  name              = "/aws/lambda/${var.project_name}-prompts-search-indexer-${var.environment}"
+  retention_in_days = var.log_retention_days
+
+  tags = merge(
+    {
+      Name      = "${var.project_name}-prompts-search-indexer-logs-${var.environment}"
+      Component = "Observability"
+      Purpose   = "Lambda logs"
+    },
+    var.additional_tags,
+  )
+}
+
+resource "aws_lambda_function" "search_indexer" {
+  function_name = "${var.project_name}-prompts-search-indexer-${var.environment}"
+  role          = aws_iam_role.search_indexer.arn
+  handler       = "search_indexer.lambda_handler"
+  runtime       = "python3.12"
+  timeout       = 300
+  memory_size   = 512
+
+  filename         = data.archive_file.prompt_api.output_path
+  source_code_hash = data.archive_file.prompt_api.output_base64sha256
+
+  environment {
+    variables = {
+      PROMPTS_TABLE_NAME  = aws_dynamodb_table.prompts.name
+      SEARCH_INDEX_BUCKET = aws_s3_bucket.search_index.id
+      SEARCH_INDEX_KEY    = local.search_index_key
+    }
+  }
+
+  depends_on = [aws_cloudwatch_log_group.search_indexer]
+
+  tags = merge(
+    {
+      Name      = "${var.project_name}-prompts-search-indexer-${var.environment}"
+      Component = "Lambda"
+      Purpose   = "Full-text search index maintenance"
+    },
+    var.additional_tags,
+  )
+}
+
+resource "aws_sqs_queue" "search_indexer_dlq" {
+  name                      = "${var.project_name}-prompts-search-indexer-dlq-${var.environment}"
+  message_retention_seconds = 1209600
+
+  tags = merge(
+    {
+      Name      = "${var.project_name}-prompts-search-indexer-dlq-${var.environment}"
+      Component = "Messaging"
+      Purpose   = "Stream batches the search indexer gave up on"
+    },
+    var.additional_tags,
+  )
+}
+
+resource "aws_lambda_event_source_mapping" "search_indexer" {
+  event_source_arn                   = aws_dynamodb_table.prompts.stream_arn
+  function_name                      = aws_lambda_function.search_indexer.arn
+  starting_position                  = "TRIM_HORIZON"
+  batch_size                         = var.tag_index_batch_size
+  maximum_batching_window_in_seconds = var.tag_index_batching_window_seconds
+  maximum_retry_attempts             = 10
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  filter_criteria {
+    filter {
+      pattern = jsonencode({ dynamodb = { NewImage = { entity_type = { S = ["PROMPT"] } } } })
+    }
+
+    filter {
+      pattern = jsonencode({ dynamodb = { OldImage = { entity_type = { S = ["PROMPT"] } } } })
+    }
+  }
+
+  # 取り込めなかった変更は索引に反映されないため、DLQ を見て {"action": "rebuild"} で作り直す
+  destination_config {
+    on_failure {
+      destination_arn = aws_sqs_queue.search_indexer_dlq.arn
+    }
+  }
+}
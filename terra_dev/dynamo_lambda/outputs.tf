@@ -16,4 +16,29 @@ output "dynamodb_table_name" {
 output "lambda_function_name" {
   description = "Name of the prompt API Lambda function"
   value       = aws_lambda_function.prompt_api.function_name
-}
\ No newline at end of file
+}
+
+output "tag_index_processor_function_name" {
+  description = "Name of the tag index processor Lambda function (null when tag_index_mode is inline)"
+  value       = one(aws_lambda_function.tag_index_processor[*].function_name)
+}
+
+output "tag_index_dlq_url" {
+  description = "URL of the queue that receives stream batches the tag index processor gave up on"
+  value       = one(aws_sqs_queue.tag_index_processor_dlq[*].url)
+}
+
+output "search_index_bucket" {
+  description = "S3 bucket holding the full-text search index snapshot"
+  value       = aws_s3_bucket.search_index.id
+}
+
+output "search_indexer_dlq_url" {
+  description = "URL of the queue that receives stream batches the search indexer gave up on (rebuild the index after draining it)"
+  value       = aws_sqs_queue.search_indexer_dlq.url
+}
+
+output "search_indexer_function_name" {
+  description = "Name of the Lambda function that maintains the search index (invoke with {\"action\": \"rebuild\"} for a full rebuild)"
+  value       = aws_lambda_function.search_indexer.function_name
+}
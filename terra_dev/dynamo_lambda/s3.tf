@@ -0,0 +1,23 @@
+data "aws_caller_identity" "current" {}
+
+resource "aws_s3_bucket" "search_index" {
+  bucket = "${var.project_name}-prompts-search-${var.environment}-${data.aws_caller_identity.current.account_id}"
+
+  tags = merge(
+    {
+      Name      = "${var.project_name}-prompts-search-${var.environment}"
+      Component = "Storage"
+      Purpose   = "Full-text search index snapshots"
+    },
+    var.additional_tags,
+  )
+}
+
+resource "aws_s3_bucket_public_access_block" "search_index" {
+  bucket = aws_s3_bucket.search_index.id
+
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""Move existing prompts to the access_pk shards of the current PROMPT_LIST_SHARDS.
+
+Prompts only pick up a new shard when they are written, so after changing
+prompt_list_shards the ones written before the change would be missing from
+GET /prompts. Run this once after applying the new shard count:
+
+    PROMPTS_TABLE_NAME="$(terraform output -raw dynamodb_table_name)" \\
+    PROMPT_LIST_SHARDS=8 \\
+    python scripts/reshard_prompts.py [--dry-run]
+
+Only access_pk is rewritten (updated_at is left alone). Tag index items use
+TAG#<tag> partitions and are not affected.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from boto3.dynamodb.conditions import Attr  # noqa: E402
+
+from lambda_function import get_table, prompt_partition  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="only report how many prompts would move")
+    args = parser.parse_args()
+
+    table = get_table()
+    scan_kwargs = {
+        "FilterExpression": Attr("entity_type").eq("PROMPT"),
+        "ProjectionExpression": "id, access_pk",
+    }
+    scanned = moved = 0
+
+    while True:
+        page = table.scan(**scan_kwargs)
+        for item in page.get("Items", []):
+            scanned += 1
+            access_pk = prompt_partition(item["id"])
+            if item.get("access_pk") == access_pk:
+                continue
+
+            moved += 1
+            if not args.dry_run:
+                table.update_item(
+                    Key={"id": item["id"]},
+                    UpdateExpression="SET access_pk = :access_pk",
+                    ConditionExpression="attribute_exists(id)",
+                    ExpressionAttributeValues={":access_pk": access_pk},
+                )
+
+        if "LastEvaluatedKey" not in page:
+            break
+        scan_kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+    verb = "would move" if args.dry_run else "moved"
+    print(f"scanned {scanned} prompts, {verb} {moved}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,12 @@ import base64
 import json
 import logging
 import os
+import random
+import time
 import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime
 from typing import Any
 
@@ -12,16 +17,66 @@ import boto3
 from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
 
+import search_index
+
 
 LOGGER = logging.getLogger()
 LOGGER.setLevel(logging.INFO)
 
 DYNAMODB = boto3.resource("dynamodb")
+S3 = boto3.client("s3")
 TABLE_NAME = os.environ.get("PROMPTS_TABLE_NAME", "")
 INDEX_NAME = os.environ.get("ACCESS_PATTERN_INDEX_NAME", "access_pattern_index")
 DEFAULT_LIMIT = int(os.environ.get("DEFAULT_PROMPT_LIST_LIMIT", "20"))
 MAX_LIMIT = int(os.environ.get("MAX_PROMPT_LIST_LIMIT", "100"))
 CORS_ALLOW_ORIGIN = os.environ.get("CORS_ALLOW_ORIGIN", "*")
+MAX_TAGS_PER_PROMPT = int(os.environ.get("MAX_TAGS_PER_PROMPT", "40"))
+# "inline": the API writes the PROMPT_TAG items in the same transaction as the prompt.
+# "stream": the API writes only the PROMPT item and tag_index_processor maintains the
+# PROMPT_TAG items from the table stream, so tag lists are eventually consistent.
+TAG_INDEX_MODE = os.environ.get("TAG_INDEX_MODE", "inline")
+# Prompts are spread over PROMPT#0..N-1 so the collection is not one hot GSI partition.
+# With 1 shard every prompt keeps the original access_pk "PROMPT".
+PROMPT_LIST_SHARDS = int(os.environ.get("PROMPT_LIST_SHARDS", "1"))
+MAX_FILTER_TAGS = int(os.environ.get("MAX_FILTER_TAGS", "10"))
+# Upper bound on index items one list request walks through. A sparse intersection
+# (match=all) can otherwise page through whole tag partitions; when the bound is hit
+# the page comes back short (possibly empty) with a next_token that resumes the merge.
+MAX_LIST_SCAN_ITEMS = int(os.environ.get("MAX_LIST_SCAN_ITEMS", "1000"))
+# Read-through cache of prompt items and list pages kept across warm invocations.
+# CACHE_TTL_SECONDS=0 disables it.
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "1000"))
+# How often a warm container re-reads the generation counter that other containers bump on writes.
+CACHE_GENERATION_CHECK_SECONDS = float(os.environ.get("CACHE_GENERATION_CHECK_SECONDS", "2"))
+CACHE_GENERATION_ID = "META#CACHE_GENERATION"
+# Writes bump one of N generation counter items picked at random, so they do not all
+# land on one hot item; readers compare all N. With 1 shard the single original item is used.
+CACHE_GENERATION_SHARDS = int(os.environ.get("CACHE_GENERATION_SHARDS", "1"))
+# Full-text search reads an inverted index snapshot from S3 (maintained by search_indexer),
+# checking for a newer snapshot at most every SEARCH_INDEX_REFRESH_SECONDS.
+SEARCH_INDEX_BUCKET = os.environ.get("SEARCH_INDEX_BUCKET", "")
+SEARCH_INDEX_KEY = os.environ.get("SEARCH_INDEX_KEY", "search/prompts-index.json.gz")
+SEARCH_INDEX_REFRESH_SECONDS = float(os.environ.get("SEARCH_INDEX_REFRESH_SECONDS", "30"))
+
+# Attributes list pages read from the access pattern index: what to_summary_item uses plus the cursor keys.
+LIST_PROJECTION_FIELDS = (
+    "id",
+    "access_pk",
+    "access_sk",
+    "prompt_id",
+    "name",
+    "description",
+    "tags",
+    "target_model",
+    "version",
+    "is_active",
+    "created_at",
+    "updated_at",
+)
+
+# TransactWriteItems accepts at most 100 actions per call.
+TRANSACT_MAX_ITEMS = 100
 
 
 def lambda_handler(event: dict[str, Any], _context: Any) -> dict[str, Any]:
@@ -33,10 +88,14 @@ def lambda_handler(event: dict[str, Any], _context: Any) -> dict[str, Any]:
         path_parameters = (event or {}).get("pathParameters") or {}
         prompt_id = path_parameters.get("id")
         is_collection_route = resource == "/prompts" or path.endswith("/prompts") or path == "/prompts"
+        is_search_route = resource == "/prompts/search" or path.endswith("/prompts/search")
 
         if method == "OPTIONS":
             return response(200, {"message": "ok"})
 
+        if method == "GET" and is_search_route:
+            return search_prompts(event)
+
         if method == "GET" and not prompt_id and is_collection_route:
             return list_prompts(event)
 
@@ -57,6 +116,8 @@ def lambda_handler(event: dict[str, Any], _context: Any) -> dict[str, Any]:
         return response(400, {"message": str(error)})
     except NotFoundError as error:
         return response(404, {"message": str(error)})
+    except ConflictError as error:
+        return response(409, {"message": str(error)})
     except ClientError as error:
         LOGGER.exception("AWS client error")
         return response(500, {"message": "AWS operation failed", "detail": error.response.get("Error", {}).get("Message", "Unknown error")})
@@ -73,6 +134,10 @@ class NotFoundError(Exception):
     """Raised when the requested prompt cannot be found."""
 
 
+class ConflictError(Exception):
+    """Raised when the prompt was modified by another request."""
+
+
 def get_table():
     if not TABLE_NAME:
         raise RuntimeError("PROMPTS_TABLE_NAME environment variable is not set")
@@ -101,37 +166,308 @@ def response(status_code: int, body: dict[str, Any] | None = None) -> dict[str,
     }
 
 
+class TtlLruCache:
+    """LRU cache whose entries also expire ttl_seconds after they were stored."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation: dict[str, int] | None = None
+        self.generation_checked_at = float("-inf")
+        self._entries: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, key: Any) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Any, value: Any) -> None:
+        if not self.enabled:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+CACHE = TtlLruCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+
+def cache_generation_ids() -> list[str]:
+    if CACHE_GENERATION_SHARDS <= 1:
+        return [CACHE_GENERATION_ID]
+    return [f"{CACHE_GENERATION_ID}#{shard}" for shard in range(CACHE_GENERATION_SHARDS)]
+
+
+def sync_cache_generation() -> None:
+    """Drop the cache when another container has written since the last check.
+
+    The generation items are read at most once every CACHE_GENERATION_CHECK_SECONDS,
+    which bounds how long a write elsewhere can stay invisible here. When they
+    cannot be read, the cache is kept and entries still expire after CACHE_TTL_SECONDS.
+    """
+    if not CACHE.enabled or time.monotonic() - CACHE.generation_checked_at < CACHE_GENERATION_CHECK_SECONDS:
+        return
+
+    table = get_table()
+    try:
+        result = DYNAMODB.batch_get_item(
+            RequestItems={
+                table.name: {
+                    "Keys": [{"id": generation_id} for generation_id in cache_generation_ids()],
+                    "ProjectionExpression": "id, generation",
+                }
+            }
+        )
+    except ClientError:
+        LOGGER.exception("Failed to read the cache generation")
+        return
+    if result.get("UnprocessedKeys"):
+        return
+
+    generation = {item["id"]: int(item.get("generation", 0)) for item in result["Responses"].get(table.name, [])}
+    if generation != CACHE.generation:
+        CACHE.clear()
+        CACHE.generation = generation
+    CACHE.generation_checked_at = time.monotonic()
+
+
+def bump_cache_generation() -> None:
+    """Invalidate the cache in this container right away and in the others on their next check.
+
+    Runs after the write has been committed, so a failure is logged rather than
+    turned into an error response (a client retrying a successful create would
+    duplicate the prompt); other containers then see the change once their
+    entries expire after CACHE_TTL_SECONDS.
+    """
+    CACHE.clear()
+    generation_id = random.choice(cache_generation_ids())
+    try:
+        result = get_table().update_item(
+            Key={"id": generation_id},
+            UpdateExpression="ADD generation :one SET entity_type = :entity_type",
+            ExpressionAttributeValues={":one": 1, ":entity_type": "CACHE_GENERATION"},
+            ReturnValues="UPDATED_NEW",
+        )
+    except ClientError:
+        LOGGER.exception("Failed to bump the cache generation")
+        return
+
+    if CACHE.generation is not None:
+        # The other counters are compared on the next check as usual.
+        CACHE.generation[generation_id] = int(result["Attributes"]["generation"])
+
+
 def list_prompts(event: dict[str, Any]) -> dict[str, Any]:
     query = event.get("queryStringParameters") or {}
-    tag = normalize_tag(query.get("tag")) if query.get("tag") else None
+    tags = parse_filter_tags(query.get("tag"), query.get("tags"))
+    match = parse_match(query.get("match"))
     limit = parse_limit(query.get("limit"))
-    exclusive_start_key = decode_next_token(query.get("next_token"))
 
-    params: dict[str, Any] = {
-        "IndexName": INDEX_NAME,
-        "KeyConditionExpression": Key("access_pk").eq(f"TAG#{tag}" if tag else "PROMPT"),
-        "Limit": limit,
-        "ScanIndexForward": False,
+    sync_cache_generation()
+    cache_key = ("list", tuple(tags), match, limit, query.get("next_token") or None)
+    body = CACHE.get(cache_key)
+    if body is None:
+        body = read_prompt_list(tags, match, limit, query.get("next_token"))
+        CACHE.put(cache_key, body)
+
+    return response(200, body)
+
+
+def read_prompt_list(tags: list[str], match: str, limit: int, next_token: str | None) -> dict[str, Any]:
+    """Read one page of prompts, optionally restricted to prompts carrying all / any of tags.
+
+    The shards of the collection never overlap, so listing everything is the
+    "any" merge over PROMPT#0..N-1.
+    """
+    cursors = decode_next_token(next_token) or {}
+
+    access_pks = [f"TAG#{tag}" for tag in tags] if tags else prompt_list_partitions()
+    if not tags:
+        match = "any"
+    if set(cursors) - set(access_pks) or not all(cursor is None or isinstance(cursor, dict) for cursor in cursors.values()):
+        raise BadRequestError("next_token is invalid")
+
+    if match == "all" and any(cursor is None for cursor in cursors.values()):
+        # One of the tags ran out on an earlier page, so nothing more can match.
+        return {"items": [], "count": 0, "next_token": None}
+
+    # An intersection may have to skip many items per match, so every tag reads full pages.
+    page_size = limit if len(access_pks) == 1 or match == "all" else min(limit, 2 * -(-limit // len(access_pks)))
+    readers = [
+        PartitionReader(access_pk, cursors.get(access_pk, {}), page_size)
+        for access_pk in access_pks
+        if cursors.get(access_pk, {}) is not None
+    ]
+    merged = merge_partitions(readers, limit, match, MAX_LIST_SCAN_ITEMS)
+    items = [to_summary_item(item) for item in merged]
+
+    next_cursors = {reader.access_pk: reader.cursor() for reader in readers}
+    done = any if match == "all" else all
+    if done(cursor is None for cursor in next_cursors.values()):
+        next_token = None
+    else:
+        # Partitions finished on an earlier page stay finished.
+        next_token = encode_next_token({access_pk: next_cursors.get(access_pk) for access_pk in access_pks})
+
+    return {
+        "items": items,
+        "count": len(items),
+        "next_token": next_token,
     }
 
-    if exclusive_start_key:
-        params["ExclusiveStartKey"] = exclusive_start_key
 
-    result = get_table().query(**params)
-    items = [to_summary_item(item) for item in result.get("Items", [])]
+class PartitionReader:
+    """Reads one access_pk partition of the access pattern index, newest first, a page at a time.
+
+    start_key is the ExclusiveStartKey to resume from ({} to start from the top).
+    """
+
+    def __init__(self, access_pk: str, start_key: dict[str, Any], page_size: int):
+        self.access_pk = access_pk
+        self.page_size = page_size
+        self.buffer: list[dict[str, Any]] = []
+        self.exhausted = False
+        self._next_start_key = start_key
+        self._position = start_key
+
+    def fetch(self) -> None:
+        params: dict[str, Any] = {
+            "TableName": get_table().name,
+            "IndexName": INDEX_NAME,
+            "KeyConditionExpression": Key("access_pk").eq(self.access_pk),
+            "Limit": self.page_size,
+            "ScanIndexForward": False,
+            "ProjectionExpression": ", ".join(f"#{field}" for field in LIST_PROJECTION_FIELDS),
+            "ExpressionAttributeNames": {f"#{field}": field for field in LIST_PROJECTION_FIELDS},
+        }
+        if self._next_start_key:
+            params["ExclusiveStartKey"] = self._next_start_key
+
+        result = DYNAMODB.meta.client.query(**params)
+        self.buffer.extend(result.get("Items", []))
+        self._next_start_key = result.get("LastEvaluatedKey")
+        self.exhausted = not self._next_start_key
+
+    def peek(self) -> dict[str, Any] | None:
+        while not self.buffer and not self.exhausted:
+            self.fetch()
+        return self.buffer[0] if self.buffer else None
+
+    def pop(self) -> dict[str, Any]:
+        item = self.buffer.pop(0)
+        self._position = {"id": item["id"], "access_pk": item["access_pk"], "access_sk": item["access_sk"]}
+        return item
+
+    def cursor(self) -> dict[str, Any] | None:
+        """ExclusiveStartKey right after the last item taken, or None once the partition is done."""
+        if not self.buffer and self.exhausted:
+            return None
+        return self._position
+
+
+def merge_partitions(readers: list[PartitionReader], limit: int, match: str, scan_limit: int) -> list[dict[str, Any]]:
+    """Streaming k-way merge of the partitions by access_sk, descending, up to limit items.
+
+    Every index item of a prompt carries the prompt's access_sk, so equal heads
+    are the same prompt. "any" emits each access_sk once (union); "all" emits
+    it only when every partition has it (intersection), dropping heads newer
+    than the oldest head since the other partitions have already passed them.
+
+    The first page of every partition is fetched concurrently; later pages are
+    only fetched for a partition whose buffered items have all been taken, and
+    the merge stops as soon as limit items are found or scan_limit items have
+    been taken from the partitions; the readers' cursors resume it either way.
+    """
+    if len(readers) > 1:
+        with ThreadPoolExecutor(max_workers=len(readers)) as executor:
+            list(executor.map(PartitionReader.fetch, readers))
+
+    merged: list[dict[str, Any]] = []
+    scanned = 0
+    while len(merged) < limit and scanned < scan_limit:
+        heads = [(item["access_sk"], reader) for reader in readers if (item := reader.peek()) is not None]
+        if not heads or (match == "all" and len(heads) < len(readers)):
+            break
+
+        if match == "all":
+            oldest = min(access_sk for access_sk, _ in heads)
+            if any(access_sk != oldest for access_sk, _ in heads):
+                for access_sk, reader in heads:
+                    if access_sk != oldest:
+                        reader.pop()
+                        scanned += 1
+                continue
+            newest = oldest
+        else:
+            newest = max(access_sk for access_sk, _ in heads)
+
+        items = [reader.pop() for access_sk, reader in heads if access_sk == newest]
+        scanned += len(items)
+        merged.append(items[0])
+
+    return merged
+
+
+class LoadedSearchIndex:
+    """The search snapshot held in memory by a warm container."""
+
+    def __init__(self):
+        self.snapshot: dict[str, Any] | None = None
+        self.etag: str | None = None
+        self.checked_at = float("-inf")
+
+    def current(self) -> dict[str, Any]:
+        if self.snapshot is not None and time.monotonic() - self.checked_at < SEARCH_INDEX_REFRESH_SECONDS:
+            return self.snapshot
+
+        if not SEARCH_INDEX_BUCKET:
+            raise RuntimeError("SEARCH_INDEX_BUCKET environment variable is not set")
+
+        if self.snapshot is None or self.latest_etag() != self.etag:
+            self.snapshot, self.etag = search_index.load_snapshot(S3, SEARCH_INDEX_BUCKET, SEARCH_INDEX_KEY)
+        self.checked_at = time.monotonic()
+        return self.snapshot
+
+    def latest_etag(self) -> str | None:
+        try:
+            return S3.head_object(Bucket=SEARCH_INDEX_BUCKET, Key=SEARCH_INDEX_KEY)["ETag"]
+        except ClientError as error:
+            if error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+
+
+SEARCH_INDEX = LoadedSearchIndex()
+
+
+def search_prompts(event: dict[str, Any]) -> dict[str, Any]:
+    query = event.get("queryStringParameters") or {}
+    text = require_non_empty_string(query.get("q"), "q")
+    limit = parse_limit(query.get("limit"))
 
-    return response(
-        200,
-        {
-          "items": items,
-          "count": len(items),
-          "next_token": encode_next_token(result.get("LastEvaluatedKey")),
-        },
-    )
+    items, total = search_index.search(SEARCH_INDEX.current(), text, limit)
+    return response(200, {"items": items, "count": len(items), "total": total})
 
 
 def get_prompt(prompt_id: str) -> dict[str, Any]:
-    item = load_prompt(prompt_id)
+    sync_cache_generation()
+    item = CACHE.get(("prompt", prompt_id))
+    if item is None:
+        item = load_prompt(prompt_id)
+        CACHE.put(("prompt", prompt_id), item)
     return response(200, {"item": to_public_prompt_item(item)})
 
 
@@ -139,16 +475,16 @@ def create_prompt(event: dict[str, Any]) -> dict[str, Any]:
     payload = parse_json_body(event)
     prompt_id = str(uuid.uuid4())
     now = current_timestamp()
-    item = build_prompt_item(prompt_id=prompt_id, payload=payload, created_at=now, updated_at=now)
+    item = build_prompt_item(prompt_id=prompt_id, payload=payload, created_at=now, updated_at=now, revision=1)
 
-    table = get_table()
-    table.put_item(
-        Item=item,
-        ConditionExpression="attribute_not_exists(id)",
-    )
-
-    for tag_item in build_tag_items(item):
-        table.put_item(Item=tag_item)
+    put = {
+        "TableName": get_table().name,
+        "Item": item,
+        "ConditionExpression": "attribute_not_exists(id)",
+    }
+    tag_actions = [{"Put": {"TableName": put["TableName"], "Item": tag_item}} for tag_item in tag_items_to_write(item)]
+    write_prompt(put, tag_actions)
+    bump_cache_generation()
 
     return response(201, {"item": to_public_prompt_item(item)})
 
@@ -161,16 +497,23 @@ def update_prompt(prompt_id: str, event: dict[str, Any]) -> dict[str, Any]:
         payload=payload,
         created_at=existing["created_at"],
         updated_at=current_timestamp(),
+        revision=int(existing.get("revision", 0)) + 1,
     )
 
-    table = get_table()
-    table.put_item(Item=updated)
-
-    for tag in existing.get("tags", []):
-        table.delete_item(Key={"id": tag_index_id(tag, prompt_id)})
+    put = {
+        "TableName": get_table().name,
+        "Item": updated,
+        **revision_condition(existing),
+    }
+    tag_actions = [] if TAG_INDEX_MODE == "stream" else build_tag_actions(put["TableName"], existing.get("tags", []), updated)
 
-    for tag_item in build_tag_items(updated):
-        table.put_item(Item=tag_item)
+    try:
+        write_prompt(put, tag_actions)
+    except ClientError as error:
+        if is_condition_failure(error):
+            raise ConflictError(f"Prompt was modified concurrently: {prompt_id}") from error
+        raise
+    bump_cache_generation()
 
     return response(200, {"item": to_public_prompt_item(updated)})
 
@@ -179,13 +522,89 @@ def delete_prompt(prompt_id: str) -> dict[str, Any]:
     existing = load_prompt(prompt_id)
     table = get_table()
 
-    for tag in existing.get("tags", []):
-        table.delete_item(Key={"id": tag_index_id(tag, prompt_id)})
+    if TAG_INDEX_MODE != "stream":
+        for tag in existing.get("tags", []):
+            table.delete_item(Key={"id": tag_index_id(tag, prompt_id)})
 
     table.delete_item(Key={"id": prompt_id})
+    bump_cache_generation()
     return response(204)
 
 
+def tag_items_to_write(prompt_item: dict[str, Any]) -> list[dict[str, Any]]:
+    return [] if TAG_INDEX_MODE == "stream" else build_tag_items(prompt_item)
+
+
+def write_prompt(put: dict[str, Any], tag_actions: list[dict[str, Any]]) -> None:
+    """Write the prompt item, together with its tag index actions when there are any.
+
+    In stream mode there are no tag actions and the prompt goes out as a plain
+    PutItem, which costs half the write capacity of a one-item transaction.
+    """
+    if not tag_actions:
+        DYNAMODB.meta.client.put_item(**put)
+        return
+
+    transact_write([{"Put": put}, *tag_actions])
+
+
+def build_tag_actions(table_name: str, old_tags: list[str], prompt_item: dict[str, Any]) -> list[dict[str, Any]]:
+    """Transaction actions that bring the tag index items from old_tags to prompt_item["tags"].
+
+    Removed tags are deleted, new tags are put, and tags present on both
+    sides only get their denormalized fields rewritten in place.
+    """
+    new_tag_items = {tag_item["tag"]: tag_item for tag_item in build_tag_items(prompt_item)}
+    actions: list[dict[str, Any]] = [
+        {"Delete": {"TableName": table_name, "Key": {"id": tag_index_id(tag, prompt_item["id"])}}}
+        for tag in old_tags
+        if tag not in new_tag_items
+    ]
+
+    for tag, tag_item in new_tag_items.items():
+        if tag not in old_tags:
+            actions.append({"Put": {"TableName": table_name, "Item": tag_item}})
+            continue
+
+        fields = [field for field in tag_item if field != "id"]
+        actions.append(
+            {
+                "Update": {
+                    "TableName": table_name,
+                    "Key": {"id": tag_item["id"]},
+                    "UpdateExpression": "SET " + ", ".join(f"#{field} = :{field}" for field in fields),
+                    "ExpressionAttributeNames": {f"#{field}": field for field in fields},
+                    "ExpressionAttributeValues": {f":{field}": tag_item[field] for field in fields},
+                }
+            }
+        )
+
+    return actions
+
+
+def is_condition_failure(error: ClientError, *, action_index: int = 0) -> bool:
+    """True when a write failed on its condition (for transactions, the condition on the given action)."""
+    code = error.response.get("Error", {}).get("Code")
+    if code == "ConditionalCheckFailedException":
+        return True
+    if code != "TransactionCanceledException":
+        return False
+    reasons = error.response.get("CancellationReasons") or []
+    return len(reasons) > action_index and reasons[action_index].get("Code") == "ConditionalCheckFailed"
+
+
+def transact_write(actions: list[dict[str, Any]]) -> None:
+    """Write actions with TransactWriteItems, TRANSACT_MAX_ITEMS at a time.
+
+    A create or update touches at most 2 * MAX_TAGS_PER_PROMPT + 1 items, which
+    fits in one transaction while MAX_TAGS_PER_PROMPT <= 49; only larger
+    configurations are split, and then each chunk is atomic on its own.
+    """
+    client = DYNAMODB.meta.client
+    for start in range(0, len(actions), TRANSACT_MAX_ITEMS):
+        client.transact_write_items(TransactItems=actions[start : start + TRANSACT_MAX_ITEMS])
+
+
 def load_prompt(prompt_id: str) -> dict[str, Any]:
     result = get_table().get_item(Key={"id": prompt_id})
     item = result.get("Item")
@@ -215,7 +634,28 @@ def parse_json_body(event: dict[str, Any]) -> dict[str, Any]:
     return payload
 
 
-def build_prompt_item(*, prompt_id: str, payload: dict[str, Any], created_at: str, updated_at: str) -> dict[str, Any]:
+def revision_condition(existing: dict[str, Any]) -> dict[str, Any]:
+    """Condition that the stored prompt is still the revision that was read.
+
+    updated_at only has second precision, so two edits within the same second
+    would both pass a timestamp check; the revision counter grows on every
+    write. Prompts written before revisions existed fall back to updated_at
+    until their first update.
+    """
+    if "revision" in existing:
+        return {
+            "ConditionExpression": "revision = :expected_revision",
+            "ExpressionAttributeValues": {":expected_revision": existing["revision"]},
+        }
+    return {
+        "ConditionExpression": "attribute_not_exists(revision) AND updated_at = :expected_updated_at",
+        "ExpressionAttributeValues": {":expected_updated_at": existing["updated_at"]},
+    }
+
+
+def build_prompt_item(
+    *, prompt_id: str, payload: dict[str, Any], created_at: str, updated_at: str, revision: int
+) -> dict[str, Any]:
     name = require_non_empty_string(payload.get("name"), "name")
     prompt_text = require_non_empty_string(payload.get("prompt_text"), "prompt_text")
     description = optional_string(payload.get("description"))
@@ -241,7 +681,8 @@ def build_prompt_item(*, prompt_id: str, payload: dict[str, Any], created_at: st
         "is_active": is_active,
         "created_at": created_at,
         "updated_at": updated_at,
-        "access_pk": "PROMPT",
+        "revision": revision,
+        "access_pk": prompt_partition(prompt_id),
         "access_sk": f"{created_at}#{prompt_id}",
     }
 
@@ -302,6 +743,28 @@ def to_public_prompt_item(item: dict[str, Any]) -> dict[str, Any]:
     }
 
 
+def parse_filter_tags(raw_tag: Any, raw_tags: Any) -> list[str]:
+    if raw_tag and raw_tags:
+        raise BadRequestError("Use either tag or tags, not both")
+
+    raw = raw_tags or raw_tag
+    if not raw:
+        return []
+
+    tags = normalize_tags(raw.split(","))
+    if len(tags) > MAX_FILTER_TAGS:
+        raise BadRequestError(f"tags must not contain more than {MAX_FILTER_TAGS} items")
+    return tags
+
+
+def parse_match(raw_match: Any) -> str:
+    if raw_match in (None, ""):
+        return "all"
+    if raw_match not in ("all", "any"):
+        raise BadRequestError("match must be all or any")
+    return raw_match
+
+
 def parse_limit(raw_limit: Any) -> int:
     if raw_limit in (None, ""):
         return DEFAULT_LIMIT
@@ -317,11 +780,12 @@ def parse_limit(raw_limit: Any) -> int:
     return limit
 
 
-def encode_next_token(last_evaluated_key: dict[str, Any] | None) -> str | None:
-    if not last_evaluated_key:
+def encode_next_token(cursors: dict[str, Any] | None) -> str | None:
+    """Encode the per-partition cursors ({access_pk: ExclusiveStartKey, or None when done})."""
+    if not cursors:
         return None
 
-    raw = json.dumps(last_evaluated_key, separators=(",", ":")).encode("utf-8")
+    raw = json.dumps(cursors, separators=(",", ":")).encode("utf-8")
     return base64.urlsafe_b64encode(raw).decode("utf-8")
 
 
@@ -393,9 +857,24 @@ def normalize_tags(value: Any) -> list[str]:
             seen.add(cleaned)
             normalized.append(cleaned)
 
+    if len(normalized) > MAX_TAGS_PER_PROMPT:
+        raise BadRequestError(f"tags must not contain more than {MAX_TAGS_PER_PROMPT} items")
+
     return normalized
 
 
+def prompt_partition(prompt_id: str) -> str:
+    if PROMPT_LIST_SHARDS <= 1:
+        return "PROMPT"
+    return f"PROMPT#{zlib.crc32(prompt_id.encode('utf-8')) % PROMPT_LIST_SHARDS}"
+
+
+def prompt_list_partitions() -> list[str]:
+    if PROMPT_LIST_SHARDS <= 1:
+        return ["PROMPT"]
+    return [f"PROMPT#{shard}" for shard in range(PROMPT_LIST_SHARDS)]
+
+
 def tag_index_id(tag: str, prompt_id: str) -> str:
     return f"PROMPT_TAG#{tag}#{prompt_id}"
 
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import bisect
+import gzip
+import json
+import math
+import re
+from collections import Counter
+from datetime import UTC, datetime
+from typing import Any
+
+# Inverted index over the searchable prompt fields, stored as one gzipped JSON
+# snapshot in S3:
+#
+#   {
+#     "version": 1,
+#     "built_at": "...",
+#     "docs": {prompt_id: {summary fields..., "terms": [term, ...]}},
+#     "postings": {term: [[prompt_id, weight], ...]}   # sorted by prompt_id
+#   }
+#
+# "docs" carries what a search result shows plus each prompt's terms, so a
+# changed prompt can be taken out of exactly the postings it was in.
+
+# Version 2 added CJK unigrams; an older snapshot is rebuilt instead of updated.
+SNAPSHOT_VERSION = 2
+
+# A match in the name counts for more than one in the body.
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "tags": 2.0,
+    "description": 2.0,
+    "prompt_text": 1.0,
+}
+
+SUMMARY_FIELDS = ("name", "description", "tags", "target_model", "version", "is_active", "created_at", "updated_at")
+
+# Latin words and digits become lowercase terms; runs of CJK characters have no
+# word boundaries, so they are indexed as overlapping character bigrams plus the
+# single characters. Queries use the bigrams of a run (a one-character run is
+# looked up as a unigram), so a one-character query still finds longer words.
+WORD_PATTERN = re.compile(r"[0-9a-z]+(?:[._'-][0-9a-z]+)*")
+CJK_PATTERN = re.compile("[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f]+")
+
+
+def tokenize(text: str, *, unigrams: bool = False) -> list[str]:
+    """Terms of text; unigrams=True also emits every CJK character of multi-character runs (for indexing)."""
+    text = text.lower()
+    terms = WORD_PATTERN.findall(text)
+    for run in CJK_PATTERN.findall(text):
+        if len(run) == 1:
+            terms.append(run)
+            continue
+        terms.extend(run[index : index + 2] for index in range(len(run) - 1))
+        if unigrams:
+            terms.extend(run)
+    return terms
+
+
+def term_weights(prompt_item: dict[str, Any]) -> dict[str, float]:
+    """Weighted, log-damped term frequencies of one prompt."""
+    counts: Counter[str] = Counter()
+    for field, field_weight in FIELD_WEIGHTS.items():
+        value = prompt_item.get(field) or ""
+        text = " ".join(value) if isinstance(value, list) else str(value)
+        for term in tokenize(text, unigrams=True):
+            counts[term] += field_weight
+    return {term: round(1 + math.log(count), 3) for term, count in counts.items()}
+
+
+def empty_snapshot() -> dict[str, Any]:
+    return {"version": SNAPSHOT_VERSION, "built_at": None, "docs": {}, "postings": {}}
+
+
+def remove_prompt(snapshot: dict[str, Any], prompt_id: str) -> None:
+    doc = snapshot["docs"].pop(prompt_id, None)
+    if not doc:
+        return
+
+    for term in doc["terms"]:
+        postings = snapshot["postings"].get(term)
+        if not postings:
+            continue
+        index = bisect.bisect_left(postings, [prompt_id])
+        if index < len(postings) and postings[index][0] == prompt_id:
+            del postings[index]
+        if not postings:
+            del snapshot["postings"][term]
+
+
+def add_prompt(snapshot: dict[str, Any], prompt_item: dict[str, Any]) -> None:
+    """Index prompt_item, replacing whatever was indexed for it before."""
+    prompt_id = prompt_item["id"]
+    remove_prompt(snapshot, prompt_id)
+
+    weights = term_weights(prompt_item)
+    snapshot["docs"][prompt_id] = {
+        **{field: prompt_item.get(field) for field in SUMMARY_FIELDS},
+        "terms": sorted(weights),
+    }
+    for term, weight in weights.items():
+        bisect.insort(snapshot["postings"].setdefault(term, []), [prompt_id, weight])
+
+
+def build_snapshot(prompt_items: list[dict[str, Any]]) -> dict[str, Any]:
+    snapshot = empty_snapshot()
+    for prompt_item in prompt_items:
+        add_prompt(snapshot, prompt_item)
+    return snapshot
+
+
+def intersect_postings(postings_lists: list[list[list[Any]]]) -> dict[str, float]:
+    """Prompt ids present in every postings list, with their summed weights.
+
+    Walks the shortest list and binary-searches the others, narrowing the
+    search window as it goes since all lists are sorted by prompt id.
+    """
+    postings_lists = sorted(postings_lists, key=len)
+    shortest, others = postings_lists[0], postings_lists[1:]
+    starts = [0] * len(others)
+    matches: dict[str, float] = {}
+
+    for prompt_id, weight in shortest:
+        total = weight
+        for position, postings in enumerate(others):
+            index = bisect.bisect_left(postings, [prompt_id], starts[position])
+            starts[position] = index
+            if index == len(postings) or postings[index][0] != prompt_id:
+                break
+            total += postings[index][1]
+        else:
+            matches[prompt_id] = total
+
+    return matches
+
+
+def search(snapshot: dict[str, Any], query: str, limit: int) -> tuple[list[dict[str, Any]], int]:
+    """Prompts containing every term of query, best first, and the total number of matches.
+
+    Each term's weight is scaled by its inverse document frequency, so rare
+    terms decide the ranking more than common ones.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    postings = snapshot["postings"]
+    if not terms or any(term not in postings for term in terms):
+        return [], 0
+
+    doc_count = len(snapshot["docs"])
+    idf = {term: math.log(1 + doc_count / len(postings[term])) for term in terms}
+    weighted = [[[prompt_id, weight * idf[term]] for prompt_id, weight in postings[term]] for term in terms]
+    matches = intersect_postings(weighted)
+
+    ranked = sorted(
+        matches.items(),
+        key=lambda match: (match[1], snapshot["docs"][match[0]].get("updated_at") or ""),
+        reverse=True,
+    )
+    results = []
+    for prompt_id, score in ranked[:limit]:
+        doc = snapshot["docs"][prompt_id]
+        results.append({"id": prompt_id, **{field: doc.get(field) for field in SUMMARY_FIELDS}, "score": round(score, 4)})
+    return results, len(matches)
+
+
+def load_snapshot(s3_client: Any, bucket: str, key: str) -> tuple[dict[str, Any], str | None]:
+    """Read the snapshot and its ETag; an empty index (and None) when none was written yet."""
+    try:
+        result = s3_client.get_object(Bucket=bucket, Key=key)
+    except s3_client.exceptions.NoSuchKey:
+        return empty_snapshot(), None
+
+    snapshot = json.loads(gzip.decompress(result["Body"].read()))
+    return snapshot, result["ETag"]
+
+
+def save_snapshot(s3_client: Any, bucket: str, key: str, snapshot: dict[str, Any], etag: str | None) -> str:
+    """Write the snapshot only if it is still the version that was read (etag), and return the new ETag."""
+    snapshot["built_at"] = datetime.now(UTC).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+    body = gzip.compress(json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+    result = s3_client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=body,
+        ContentType="application/json",
+        ContentEncoding="gzip",
+        **condition,
+    )
+    return result["ETag"]
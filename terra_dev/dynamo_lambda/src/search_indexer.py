@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from typing import Any, Callable
+
+import boto3
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+from lambda_function import get_table
+from search_index import SNAPSHOT_VERSION, add_prompt, build_snapshot, load_snapshot, remove_prompt, save_snapshot
+from tag_index_processor import deserialize_image, is_prompt_record
+
+
+LOGGER = logging.getLogger()
+LOGGER.setLevel(logging.INFO)
+
+S3 = boto3.client("s3")
+SEARCH_INDEX_BUCKET = os.environ.get("SEARCH_INDEX_BUCKET", "")
+SEARCH_INDEX_KEY = os.environ.get("SEARCH_INDEX_KEY", "search/prompts-index.json.gz")
+
+# Concurrent invocations (one per stream shard) race on the single snapshot object;
+# a lost conditional write reloads the snapshot and reapplies the batch.
+MAX_SAVE_ATTEMPTS = 5
+SNAPSHOT_CONFLICT_CODES = ("PreconditionFailed", "ConditionalRequestConflict")
+
+
+def lambda_handler(event: dict[str, Any], _context: Any) -> dict[str, Any]:
+    """Entry point for prompts table stream batches and for {"action": "rebuild"} invocations.
+
+    Stream batches update the search snapshot incrementally; a rebuild scans
+    the table and replaces the snapshot, which also repairs any drift.
+    """
+    if (event or {}).get("action") == "rebuild":
+        indexed = rebuild_index()
+        LOGGER.info("Rebuilt search index: %s", json.dumps({"prompts": indexed}))
+        return {"indexed": indexed}
+
+    records = [record for record in (event or {}).get("Records", []) if is_prompt_record(record)]
+    if not records:
+        return {"batchItemFailures": []}
+
+    changes = latest_prompt_images(records)
+    try:
+        if not update_snapshot(lambda snapshot: apply_changes(snapshot, changes)):
+            # The snapshot was written by an older version; the scan also covers this batch.
+            indexed = rebuild_index()
+            LOGGER.info("Rebuilt outdated search index: %s", json.dumps({"prompts": indexed}))
+            return {"batchItemFailures": []}
+    except Exception:
+        # Reapplying a batch gives the same snapshot, so the whole batch is retried.
+        LOGGER.exception("Failed to update search index")
+        return {"batchItemFailures": [{"itemIdentifier": records[0]["dynamodb"]["SequenceNumber"]}]}
+
+    LOGGER.info("Updated search index: %s", json.dumps({"records": len(records), "prompts": len(changes)}))
+    return {"batchItemFailures": []}
+
+
+def latest_prompt_images(records: list[dict[str, Any]]) -> dict[str, dict[str, Any] | None]:
+    """The last image of every prompt in the batch (None when it was deleted)."""
+    latest: dict[str, dict[str, Any] | None] = {}
+    for record in records:
+        images = record["dynamodb"]
+        new_image = deserialize_image(images.get("NewImage"))
+        old_image = deserialize_image(images.get("OldImage"))
+        prompt_id = (new_image or old_image)["id"]
+        latest[prompt_id] = new_image if record.get("eventName") != "REMOVE" else None
+    return latest
+
+
+def apply_changes(snapshot: dict[str, Any], changes: dict[str, dict[str, Any] | None]) -> None:
+    for prompt_id, prompt_item in changes.items():
+        if prompt_item is None:
+            remove_prompt(snapshot, prompt_id)
+        else:
+            add_prompt(snapshot, prompt_item)
+
+
+def update_snapshot(change: Callable[[dict[str, Any]], None]) -> bool:
+    """Apply change to the stored snapshot; False (nothing written) when the snapshot has an older version."""
+    bucket = require_bucket()
+    for _ in range(MAX_SAVE_ATTEMPTS):
+        snapshot, etag = load_snapshot(S3, bucket, SEARCH_INDEX_KEY)
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return False
+        change(snapshot)
+        try:
+            save_snapshot(S3, bucket, SEARCH_INDEX_KEY, snapshot, etag)
+            return True
+        except ClientError as error:
+            if error.response.get("Error", {}).get("Code") not in SNAPSHOT_CONFLICT_CODES:
+                raise
+
+    raise RuntimeError("Search index snapshot kept changing while it was being updated")
+
+
+def rebuild_index() -> int:
+    """Replace the snapshot with one built from a full table scan and return the number of prompts.
+
+    The ETag is taken before the scan, so a stream update saved while the scan
+    runs makes the rebuild start over instead of being overwritten by older data.
+    """
+    bucket = require_bucket()
+    for _ in range(MAX_SAVE_ATTEMPTS):
+        _, etag = load_snapshot(S3, bucket, SEARCH_INDEX_KEY)
+        snapshot = build_snapshot(scan_prompts())
+        try:
+            save_snapshot(S3, bucket, SEARCH_INDEX_KEY, snapshot, etag)
+            return len(snapshot["docs"])
+        except ClientError as error:
+            if error.response.get("Error", {}).get("Code") not in SNAPSHOT_CONFLICT_CODES:
+                raise
+
+    raise RuntimeError("Search index snapshot kept changing while it was being rebuilt")
+
+
+def scan_prompts() -> list[dict[str, Any]]:
+    table = get_table()
+    scan_kwargs: dict[str, Any] = {"FilterExpression": Attr("entity_type").eq("PROMPT")}
+    items: list[dict[str, Any]] = []
+
+    while True:
+        page = table.scan(**scan_kwargs)
+        items.extend(page.get("Items", []))
+        if "LastEvaluatedKey" not in page:
+            return items
+        scan_kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+
+def require_bucket() -> str:
+    if not SEARCH_INDEX_BUCKET:
+        raise RuntimeError("SEARCH_INDEX_BUCKET environment variable is not set")
+    return SEARCH_INDEX_BUCKET
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from lambda_function import build_tag_items, bump_cache_generation, get_table, tag_index_id
+
+
+LOGGER = logging.getLogger()
+LOGGER.setLevel(logging.INFO)
+
+DESERIALIZER = TypeDeserializer()
+
+
+def lambda_handler(event: dict[str, Any], _context: Any) -> dict[str, Any]:
+    """Entry point for DynamoDB Streams batches of the prompts table.
+
+    Materializes, refreshes and deletes the PROMPT_TAG index items for the
+    PROMPT items that changed. Records arrive in order for each prompt, and
+    every write is a full put or a delete derived from the stream images, so
+    a batch can be replayed any number of times.
+    """
+    records = [record for record in (event or {}).get("Records", []) if is_prompt_record(record)]
+    if not records:
+        return {"batchItemFailures": []}
+
+    try:
+        puts, deletes = plan_tag_index_writes(records)
+        apply_tag_index_writes(puts, deletes)
+        # Tag list pages cached by the API before the index caught up are now stale.
+        bump_cache_generation()
+    except Exception:
+        # The plan is built from the whole batch, so the whole batch is retried
+        # from its first record; the writes are idempotent.
+        LOGGER.exception("Failed to sync tag index items")
+        return {"batchItemFailures": [{"itemIdentifier": records[0]["dynamodb"]["SequenceNumber"]}]}
+
+    LOGGER.info(
+        "Synced tag index items: %s",
+        json.dumps({"records": len(records), "puts": len(puts), "deletes": len(deletes)}),
+    )
+    return {"batchItemFailures": []}
+
+
+def is_prompt_record(record: dict[str, Any]) -> bool:
+    images = record.get("dynamodb", {})
+    return any(
+        (images.get(image) or {}).get("entity_type", {}).get("S") == "PROMPT"
+        for image in ("NewImage", "OldImage")
+    )
+
+
+def deserialize_image(image: dict[str, Any] | None) -> dict[str, Any] | None:
+    if not image:
+        return None
+    return {name: DESERIALIZER.deserialize(value) for name, value in image.items()}
+
+
+def plan_tag_index_writes(records: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], list[str]]:
+    """Coalesce the batch per prompt into the tag items to put and the tag item ids to delete.
+
+    Only the last image of each prompt is materialized. Every tag that any
+    earlier image of the prompt carried, and the last image no longer does,
+    is deleted, so intermediate states within the batch never reach the index.
+    """
+    latest: dict[str, dict[str, Any] | None] = {}
+    seen_tags: dict[str, set[str]] = {}
+
+    for record in records:
+        images = record["dynamodb"]
+        old_image = deserialize_image(images.get("OldImage"))
+        new_image = deserialize_image(images.get("NewImage"))
+        prompt_id = (new_image or old_image)["id"]
+
+        tags = seen_tags.setdefault(prompt_id, set())
+        for image in (old_image, new_image):
+            if image:
+                tags.update(image.get("tags", []))
+
+        latest[prompt_id] = new_image if record.get("eventName") != "REMOVE" else None
+
+    puts: list[dict[str, Any]] = []
+    deletes: list[str] = []
+    for prompt_id, prompt_item in latest.items():
+        current_tags = set(prompt_item.get("tags", [])) if prompt_item else set()
+        if prompt_item:
+            puts.extend(build_tag_items(prompt_item))
+        deletes.extend(tag_index_id(tag, prompt_id) for tag in sorted(seen_tags[prompt_id] - current_tags))
+
+    return puts, deletes
+
+
+def apply_tag_index_writes(puts: list[dict[str, Any]], deletes: list[str]) -> None:
+    # batch_writer sends BatchWriteItem requests of 25 and resends unprocessed items.
+    with get_table().batch_writer(overwrite_by_pkeys=["id"]) as batch:
+        for tag_item in puts:
+            batch.put_item(Item=tag_item)
+        for item_id in deletes:
+            batch.delete_item(Key={"id": item_id})
@@ -56,6 +56,97 @@ variable "max_prompt_list_limit" {
   default     = 100
 }
 
+variable "prompt_list_shards" {
+  description = "Number of access_pk shards (PROMPT#0..N-1) the prompt collection is spread over in the access pattern index"
+  type        = number
+  default     = 4
+
+  validation {
+    condition     = var.prompt_list_shards >= 1 && var.prompt_list_shards <= 32
+    error_message = "prompt_list_shards must be between 1 and 32."
+  }
+}
+
+variable "max_filter_tags" {
+  description = "Maximum number of tags accepted by GET /prompts?tags=a,b"
+  type        = number
+  default     = 10
+}
+
+variable "max_list_scan_items" {
+  description = "Maximum number of index items one GET /prompts request walks through before returning a short page with a next_token"
+  type        = number
+  default     = 1000
+
+  validation {
+    condition     = var.max_list_scan_items >= 1
+    error_message = "max_list_scan_items must be at least 1."
+  }
+}
+
+variable "max_tags_per_prompt" {
+  description = "Maximum number of tags per prompt (keeps a prompt and its tag items within one DynamoDB transaction)"
+  type        = number
+  default     = 40
+
+  validation {
+    condition     = var.max_tags_per_prompt >= 1 && var.max_tags_per_prompt <= 49
+    error_message = "max_tags_per_prompt must be between 1 and 49."
+  }
+}
+
+variable "tag_index_mode" {
+  description = "How PROMPT_TAG index items are maintained: inline (same transaction as the prompt) or stream (DynamoDB Streams processor)"
+  type        = string
+  default     = "stream"
+
+  validation {
+    condition     = contains(["inline", "stream"], var.tag_index_mode)
+    error_message = "tag_index_mode must be inline or stream."
+  }
+}
+
+variable "tag_index_batch_size" {
+  description = "Maximum number of stream records per tag index processor invocation"
+  type        = number
+  default     = 100
+}
+
+variable "tag_index_batching_window_seconds" {
+  description = "Maximum time in seconds to gather stream records before invoking the tag index processor"
+  type        = number
+  default     = 1
+}
+
+variable "cache_ttl_seconds" {
+  description = "Seconds a warm Lambda container keeps prompt items and list pages in its read-through cache (0 disables the cache)"
+  type        = number
+  default     = 30
+}
+
+variable "cache_generation_check_seconds" {
+  description = "Seconds between checks of the cache generation counter bumped by writes in other containers"
+  type        = number
+  default     = 2
+}
+
+variable "cache_generation_shards" {
+  description = "Number of cache generation counter items that writes spread their bumps over (1 keeps the single META#CACHE_GENERATION item)"
+  type        = number
+  default     = 4
+
+  validation {
+    condition     = var.cache_generation_shards >= 1 && var.cache_generation_shards <= 100
+    error_message = "cache_generation_shards must be between 1 and 100 (readers fetch every counter with one BatchGetItem)."
+  }
+}
+
+variable "search_index_refresh_seconds" {
+  description = "Seconds a warm API container uses its in-memory search index before checking S3 for a newer snapshot"
+  type        = number
+  default     = 30
+}
+
 variable "cors_allow_origin" {
   description = "Value returned in Access-Control-Allow-Origin headers"
   type        = string
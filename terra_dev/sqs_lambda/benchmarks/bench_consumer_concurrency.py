@@ -0,0 +1,129 @@
+"""
+Consumer Lambda の CONSUMER_CONCURRENCY ベンチマーク
+=====================================================
+moto でローカルに作成した DynamoDB テーブルに対して Consumer Lambda の
+lambda_handler を呼び出し、1 バッチあたりの処理時間を CONSUMER_CONCURRENCY と
+PERSISTENCE_MODE ごとに比較する
+
+moto はプロセス内で応答するため、DynamoDB への 1 回の API 呼び出しに
+--latency-ms の遅延（ネットワーク往復の代わり）を加えて計測する
+
+使い方:
+    python benchmarks/bench_consumer_concurrency.py
+    python benchmarks/bench_consumer_concurrency.py --concurrency 1 2 5 10 --latency-ms 8 --batches 20
+
+必要なパッケージ: boto3, moto
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+CONSUMER_PATH = Path(__file__).resolve().parent.parent / 'lambda_code' / 'consumer' / 'index.py'
+TABLE_NAME = 'bench-orders'
+
+
+def load_consumer(concurrency: int, persistence_mode: str):
+    os.environ['CONSUMER_CONCURRENCY'] = str(concurrency)
+    os.environ['PERSISTENCE_MODE'] = persistence_mode
+    os.environ['DYNAMODB_TABLE_NAME'] = TABLE_NAME
+    # EMF のメトリクスを標準出力に書き出さない
+    os.environ['LATENCY_METRICS_ENABLED'] = 'false'
+    spec = importlib.util.spec_from_file_location(f'consumer_{persistence_mode}_{concurrency}', CONSUMER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def add_latency(consumer, latency: float) -> None:
+    """DynamoDB クライアントの API 呼び出しごとに遅延を加える"""
+    def sleep_before_call(**kwargs):
+        time.sleep(latency)
+    consumer.dynamodb.meta.client.meta.events.register('before-call.dynamodb.*', sleep_before_call)
+
+
+def build_records(batch_size: int, item_count: int) -> list:
+    records = []
+    for _ in range(batch_size):
+        order = {
+            'order_id': str(uuid.uuid4()),
+            'created_at': '2024-01-01T00:00:00Z',
+            'customer_name': '山田太郎',
+            'items': [{'name': f'item-{i}', 'quantity': 1, 'price': 100.5} for i in range(item_count)],
+            'total_amount': 100.5 * item_count,
+            'request_id': 'bench'
+        }
+        records.append({'messageId': str(uuid.uuid4()), 'body': json.dumps(order), 'attributes': {}})
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Consumer Lambda の CONSUMER_CONCURRENCY ベンチマーク')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 5, 10])
+    parser.add_argument('--modes', nargs='+', default=['single', 'batch'], choices=['single', 'batch'])
+    parser.add_argument('--batches', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--items', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=8.0)
+    args = parser.parse_args()
+
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-1')
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+    try:
+        from moto import mock_aws
+    except ImportError:
+        sys.exit('moto が必要です: pip install moto')
+
+    import boto3
+
+    class Context:
+        aws_request_id = 'bench'
+
+    print(f"batch_size={args.batch_size} items={args.items} latency={args.latency_ms}ms batches={args.batches}")
+    print(f"{'mode':>7} {'concurrency':>12} {'p50 (ms)':>9} {'max (ms)':>9} {'records/s':>10}")
+
+    with mock_aws():
+        boto3.client('dynamodb').create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {'AttributeName': 'order_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'created_at', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'order_id', 'AttributeType': 'S'},
+                {'AttributeName': 'created_at', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+
+        for mode in args.modes:
+            for concurrency in args.concurrency:
+                consumer = load_consumer(concurrency, mode)
+                consumer.logger.disabled = True
+                add_latency(consumer, args.latency_ms / 1000)
+
+                durations = []
+                for _ in range(args.batches):
+                    records = build_records(args.batch_size, args.items)
+                    started = time.perf_counter()
+                    result = consumer.lambda_handler({'Records': records}, Context())
+                    durations.append(time.perf_counter() - started)
+                    assert not result['batchItemFailures'], result
+
+                consumer.record_executor.shutdown()
+                consumer.group_executor.shutdown()
+                p50 = statistics.median(durations) * 1000
+                throughput = args.batch_size * args.batches / sum(durations)
+                print(f"{mode:>7} {concurrency:>12} {p50:>9.1f} {max(durations) * 1000:>9.1f} {throughput:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+SQS メッセージ本文のデコードのベンチマーク
+============================================
+Consumer Lambda の decode_order_json（json.loads(parse_float=Decimal)）と、
+json.loads の後に convert_to_decimal で dict / list を作り直していた従来の方法を比較する
+
+1 メッセージあたりの CPU 時間と、tracemalloc で測ったピークメモリを商品数ごとに出力する
+
+使い方:
+    python benchmarks/bench_decimal_decode.py
+    python benchmarks/bench_decimal_decode.py --sizes 100 1000 10000 --repeat 7
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import timeit
+import tracemalloc
+from decimal import Decimal
+from pathlib import Path
+
+CONSUMER_PATH = Path(__file__).resolve().parent.parent / 'lambda_code' / 'consumer' / 'index.py'
+
+
+def convert_to_decimal(obj):
+    """変更前の convert_to_decimal（比較用にそのまま残している）"""
+    if isinstance(obj, float):
+        return Decimal(str(obj))
+    elif isinstance(obj, dict):
+        return {k: convert_to_decimal(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_to_decimal(item) for item in obj]
+    return obj
+
+
+def legacy_decode(body: str) -> dict:
+    """変更前: パースした後に items と total_amount を Decimal に変換し直す"""
+    order_data = json.loads(body)
+    order_data['items'] = convert_to_decimal(order_data.get('items', []))
+    order_data['total_amount'] = convert_to_decimal(order_data.get('total_amount', 0))
+    return order_data
+
+
+def load_consumer():
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-1')
+    spec = importlib.util.spec_from_file_location('consumer_index', CONSUMER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_body(item_count: int) -> str:
+    items = [
+        {'name': f'item-{i}', 'sku': f'SKU-{i:06d}', 'quantity': (i % 5) + 1, 'price': 100.25 + i}
+        for i in range(item_count)
+    ]
+    return json.dumps({
+        'order_id': 'bench',
+        'created_at': '2024-01-01T00:00:00Z',
+        'customer_name': '山田太郎',
+        'items': items,
+        'total_amount': sum(item['quantity'] * item['price'] for item in items)
+    })
+
+
+def per_call_us(func, body: str, repeat: int) -> float:
+    timer = timeit.Timer(lambda: func(body))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def peak_kib(func, body: str) -> float:
+    tracemalloc.start()
+    result = func(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQS メッセージ本文のデコードのベンチマーク')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    consumer = load_consumer()
+
+    print(f"{'items':>7} {'legacy (us)':>12} {'decimal (us)':>13} {'speedup':>8}"
+          f" {'legacy peak (KiB)':>18} {'decimal peak (KiB)':>19}")
+    for size in args.sizes:
+        body = build_body(size)
+        # 2 つの方法で同じ結果になることを確認する
+        assert legacy_decode(body)['items'] == consumer.decode_order_json(body)['items']
+
+        legacy_us = per_call_us(legacy_decode, body, args.repeat)
+        decimal_us = per_call_us(consumer.decode_order_json, body, args.repeat)
+        legacy_peak = peak_kib(legacy_decode, body)
+        decimal_peak = peak_kib(consumer.decode_order_json, body)
+        print(f"{size:>7} {legacy_us:>12.1f} {decimal_us:>13.1f} {legacy_us / decimal_us:>7.2f}x"
+              f" {legacy_peak:>18.1f} {decimal_peak:>19.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+FIFO モードのメッセージグループ数とスループットのベンチマーク
+================================================================
+FIFO キューの配信ルールを簡易的に再現し、Consumer Lambda の lambda_handler を
+複数の「同時実行」スレッドから呼び出して、グループ数 N ごとのスループットを測る
+
+再現している FIFO キューの挙動:
+- 同じグループのメッセージは送信順に、1 つの呼び出しにまとめて渡される
+- 処理中（in-flight）のグループのメッセージは、他の呼び出しには渡されない
+- 1 回の呼び出しで受け取るメッセージは最大 batch_size 件（FIFO の上限は 10）
+
+メッセージ 1 件の処理（S3 / DynamoDB へのアクセス）は --latency-ms の sleep で置き換える
+
+使い方:
+    python benchmarks/bench_fifo_groups.py
+    python benchmarks/bench_fifo_groups.py --groups 1 4 16 64 --concurrency 5 --latency-ms 10
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+LAMBDA_CODE_DIR = Path(__file__).resolve().parent.parent / 'lambda_code'
+
+
+def load_module(name: str, path: Path):
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-1')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FifoQueueSimulator:
+    """グループ単位のロックを持つ FIFO キューの簡易シミュレーター"""
+
+    def __init__(self, messages: list, batch_size: int):
+        self.batch_size = batch_size
+        self.pending: dict = {}
+        for message in messages:
+            self.pending.setdefault(message['group_id'], deque()).append(message)
+        self.in_flight: set = set()
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.groups_per_batch = 0
+
+    def receive(self):
+        """処理中でないグループから最大 batch_size 件を取り出す。空なら None、待ちなら []"""
+        with self.lock:
+            if not self.pending:
+                return None
+            batch = []
+            for group_id in list(self.pending):
+                if group_id in self.in_flight:
+                    continue
+                queue = self.pending[group_id]
+                while queue and len(batch) < self.batch_size:
+                    batch.append(queue.popleft())
+                if not queue:
+                    del self.pending[group_id]
+                self.in_flight.add(group_id)
+                if len(batch) >= self.batch_size:
+                    break
+            if batch:
+                self.batches += 1
+                self.groups_per_batch += len({m['group_id'] for m in batch})
+            return batch
+
+    def release(self, batch: list) -> None:
+        with self.lock:
+            for message in batch:
+                self.in_flight.discard(message['group_id'])
+
+
+def run(consumer, producer, groups: int, args) -> dict:
+    producer.FIFO_MESSAGE_GROUPS = groups
+    rng = random.Random(args.seed)
+    customers = [f'customer-{i:04d}' for i in range(args.customers)]
+    messages = []
+    for i in range(args.messages):
+        customer = rng.choice(customers)
+        messages.append({
+            'messageId': f'msg-{i}',
+            'body': '{}',
+            'group_id': producer.message_group_id(customer),
+        })
+
+    queue = FifoQueueSimulator(messages, args.batch_size)
+
+    class Context:
+        aws_request_id = 'bench'
+
+    def poller():
+        while True:
+            batch = queue.receive()
+            if batch is None:
+                return
+            if not batch:
+                time.sleep(0.001)
+                continue
+            records = [
+                {'messageId': m['messageId'], 'body': m['body'], 'attributes': {'MessageGroupId': m['group_id']}}
+                for m in batch
+            ]
+            consumer.lambda_handler({'Records': records}, Context())
+            queue.release(batch)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=poller) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'groups': groups,
+        'active_groups': len({m['group_id'] for m in messages}),
+        'elapsed': elapsed,
+        'throughput': args.messages / elapsed,
+        'avg_batch_size': args.messages / queue.batches,
+        'avg_groups_per_batch': queue.groups_per_batch / queue.batches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FIFO メッセージグループ数とスループットのベンチマーク')
+    parser.add_argument('--groups', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument('--messages', type=int, default=400)
+    parser.add_argument('--customers', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=5, help='Lambda の同時実行数（reserved concurrency）')
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='メッセージ 1 件の処理時間')
+    parser.add_argument('--group-workers', type=int, default=4, help='FIFO_GROUP_WORKERS')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ['SQS_FIFO_ENABLED'] = 'true'
+    os.environ['FIFO_GROUP_WORKERS'] = str(args.group_workers)
+    producer = load_module('producer_index', LAMBDA_CODE_DIR / 'producer' / 'index.py')
+    consumer = load_module('consumer_index', LAMBDA_CODE_DIR / 'consumer' / 'index.py')
+
+    latency = args.latency_ms / 1000
+    consumer.process_single_message = lambda record: time.sleep(latency)
+
+    print(f"messages={args.messages} customers={args.customers} concurrency={args.concurrency}"
+          f" group_workers={args.group_workers} latency={args.latency_ms}ms")
+    print(f"{'groups':>7} {'active':>7} {'elapsed(s)':>11} {'msgs/s':>9} {'batch':>6} {'groups/batch':>13}")
+    for groups in args.groups:
+        result = run(consumer, producer, groups, args)
+        print(f"{result['groups']:>7} {result['active_groups']:>7} {result['elapsed']:>11.2f}"
+              f" {result['throughput']:>9.1f} {result['avg_batch_size']:>6.1f} {result['avg_groups_per_batch']:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,354 @@
+"""
+sqs_lambda パイプライン全体のスループットベンチマーク
+======================================================
+moto でローカルに作成した SQS / DynamoDB / S3 に対して、Producer Lambda と
+Consumer Lambda の lambda_handler をプロセス内で呼び出し、合成した注文が
+API → SQS → DynamoDB と流れる速さを計測する
+
+バッチサイズ・注文あたりの商品数・CONSUMER_CONCURRENCY の組み合わせごとに、
+Producer / Consumer それぞれの次の値を出力する
+
+- throughput: 1 秒あたりに処理した注文数
+- p50 / p99: 注文 1 件あたりのレイテンシー（その注文を含む呼び出しが終わるまでの時間）
+- peak memory: 1 回の呼び出し中の tracemalloc のピーク（moto 側の確保も含む）
+
+結果は JSON に保存されるので、変更前に保存した結果を --compare に渡すと
+設定ごとの差分（%）を表示できる
+
+使い方:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --batch-sizes 1 10 --items 5 100 --concurrency 1 4 --orders 200
+    python benchmarks/bench_pipeline.py --output results/after.json --compare results/before.json
+
+必要なパッケージ: boto3, moto
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+PRODUCER_PATH = BENCH_DIR.parent / 'lambda_code' / 'producer' / 'index.py'
+CONSUMER_PATH = BENCH_DIR.parent / 'lambda_code' / 'consumer' / 'index.py'
+TABLE_NAME = 'bench-orders'
+BUCKET_NAME = 'bench-order-payloads'
+
+# 比較時に「大きいほど良い」指標と「小さいほど良い」指標
+HIGHER_IS_BETTER = ('throughput_per_sec',)
+LOWER_IS_BETTER = ('p50_ms', 'p99_ms', 'peak_memory_kib')
+
+
+class Context:
+    aws_request_id = 'bench'
+
+
+def load_module(name: str, path: Path, env: dict):
+    """環境変数を設定してから Lambda のコードを別名のモジュールとして読み込む"""
+    os.environ.update(env)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def add_latency(clients: list, latency: float) -> None:
+    """AWS の API 呼び出しごとに遅延（ネットワーク往復の代わり）を加える"""
+    if latency <= 0:
+        return
+
+    def sleep_before_call(**kwargs):
+        time.sleep(latency)
+
+    for client in clients:
+        client.meta.events.register('before-call.*.*', sleep_before_call)
+
+
+def percentile(values: list, pct: float) -> float:
+    """最近傍法によるパーセンタイル"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def generate_orders(count: int, item_count: int) -> list:
+    """items と total_amount の整合が取れた合成注文を作る"""
+    orders = []
+    for n in range(count):
+        items = [
+            {'name': f'item-{i}', 'quantity': 1 + i % 3, 'price': 100.5 + i % 7}
+            for i in range(item_count)
+        ]
+        orders.append({
+            'customer_name': f'customer-{n % 50}',
+            'items': items,
+            'total_amount': round(sum(item['quantity'] * item['price'] for item in items), 2)
+        })
+    return orders
+
+
+def build_api_events(orders: list, batch_size: int) -> list:
+    """バッチサイズ 1 は POST /orders、2 以上は POST /orders/batch のイベントにまとめる"""
+    if batch_size == 1:
+        return [([order], {'resource': '/orders', 'path': '/orders', 'httpMethod': 'POST',
+                           'headers': {}, 'body': json.dumps(order)}) for order in orders]
+
+    events = []
+    for start in range(0, len(orders), batch_size):
+        chunk = orders[start:start + batch_size]
+        events.append((chunk, {'resource': '/orders/batch', 'path': '/orders/batch', 'httpMethod': 'POST',
+                               'headers': {}, 'body': json.dumps({'orders': chunk})}))
+    return events
+
+
+def to_lambda_message_attributes(message_attributes: dict) -> dict:
+    """receive_message の MessageAttributes を、Lambda のイベントと同じ形（キーが小文字始まり）にする"""
+    return {
+        name: {'stringValue': value.get('StringValue'), 'dataType': value['DataType']}
+        for name, value in message_attributes.items()
+    }
+
+
+def receive_records(sqs, queue_url: str, batch_size: int) -> list:
+    """SQS イベントソースマッピングと同じ形のレコードを最大 batch_size 件受信する"""
+    records = []
+    while len(records) < batch_size:
+        response = sqs.receive_message(
+            QueueUrl=queue_url,
+            MaxNumberOfMessages=min(10, batch_size - len(records)),
+            AttributeNames=['All'],
+            MessageAttributeNames=['All']
+        )
+        messages = response.get('Messages', [])
+        if not messages:
+            break
+        for message in messages:
+            records.append({
+                'messageId': message['MessageId'],
+                'receiptHandle': message['ReceiptHandle'],
+                'body': message['Body'],
+                'attributes': message.get('Attributes', {}),
+                'messageAttributes': to_lambda_message_attributes(message.get('MessageAttributes', {})),
+                'eventSource': 'aws:sqs'
+            })
+    return records
+
+
+def summarize(stage: str, config: dict, latencies: list, elapsed: float, peak_bytes: int, failures: int) -> dict:
+    return {
+        'stage': stage,
+        **config,
+        'records': len(latencies),
+        'failures': failures,
+        'throughput_per_sec': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'peak_memory_kib': round(peak_bytes / 1024, 1)
+    }
+
+
+def run_producer(producer, events: list) -> tuple:
+    """Producer の lambda_handler を呼び出し、注文ごとのレイテンシーを集める"""
+    latencies = []
+    failures = 0
+    elapsed = 0.0
+    for orders, event in events:
+        started = time.perf_counter()
+        response = producer.lambda_handler(event, Context())
+        duration = time.perf_counter() - started
+        elapsed += duration
+        latencies.extend([duration] * len(orders))
+        if response['statusCode'] != 201:
+            failures += len(orders)
+
+    # メモリのピークは計測の邪魔にならないよう、最初のイベントをもう一度だけ tracemalloc 下で実行する
+    tracemalloc.start()
+    producer.lambda_handler(events[0][1], Context())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latencies, elapsed, peak, failures
+
+
+def run_consumer(consumer, sqs, queue_url: str, batch_size: int) -> tuple:
+    """キューが空になるまで受信 → Consumer の lambda_handler → 成功分の削除を繰り返す"""
+    latencies = []
+    failures = 0
+    elapsed = 0.0
+    peak = 0
+    while True:
+        records = receive_records(sqs, queue_url, batch_size)
+        if not records:
+            break
+
+        # 最初の呼び出しだけ tracemalloc 下で実行してピークを取り、時間の集計からは外す
+        measure_memory = peak == 0
+        if measure_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        result = consumer.lambda_handler({'Records': records}, Context())
+        duration = time.perf_counter() - started
+        if measure_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        else:
+            elapsed += duration
+            latencies.extend([duration] * len(records))
+
+        failed_ids = {failure['itemIdentifier'] for failure in result['batchItemFailures']}
+        failures += len(failed_ids)
+        entries = [
+            {'Id': str(i), 'ReceiptHandle': record['receiptHandle']}
+            for i, record in enumerate(records) if record['messageId'] not in failed_ids
+        ]
+        for start in range(0, len(entries), 10):
+            sqs.delete_message_batch(QueueUrl=queue_url, Entries=entries[start:start + 10])
+    return latencies, elapsed, peak, failures
+
+
+def compare(results: list, baseline_path: str) -> None:
+    """保存済みの結果と設定ごとに比較して変化率を表示する"""
+    baseline = json.loads(Path(baseline_path).read_text(encoding='utf-8'))
+
+    def key(result):
+        return (result['stage'], result['batch_size'], result['items'], result['concurrency'])
+
+    previous = {key(result): result for result in baseline['results']}
+    print(f"\ncompare with {baseline_path} ({baseline.get('git_commit') or 'unknown'})")
+    print(f"{'stage':>9} {'batch':>6} {'items':>6} {'conc':>5} {'throughput':>11} {'p50':>8} {'p99':>8} {'memory':>8}")
+    for result in results:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        changes = []
+        for metric in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            changes.append(f"{(result[metric] - before[metric]) / before[metric] * 100:+.1f}%" if before[metric] else 'n/a')
+        print(f"{result['stage']:>9} {result['batch_size']:>6} {result['items']:>6} {result['concurrency']:>5} "
+              f"{changes[0]:>11} {changes[1]:>8} {changes[2]:>8} {changes[3]:>8}")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='sqs_lambda パイプライン全体のスループットベンチマーク')
+    parser.add_argument('--orders', type=int, default=200, help='設定ごとに送信する注文数')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--items', type=int, nargs='+', default=[5, 100])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--persistence-mode', default='batch', choices=['single', 'batch'])
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='AWS の API 呼び出しごとに加える遅延')
+    parser.add_argument('--output', default=None, help='結果の JSON の保存先（既定: benchmarks/results/pipeline-<日時>.json）')
+    parser.add_argument('--compare', default=None, help='比較対象の結果 JSON')
+    args = parser.parse_args()
+
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-1')
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+    try:
+        from moto import mock_aws
+    except ImportError:
+        sys.exit('moto が必要です: pip install moto')
+
+    import boto3
+
+    # ハンドラーの構造化ログは計測の邪魔になるので出力しない
+    logging.disable(logging.CRITICAL)
+
+    results = []
+    print(f"orders={args.orders} persistence_mode={args.persistence_mode} latency={args.latency_ms}ms")
+    print(f"{'stage':>9} {'batch':>6} {'items':>6} {'conc':>5} {'records/s':>10} {'p50 (ms)':>9} {'p99 (ms)':>9} {'peak (KiB)':>11} {'failed':>7}")
+
+    with mock_aws():
+        sqs = boto3.client('sqs')
+        boto3.client('s3').create_bucket(
+            Bucket=BUCKET_NAME,
+            CreateBucketConfiguration={'LocationConstraint': os.environ['AWS_DEFAULT_REGION']}
+        )
+        boto3.client('dynamodb').create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {'AttributeName': 'order_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'created_at', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'order_id', 'AttributeType': 'S'},
+                {'AttributeName': 'created_at', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+
+        for batch_size in args.batch_sizes:
+            for item_count in args.items:
+                # 設定ごとに空のキューを用意し、前の設定の残りが混ざらないようにする
+                queue_url = sqs.create_queue(QueueName=f'bench-orders-{batch_size}-{item_count}')['QueueUrl']
+                producer = load_module(f'producer_{batch_size}_{item_count}', PRODUCER_PATH, {
+                    'SQS_QUEUE_URL': queue_url,
+                    'CLAIM_CHECK_BUCKET': BUCKET_NAME,
+                    'MAX_BATCH_ORDERS': str(max(batch_size, 100))
+                })
+                add_latency([producer.sqs_client, producer.s3_client], args.latency_ms / 1000)
+
+                for concurrency in args.concurrency:
+                    config = {'batch_size': batch_size, 'items': item_count, 'concurrency': concurrency}
+                    events = build_api_events(generate_orders(args.orders, item_count), batch_size)
+
+                    latencies, elapsed, peak, failures = run_producer(producer, events)
+                    results.append(summarize('producer', config, latencies, elapsed, peak, failures))
+
+                    consumer = load_module(f'consumer_{batch_size}_{item_count}_{concurrency}', CONSUMER_PATH, {
+                        'DYNAMODB_TABLE_NAME': TABLE_NAME,
+                        'CLAIM_CHECK_BUCKET': BUCKET_NAME,
+                        'CONSUMER_CONCURRENCY': str(concurrency),
+                        'PERSISTENCE_MODE': args.persistence_mode,
+                        # EMF のメトリクスを標準出力に書き出さない
+                        'LATENCY_METRICS_ENABLED': 'false'
+                    })
+                    add_latency([consumer.dynamodb.meta.client, consumer.s3_client], args.latency_ms / 1000)
+                    latencies, elapsed, peak, failures = run_consumer(consumer, sqs, queue_url, batch_size)
+                    consumer.record_executor.shutdown()
+                    consumer.group_executor.shutdown()
+                    results.append(summarize('consumer', config, latencies, elapsed, peak, failures))
+
+                    for result in results[-2:]:
+                        print(f"{result['stage']:>9} {batch_size:>6} {item_count:>6} {concurrency:>5} "
+                              f"{result['throughput_per_sec']:>10.1f} {result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                              f"{result['peak_memory_kib']:>11.1f} {result['failures']:>7}")
+
+                producer.batch_send_executor.shutdown()
+
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'parameters': vars(args),
+        'results': results
+    }
+    output = Path(args.output) if args.output else (
+        BENCH_DIR / 'results' / f"pipeline-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"\nresults saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+validate_order のマイクロベンチマーク
+======================================
+Producer Lambda の validate_order（スキーマからコンパイルした検証関数）と、
+1 件ずつ isinstance で判定していた従来の検証関数を比較する
+
+使い方:
+    python benchmarks/bench_validate_order.py
+    python benchmarks/bench_validate_order.py --sizes 10 100 1000 10000 --repeat 7
+
+NumPy がインストールされていれば、NUMPY_TOTAL_MIN_ITEMS 以上の商品数で
+合計金額の計算に NumPy が使われる（--no-numpy で無効化して比較できる）
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import timeit
+from pathlib import Path
+
+PRODUCER_PATH = Path(__file__).resolve().parent.parent / 'lambda_code' / 'producer' / 'index.py'
+
+
+def legacy_validate_order(order_data: dict) -> tuple[bool, str]:
+    """
+    変更前の validate_order（比較用にそのまま残している）
+    total_amount と商品合計の整合性チェックは行わない
+    """
+    required_fields = ['customer_name', 'items', 'total_amount']
+
+    for field in required_fields:
+        if field not in order_data:
+            return False, f"必須フィールド '{field}' がありません"
+
+    if not isinstance(order_data['customer_name'], str):
+        return False, "customer_name は文字列である必要があります"
+
+    if len(order_data['customer_name'].strip()) == 0:
+        return False, "customer_name は空にできません"
+
+    if not isinstance(order_data['items'], list):
+        return False, "items は配列である必要があります"
+
+    if len(order_data['items']) == 0:
+        return False, "items は少なくとも1つの商品を含む必要があります"
+
+    for i, item in enumerate(order_data['items']):
+        if not isinstance(item, dict):
+            return False, f"items[{i}] はオブジェクトである必要があります"
+
+        item_required = ['name', 'quantity', 'price']
+        for field in item_required:
+            if field not in item:
+                return False, f"items[{i}] に '{field}' がありません"
+
+        if not isinstance(item['quantity'], int) or item['quantity'] <= 0:
+            return False, f"items[{i}].quantity は正の整数である必要があります"
+
+        if not isinstance(item['price'], (int, float)) or item['price'] < 0:
+            return False, f"items[{i}].price は0以上の数値である必要があります"
+
+    if not isinstance(order_data['total_amount'], (int, float)):
+        return False, "total_amount は数値である必要があります"
+
+    if order_data['total_amount'] < 0:
+        return False, "total_amount は0以上である必要があります"
+
+    return True, ""
+
+
+def load_producer(disable_numpy: bool):
+    """Producer Lambda の index.py を読み込む（boto3 クライアント作成のためにリージョンを補う）"""
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-1')
+    spec = importlib.util.spec_from_file_location('producer_index', PRODUCER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if disable_numpy:
+        module.numpy = None
+    return module
+
+
+def build_order(item_count: int, rng: random.Random) -> dict:
+    items = [
+        {
+            'name': f'item-{i}',
+            'quantity': rng.randint(1, 5),
+            'price': round(rng.uniform(1, 5000), 2)
+        }
+        for i in range(item_count)
+    ]
+    return {
+        'customer_name': '山田太郎',
+        'items': items,
+        'total_amount': round(sum(item['quantity'] * item['price'] for item in items), 2)
+    }
+
+
+def best_per_call(func, order: dict, repeat: int) -> float:
+    """timeit の最良値から 1 回あたりの実行時間（マイクロ秒）を求める"""
+    timer = timeit.Timer(lambda: func(order))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='validate_order のマイクロベンチマーク')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-numpy', action='store_true', help='NumPy を使わずに計測する')
+    args = parser.parse_args()
+
+    producer = load_producer(args.no_numpy)
+    rng = random.Random(args.seed)
+
+    print(f"numpy: {'enabled' if producer.numpy is not None else 'disabled'}"
+          f" (NUMPY_TOTAL_MIN_ITEMS={producer.NUMPY_TOTAL_MIN_ITEMS})")
+    print(f"{'items':>8} {'legacy (us)':>14} {'compiled (us)':>14} {'speedup':>9}")
+
+    for size in args.sizes:
+        order = build_order(size, rng)
+        # 正しい注文はどちらの検証でも有効と判定されることを確認する
+        assert legacy_validate_order(order) == (True, '')
+        assert producer.validate_order(order) == (True, ''), producer.validate_order(order)
+
+        legacy_us = best_per_call(legacy_validate_order, order, args.repeat)
+        compiled_us = best_per_call(producer.validate_order, order, args.repeat)
+        print(f"{size:>8} {legacy_us:>14.1f} {compiled_us:>14.1f} {legacy_us / compiled_us:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -25,36 +25,418 @@ SQS キューからメッセージを受信し、注文を処理して DynamoDB
    - これにより、タイムアウト時にメッセージが再処理される
 """
 
+import gzip
+import hashlib
 import json
 import logging
 import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from decimal import Decimal
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+# Producer が zstd で圧縮したペイロードを展開するために使用する（任意の依存）
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 破損したペイロードの展開で発生する例外（gzip は OSError / EOFError、zstandard は ZstdError）
+DECOMPRESSION_ERRORS = (OSError, EOFError, ValueError) + ((zstandard.ZstdError,) if zstandard else ())
+
 # ============================================================================
 # ロガーの設定
 # ============================================================================
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# ============================================================================
+# 並列処理の設定
+# ============================================================================
+# CONSUMER_CONCURRENCY: 1 回の呼び出し内でレコードを同時に処理するスレッド数（1 なら順番に処理）
+# FIFO_GROUP_WORKERS: FIFO キューで異なるメッセージグループを並列に処理するスレッド数
+CONSUMER_CONCURRENCY = max(1, int(os.environ.get('CONSUMER_CONCURRENCY', '1')))
+FIFO_GROUP_WORKERS = int(os.environ.get('FIFO_GROUP_WORKERS', '4'))
+
 # ============================================================================
 # AWS クライアントの初期化（ハンドラー外で行う）
 # ============================================================================
 # DynamoDB リソース（高レベル API）を使用
 # Table クラスを使用すると、より Pythonic なコードが書ける
-dynamodb = boto3.resource('dynamodb')
+#
+# ワーカースレッドからも同じクライアントの接続プールを使うため、
+# プールの上限（既定 10）を同時に処理するスレッド数以上にしておく
+#
+# DynamoDB はスロットリング時に SDK 内部で長く再試行し続けないよう、standard モードで試行回数を抑える
+# （legacy モードの DynamoDB は最大 10 回再試行する）
+# 残りはバッチ単位のバックプレッシャー（ThrottleCooldown）と SQS の再配信に任せる
+# S3（Claim-Check の取得）はスロットリングの検出対象ではないため、SDK 既定の再試行のままにする
+client_config = Config(max_pool_connections=max(10, CONSUMER_CONCURRENCY, FIFO_GROUP_WORKERS))
+dynamodb_config = client_config.merge(Config(
+    retries={'mode': 'standard', 'max_attempts': int(os.environ.get('AWS_CLIENT_MAX_ATTEMPTS', '3'))}
+))
+dynamodb = boto3.resource('dynamodb', config=dynamodb_config)
+s3_client = boto3.client('s3', config=client_config)
 
 # 環境変数から設定を取得
 DYNAMODB_TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME')
 
+# Claim-Check: 大きな注文本文が保存されているバケット
+# メッセージ内のポインターがこのバケット以外を指している場合は処理しない
+CLAIM_CHECK_BUCKET = os.environ.get('CLAIM_CHECK_BUCKET')
+
 # テーブルオブジェクトの取得
 # 注意: テーブルが存在しない場合でも、この時点ではエラーにならない
 # 実際のアクセス時にエラーになる
+# ワーカースレッドも同じ table（同じクライアントの接続プール）を共有する
+# 使うのは put_item などのアクション（内部でスレッドセーフなクライアントを呼ぶ）だけで、
+# load() / reload() のようにリソースの状態を書き換える操作は行わない
 table = dynamodb.Table(DYNAMODB_TABLE_NAME) if DYNAMODB_TABLE_NAME else None
 
+# ============================================================================
+# FIFO キューのメッセージグループ並列処理の設定
+# ============================================================================
+# FIFO キューでは、同じ MessageGroupId のメッセージは順番に処理する必要があるが、
+# 異なるグループのメッセージは並列に処理してよい
+group_executor = ThreadPoolExecutor(max_workers=FIFO_GROUP_WORKERS)
+
+# 標準キューのレコードを同時に処理するスレッドプール（CONSUMER_CONCURRENCY > 1 の場合のみ使用）
+record_executor = ThreadPoolExecutor(max_workers=CONSUMER_CONCURRENCY)
+
+# ============================================================================
+# DynamoDB への保存方式
+# ============================================================================
+# - single（既定）: レコードごとに条件付き PutItem（attribute_not_exists）
+# - batch（オプトイン）: バッチ全体を BatchGetItem で既存チェックし、新しい注文だけを BatchWriteItem で書き込む
+#          10 件のバッチでも DynamoDB への往復は 2 回（+ 未処理分の再送）で済む
+#          ただし既存チェックと書き込みの間は保護されず、同時に届いた同じ注文は後の書き込みで上書きされる
+# FIFO キューのメッセージは順序を保つため、常にグループごとに 1 件ずつ保存する
+PERSISTENCE_MODE = os.environ.get('PERSISTENCE_MODE', 'single')
+# BatchGetItem / BatchWriteItem の 1 リクエストあたりの上限
+BATCH_GET_MAX_KEYS = 100
+BATCH_WRITE_MAX_ITEMS = 25
+# UnprocessedKeys / UnprocessedItems を再送する最大試行回数（初回を含む）と待機時間の基準
+PERSISTENCE_MAX_ATTEMPTS = int(os.environ.get('PERSISTENCE_MAX_ATTEMPTS', '4'))
+PERSISTENCE_BASE_DELAY_SECONDS = 0.05
+
+# ============================================================================
+# 顧客ごとの集計（注文数・売上）
+# ============================================================================
+# 保存できた注文を customer_name ごとにまとめ、顧客 1 人につき 1 回の UpdateItem（ADD）で
+# 集計テーブルに加算する。ダッシュボードは orders テーブルをスキャンせずに集計を読める
+#
+# 【再配信への対策（べき等性）】
+# 加算と同じトランザクションで、注文ごとの「適用済み」マーカーを条件付き（attribute_not_exists）で書き込む
+# 既に適用済みの注文が含まれているとトランザクション全体がキャンセルされるので、
+# その注文を除いてやり直す。マーカーは orders テーブルとは別のテーブルに置く
+# （BatchWriteItem は条件を付けられず、同じ注文の二重書き込みでアイテムが丸ごと上書きされるため）
+CUSTOMER_AGGREGATES_TABLE_NAME = os.environ.get('CUSTOMER_AGGREGATES_TABLE_NAME')
+AGGREGATE_MARKERS_TABLE_NAME = os.environ.get('AGGREGATE_MARKERS_TABLE_NAME')
+# マーカーは SQS の最大保持期間（14 日）より長く残す
+AGGREGATE_MARKER_TTL_DAYS = 15
+# TransactWriteItems の 1 リクエストあたりの上限
+TRANSACT_MAX_ITEMS = 100
+# TransactWriteItems の CancellationReasons のうち、スロットリングを表すコード
+TRANSACT_THROTTLE_CODES = frozenset({'ThrottlingError', 'ProvisionedThroughputExceeded'})
+
+# ============================================================================
+# DynamoDB のスロットリングへの対応（バックプレッシャー）
+# ============================================================================
+# スロットリングを検出したら、バッチの残りのレコードは DynamoDB に送らずにすぐリトライへ回す
+# さらに実行環境（コンテナ）単位のクールダウンを設け、次の呼び出しは待ってから処理を始める
+# 連続してスロットリングが起きた呼び出しごとに、クールダウンを倍にする（上限あり）
+THROTTLE_ERROR_CODES = frozenset({
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded'
+})
+THROTTLE_COOLDOWN_SECONDS = float(os.environ.get('THROTTLE_COOLDOWN_SECONDS', '0.5'))
+THROTTLE_COOLDOWN_MAX_SECONDS = float(os.environ.get('THROTTLE_COOLDOWN_MAX_SECONDS', '5'))
+
+
+class ThrottleCooldown:
+    """
+    DynamoDB のスロットリング状態（実行環境ごと）
+
+    - tripped: 現在の呼び出しでスロットリングが起きたか（呼び出しの開始時にリセット）
+    - streak: スロットリングが起きた呼び出しの連続回数（クールダウンの倍率に使う）
+    - cooldown_until: 次の呼び出しが処理を始めてよい時刻（time.monotonic）
+
+    ワーカースレッドからも更新されるため、ロックで保護する
+    """
+
+    def __init__(self, base_seconds: float, max_seconds: float):
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.tripped = False
+        self.streak = 0
+        self.cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def begin_invocation(self) -> float:
+        """呼び出しの開始時に、残っているクールダウンの間だけ待機し、待機した秒数を返す"""
+        with self._lock:
+            self.tripped = False
+            wait_seconds = min(self.cooldown_until - time.monotonic(), self.max_seconds)
+        if wait_seconds <= 0:
+            return 0.0
+        time.sleep(wait_seconds)
+        return wait_seconds
+
+    def trip(self) -> None:
+        """スロットリングを記録する（同じ呼び出しの中で 2 回目以降はクールダウンを延ばさない）"""
+        with self._lock:
+            if self.tripped:
+                return
+            self.tripped = True
+            self.streak += 1
+            cooldown = min(self.base_seconds * (2 ** (self.streak - 1)), self.max_seconds)
+            self.cooldown_until = time.monotonic() + cooldown
+
+    def end_invocation(self) -> None:
+        """スロットリングなしで終わった呼び出しがあれば、連続回数をリセットする"""
+        with self._lock:
+            if not self.tripped:
+                self.streak = 0
+
+
+throttle_cooldown = ThrottleCooldown(THROTTLE_COOLDOWN_SECONDS, THROTTLE_COOLDOWN_MAX_SECONDS)
+_thread_throttle_cooldown = threading.local()
+
+
+def use_throttle_cooldown(cooldown: ThrottleCooldown) -> None:
+    """
+    現在のスレッドで使うスロットリング状態を設定する
+
+    tripped と streak は 1 回の呼び出し単位の状態のため、複数の呼び出しを同時に実行するワーカーの
+    ポーリングスレッドは、それぞれ自分用の状態を持つ（別のスレッドの呼び出しの開始・終了で消されないようにする）
+    """
+    _thread_throttle_cooldown.cooldown = cooldown
+
+
+def current_throttle_cooldown() -> ThrottleCooldown:
+    """
+    現在のスレッドのスロットリング状態を返す
+
+    use_throttle_cooldown を呼んでいないスレッド（Lambda のハンドラーとスレッドプール）は、
+    実行環境で共有する throttle_cooldown を使う
+    """
+    return getattr(_thread_throttle_cooldown, 'cooldown', throttle_cooldown)
+
+
+def is_throttling_error(error: ClientError) -> bool:
+    return error.response['Error']['Code'] in THROTTLE_ERROR_CODES
+
+
+# ============================================================================
+# 保存済み注文のプロセス内キャッシュ（再配信の重複排除）
+# ============================================================================
+# SQS の再配信やリトライされたバッチでは、既に保存済みの注文が再び届く
+# 条件付き書き込みは ConditionalCheckFailedException で弾かれるが、それでも往復と書き込み容量を使う
+# ウォームスタートの間に保存（と集計）を終えた注文のキーを覚えておき、
+# 同じ注文が届いたら DynamoDB に問い合わせずに処理済みとして扱う
+#
+# 偽陽性のあるブルームフィルターは使わない（保存していない注文を処理済みと誤判定すると注文が失われる）
+# キャッシュは実行環境ごとなので、取りこぼしは従来どおり DynamoDB の条件付き書き込みで判定する
+PERSISTED_CACHE_SIZE = int(os.environ.get('PERSISTED_CACHE_SIZE', '10000'))
+
+
+class RecentlyPersistedOrders:
+    """
+    直近に保存した注文のキー (order_id, created_at) の LRU セット
+
+    ワーカースレッドからも参照・追加されるため、ロックで保護する
+    ヒット率をログに出すため、問い合わせ回数とヒット回数を数える
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.lookups = 0
+        self.hits = 0
+        self._keys: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def contains(self, key: tuple) -> bool:
+        with self._lock:
+            self.lookups += 1
+            if key not in self._keys:
+                return False
+            self.hits += 1
+            self._keys.move_to_end(key)
+            return True
+
+    def add(self, keys) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            for key in keys:
+                self._keys[key] = None
+                self._keys.move_to_end(key)
+            while len(self._keys) > self.max_size:
+                self._keys.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'dedupe_lookups': self.lookups,
+                'dedupe_hits': self.hits,
+                'dedupe_hit_rate': round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+                'dedupe_cache_size': len(self._keys)
+            }
+
+
+recently_persisted_orders = RecentlyPersistedOrders(PERSISTED_CACHE_SIZE)
+
+
+# ============================================================================
+# エンドツーエンドのレイテンシー計測
+# ============================================================================
+# レコードごとに次の区間の時間（ミリ秒）を計測し、呼び出しの最後に
+# CloudWatch の Embedded Metric Format（EMF）で標準出力に書き出す
+# EMF のログは CloudWatch Logs に届くとカスタムメトリクスとして取り込まれる
+#
+# - ProducerMs: Producer がリクエストを受け取ってから SQS に送信するまで
+# - QueueWaitMs: SQS に届いてから最初に受信されるまで（SentTimestamp → ApproximateFirstReceiveTimestamp）
+# - DispatchDelayMs: 最初に受信されてから処理を始めるまで（バッチウィンドウでの待ちと Lambda の起動）
+# - ProcessingMs: パース・S3 からの取得・注文処理
+# - WriteMs: DynamoDB への書き込み（batch モードではバッチ全体の BatchGetItem + BatchWriteItem）
+# - EndToEndMs: Producer がリクエストを受け取ってから書き込みが終わるまで
+#
+# scripts/latency_report.py でパーセンタイルに集計できる
+LATENCY_METRICS_ENABLED = os.environ.get('LATENCY_METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'OrderPipeline')
+METRICS_SERVICE_NAME = os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'order-consumer')
+LATENCY_METRIC_NAMES = ('ProducerMs', 'QueueWaitMs', 'DispatchDelayMs', 'ProcessingMs', 'WriteMs', 'EndToEndMs')
+# EMF の 1 つのメトリクスに含められる値の上限
+EMF_MAX_VALUES = 100
+
+
+def epoch_millis() -> float:
+    """現在時刻の UNIX エポックミリ秒（マイクロ秒までの小数付き）"""
+    return time.time_ns() / 1_000_000
+
+
+def message_attribute_number(record: dict, name: str):
+    """Producer が付与した数値のメッセージ属性を取り出す（ない場合は None）"""
+    attribute = (record.get('messageAttributes') or {}).get(name) or {}
+    value = attribute.get('stringValue')
+    return float(value) if value is not None else None
+
+
+class LatencyRecorder:
+    """
+    レコードごとのレイテンシーを集め、EMF のログとして書き出す
+
+    ワーカースレッドからも追加されるため、ロックで保護する
+    """
+
+    def __init__(self):
+        self._samples: list = []
+        self._lock = threading.Lock()
+
+    def add(self, record: dict, started_at_ms: float, processing_ms: float, write_ms: float) -> None:
+        if not LATENCY_METRICS_ENABLED:
+            return
+        completed_at_ms = epoch_millis()
+        attributes = record.get('attributes') or {}
+        sent_at = float(attributes['SentTimestamp']) if 'SentTimestamp' in attributes else None
+        first_received_at = (
+            float(attributes['ApproximateFirstReceiveTimestamp'])
+            if 'ApproximateFirstReceiveTimestamp' in attributes else None
+        )
+        received_at = message_attribute_number(record, 'RequestReceivedAt')
+        enqueued_at = message_attribute_number(record, 'EnqueuedAt')
+
+        sample = {
+            'ProcessingMs': processing_ms,
+            'WriteMs': write_ms
+        }
+        if received_at is not None and enqueued_at is not None:
+            sample['ProducerMs'] = enqueued_at - received_at
+        if sent_at is not None and first_received_at is not None:
+            sample['QueueWaitMs'] = first_received_at - sent_at
+        if first_received_at is not None:
+            sample['DispatchDelayMs'] = started_at_ms - first_received_at
+        origin = received_at if received_at is not None else sent_at
+        if origin is not None:
+            sample['EndToEndMs'] = completed_at_ms - origin
+
+        trace_id = ((record.get('messageAttributes') or {}).get('TraceId') or {}).get('stringValue')
+        with self._lock:
+            self._samples.append((trace_id, sample))
+
+    def flush(self, batch_size: int, persistence_mode: str) -> None:
+        """
+        集めた値を EMF のログとして書き出す（1 行あたり最大 EMF_MAX_VALUES 件）
+
+        Args:
+            batch_size: サンプルを集めた呼び出し（ワーカーでは受信 1 回）のレコード数
+            persistence_mode: 実際に使った保存方法（FIFO キューとワーカーは常に 'single'）
+        """
+        with self._lock:
+            samples, self._samples = self._samples, []
+        for start in range(0, len(samples), EMF_MAX_VALUES):
+            chunk = samples[start:start + EMF_MAX_VALUES]
+            values = {
+                name: [round(sample[name], 3) for _, sample in chunk if name in sample]
+                for name in LATENCY_METRIC_NAMES
+            }
+            # 値がないメトリクス（属性のないメッセージなど）は宣言しない
+            values = {name: metric_values for name, metric_values in values.items() if metric_values}
+            document = {
+                '_aws': {
+                    'Timestamp': int(time.time() * 1000),
+                    'CloudWatchMetrics': [{
+                        'Namespace': METRICS_NAMESPACE,
+                        'Dimensions': [['Service']],
+                        'Metrics': [{'Name': name, 'Unit': 'Milliseconds'} for name in values]
+                    }]
+                },
+                'Service': METRICS_SERVICE_NAME,
+                # 以下はメトリクスにはならないプロパティ（レポートでのグループ分けやトレースに使う）
+                'BatchSize': batch_size,
+                'ConsumerConcurrency': CONSUMER_CONCURRENCY,
+                'PersistenceMode': persistence_mode,
+                'TraceIds': [trace_id for trace_id, _ in chunk],
+                **values
+            }
+            # EMF はログイベント全体が JSON である必要があるため、ロガーの書式を通さずに出力する
+            # ワーカーでは複数のスレッドが書き出すため、改行まで 1 回の write で出力して行が混ざらないようにする
+            sys.stdout.write(json.dumps(document) + '\n')
+            sys.stdout.flush()
+
+
+latency_recorder = LatencyRecorder()
+_thread_latency_recorder = threading.local()
+
+
+def use_latency_recorder(recorder: LatencyRecorder) -> None:
+    """
+    現在のスレッドで使うレイテンシーの記録先を設定する
+
+    flush は記録先のサンプルをすべて書き出すため、複数の呼び出しを同時に実行するワーカーの
+    ポーリングスレッドは、それぞれ自分用の記録先を持つ（別のスレッドのサンプルを書き出さないようにする）
+    """
+    _thread_latency_recorder.recorder = recorder
+
+
+def current_latency_recorder() -> LatencyRecorder:
+    """
+    現在のスレッドのレイテンシーの記録先を返す
+
+    use_latency_recorder を呼んでいないスレッド（Lambda のハンドラーとスレッドプール）は、
+    実行環境で共有する latency_recorder を使う
+    """
+    return getattr(_thread_latency_recorder, 'recorder', latency_recorder)
+
 
 class OrderProcessingError(Exception):
     """
@@ -72,27 +454,131 @@ class OrderProcessingError(Exception):
         super().__init__(self.message)
 
 
-def convert_to_decimal(obj):
+def decode_order_json(data):
     """
-    Python の float を DynamoDB 用の Decimal に変換する
+    JSON をパースし、小数を最初から Decimal として読み込む
     
     【DynamoDB と数値型】
     DynamoDB は float を直接サポートしていない
     boto3 の Table リソースを使用する場合、float は Decimal に変換する必要がある
     
+    json.loads の parse_float=Decimal を使うと、パーサーが小数のトークンを
+    そのまま Decimal にするため、パース後に dict / list を丸ごと作り直す必要がない
+    （文字列から直接作るので、float を経由した丸め誤差も入らない）
+    
     Args:
-        obj: 変換するオブジェクト（dict, list, float, その他）
+        data: JSON 文字列またはバイト列
         
     Returns:
-        Decimal に変換されたオブジェクト
+        パース結果（小数は Decimal、整数は int）
+    """
+    return json.loads(data, parse_float=Decimal)
+
+
+def json_default(obj):
     """
-    if isinstance(obj, float):
-        return Decimal(str(obj))
-    elif isinstance(obj, dict):
-        return {k: convert_to_decimal(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_to_decimal(item) for item in obj]
-    return obj
+    ログ出力用: json.dumps で Decimal を数値として出力する
+    """
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def decompress_payload(data: bytes, encoding: str) -> bytes:
+    """
+    Producer が圧縮した注文本文を展開する
+
+    Args:
+        data: S3 から取得したバイト列
+        encoding: 圧縮方式（'gzip' または 'zstd'）
+
+    Returns:
+        bytes: 展開後の JSON バイト列
+    """
+    if encoding == 'gzip':
+        return gzip.decompress(data)
+    if encoding == 'zstd':
+        if zstandard is None:
+            # パッケージに zstandard が含まれていない設定ミスはリトライしても解決しない
+            raise OrderProcessingError(
+                'zstd で圧縮されたペイロードを展開できません（zstandard が未インストール）',
+                retryable=False
+            )
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise OrderProcessingError(f'未対応のエンコーディングです: {encoding}', retryable=False)
+
+
+def load_order_payload(message_data: dict) -> dict:
+    """
+    メッセージが Claim-Check（S3 へのポインター）であれば、S3 から注文本文を取得する
+
+    【Claim-Check パターン】
+    Producer は大きな注文本文を圧縮して S3 に保存し、
+    SQS には claim_check（bucket, key, encoding, sha256）だけを送信する
+    インラインで送られた小さな注文は、そのまま返す
+
+    Args:
+        message_data: SQS メッセージ本文をパースした辞書
+
+    Returns:
+        dict: 注文データ
+
+    Raises:
+        OrderProcessingError: 取得・展開・チェックサム検証に失敗した場合
+    """
+    claim_check = message_data.get('claim_check')
+    if not claim_check:
+        return message_data
+
+    order_id = message_data.get('order_id')
+    bucket = claim_check.get('bucket')
+    key = claim_check.get('key')
+
+    if not CLAIM_CHECK_BUCKET or bucket != CLAIM_CHECK_BUCKET:
+        raise OrderProcessingError(
+            f'想定外のバケットを参照しています: {bucket}',
+            order_id,
+            retryable=False
+        )
+
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+        data = response['Body'].read()
+    except ClientError as e:
+        error_code = e.response['Error']['Code']
+        # オブジェクトが存在しない（ライフサイクルで削除済みなど）場合はリトライしても解決しない
+        raise OrderProcessingError(
+            f'S3 からの注文本文の取得に失敗しました: {error_code}',
+            order_id,
+            retryable=error_code not in ('NoSuchKey', 'AccessDenied')
+        )
+
+    try:
+        payload = decompress_payload(data, claim_check.get('encoding', 'gzip'))
+    except DECOMPRESSION_ERRORS as e:
+        # gzip / zstd の展開エラー（破損したデータ）
+        raise OrderProcessingError(
+            f'注文本文の展開に失敗しました: {e}',
+            order_id,
+            retryable=False
+        )
+
+    if hashlib.sha256(payload).hexdigest() != claim_check.get('sha256'):
+        raise OrderProcessingError(
+            '注文本文のチェックサムが一致しません',
+            order_id,
+            retryable=False
+        )
+
+    logger.info(json.dumps({
+        'message': 'S3 から注文本文を取得しました',
+        'order_id': order_id,
+        's3_key': key,
+        'compressed_bytes': len(data),
+        'original_bytes': len(payload)
+    }, ensure_ascii=False))
+
+    return decode_order_json(payload)
 
 
 def process_order(order_data: dict) -> dict:
@@ -124,7 +610,7 @@ def process_order(order_data: dict) -> dict:
         'customer_name': customer_name,
         'item_count': len(items),
         'total_amount': total_amount
-    }, ensure_ascii=False))
+    }, ensure_ascii=False, default=json_default))
     
     # 各商品の処理をシミュレーション
     for i, item in enumerate(items):
@@ -139,7 +625,7 @@ def process_order(order_data: dict) -> dict:
             'quantity': quantity,
             'price': price,
             'subtotal': quantity * price
-        }, ensure_ascii=False))
+        }, ensure_ascii=False, default=json_default))
         
         # 実際の処理をここに実装
         # 例: 在庫確認、引き当て処理など
@@ -156,7 +642,38 @@ def process_order(order_data: dict) -> dict:
     }
 
 
-def save_to_dynamodb(order_data: dict, processing_result: dict) -> None:
+def build_order_item(order_data: dict, processing_result: dict) -> dict:
+    """
+    DynamoDB に保存するアイテムを作成する
+
+    Args:
+        order_data: 元の注文データ
+        processing_result: 処理結果
+
+    Returns:
+        dict: orders テーブルのアイテム
+    """
+    # TTL の計算（30日後）
+    # DynamoDB TTL は UNIX タイムスタンプ（秒）で指定
+    ttl_days = 30
+    expires_at = int((datetime.utcnow() + timedelta(days=ttl_days)).timestamp())
+    
+    return {
+        'order_id': order_data.get('order_id'),  # パーティションキー
+        'created_at': order_data.get('created_at'),
+        'customer_name': order_data.get('customer_name'),
+        # 小数はパース時に Decimal になっているため、そのまま保存できる
+        'items': order_data.get('items', []),
+        'total_amount': order_data.get('total_amount', 0),
+        'status': processing_result.get('status'),
+        'processed_at': processing_result.get('processed_at'),
+        'expires_at': expires_at,  # TTL 用
+        # トレース用の情報
+        'request_id': order_data.get('request_id')
+    }
+
+
+def save_to_dynamodb(order_data: dict, processing_result: dict) -> dict:
     """
     処理結果を DynamoDB に保存する
     
@@ -177,6 +694,9 @@ def save_to_dynamodb(order_data: dict, processing_result: dict) -> None:
         order_data: 元の注文データ
         processing_result: 処理結果
         
+    Returns:
+        dict: 保存した（または既に保存済みだった）アイテム
+        
     Raises:
         OrderProcessingError: DynamoDB への保存に失敗した場合
     """
@@ -189,24 +709,8 @@ def save_to_dynamodb(order_data: dict, processing_result: dict) -> None:
     
     order_id = order_data.get('order_id')
     
-    # TTL の計算（30日後）
-    # DynamoDB TTL は UNIX タイムスタンプ（秒）で指定
-    ttl_days = 30
-    expires_at = int((datetime.utcnow() + timedelta(days=ttl_days)).timestamp())
-    
     # 保存するアイテムの作成
-    item = {
-        'order_id': order_id,  # パーティションキー
-        'created_at': order_data.get('created_at'),
-        'customer_name': order_data.get('customer_name'),
-        'items': convert_to_decimal(order_data.get('items', [])),
-        'total_amount': convert_to_decimal(order_data.get('total_amount', 0)),
-        'status': processing_result.get('status'),
-        'processed_at': processing_result.get('processed_at'),
-        'expires_at': expires_at,  # TTL 用
-        # トレース用の情報
-        'request_id': order_data.get('request_id')
-    }
+    item = build_order_item(order_data, processing_result)
     
     logger.info(json.dumps({
         'message': 'DynamoDB にデータを保存します',
@@ -239,7 +743,12 @@ def save_to_dynamodb(order_data: dict, processing_result: dict) -> None:
                 'order_id': order_id
             }, ensure_ascii=False))
             # エラーをスローせず、正常終了とする
-            return
+            # 集計が未適用の可能性があるため、アイテムは返す
+            return item
+        
+        if is_throttling_error(e):
+            # バッチの残りのレコードは DynamoDB に送らずにリトライへ回す
+            current_throttle_cooldown().trip()
         
         # その他の DynamoDB エラー
         logger.error(json.dumps({
@@ -254,6 +763,8 @@ def save_to_dynamodb(order_data: dict, processing_result: dict) -> None:
             order_id,
             retryable=True
         )
+    
+    return item
 
 
 def process_single_message(record: dict) -> None:
@@ -274,6 +785,58 @@ def process_single_message(record: dict) -> None:
         OrderProcessingError: 処理に失敗した場合
     """
     message_id = record.get('messageId', 'unknown')
+    started_at_ms = epoch_millis()
+    started = time.perf_counter()
+    
+    order_data = parse_order_message(record)
+    order_id = order_data.get('order_id', 'unknown')
+    
+    # この実行環境で保存済みの注文なら、DynamoDB に問い合わせずに処理済みとする
+    order_key = (order_data.get('order_id'), order_data.get('created_at'))
+    if recently_persisted_orders.contains(order_key):
+        logger.info(json.dumps({
+            'message': '注文は既に処理済みです（プロセス内キャッシュ）',
+            'message_id': message_id,
+            'order_id': order_id
+        }, ensure_ascii=False))
+        return
+    
+    # 注文処理の実行
+    processing_result = process_order(order_data)
+    processed = time.perf_counter()
+    
+    # DynamoDB への保存
+    item = save_to_dynamodb(order_data, processing_result)
+    written = time.perf_counter()
+    
+    # 顧客ごとの集計（1 件ずつ処理するモードでは注文ごとに加算する）
+    if apply_customer_aggregates([item]):
+        raise OrderProcessingError('顧客ごとの集計の更新に失敗しました', order_id, retryable=True)
+    
+    recently_persisted_orders.add([order_key])
+    current_latency_recorder().add(record, started_at_ms, (processed - started) * 1000, (written - processed) * 1000)
+    
+    logger.info(json.dumps({
+        'message': 'メッセージの処理が完了しました',
+        'message_id': message_id,
+        'order_id': order_id
+    }, ensure_ascii=False))
+
+
+def parse_order_message(record: dict) -> dict:
+    """
+    SQS メッセージから注文データを取り出す（Claim-Check の場合は S3 から取得する）
+
+    Args:
+        record: SQS メッセージレコード
+
+    Returns:
+        dict: 注文データ
+
+    Raises:
+        OrderProcessingError: パース・取得に失敗した場合
+    """
+    message_id = record.get('messageId', 'unknown')
     
     logger.info(json.dumps({
         'message': 'メッセージの処理を開始します',
@@ -285,7 +848,7 @@ def process_single_message(record: dict) -> None:
     # メッセージボディのパース
     try:
         body = record.get('body', '{}')
-        order_data = json.loads(body)
+        order_data = decode_order_json(body)
     except json.JSONDecodeError as e:
         logger.error(json.dumps({
             'message': 'メッセージのパースに失敗しました',
@@ -298,19 +861,607 @@ def process_single_message(record: dict) -> None:
             retryable=False
         )
     
-    order_id = order_data.get('order_id', 'unknown')
+    # 大きな注文は S3 に保存されているため、ポインターから本文を取得する
+    order_data = load_order_payload(order_data)
+    validate_order_key(order_data, message_id)
+    return order_data
+
+
+def validate_order_key(order_data: dict, message_id: str) -> None:
+    """
+    orders テーブルのキー（order_id, created_at）が文字列で入っているかを確認する
+
+    キーがないアイテムは BatchGetItem / BatchWriteItem のリクエスト全体を ValidationException にするため、
+    バッチにまとめる前にそのレコードだけを失敗させる
+
+    Raises:
+        OrderProcessingError: キーがない場合（リトライしても解決しないため、リトライ不可）
+    """
+    missing = [
+        name for name in ('order_id', 'created_at')
+        if not isinstance(order_data.get(name), str) or not order_data.get(name)
+    ]
+    if missing:
+        logger.error(json.dumps({
+            'message': '注文データにキー属性がありません',
+            'message_id': message_id,
+            'missing': missing
+        }, ensure_ascii=False))
+        raise OrderProcessingError(
+            f"注文データにキー属性がありません: {', '.join(missing)}",
+            order_data.get('order_id') if isinstance(order_data.get('order_id'), str) else None,
+            retryable=False
+        )
+
+
+def handle_record(record: dict):
+    """
+    1 件のメッセージを処理し、リトライが必要な場合は batchItemFailures の要素を返す
+
+    Args:
+        record: SQS メッセージレコード
+
+    Returns:
+        dict | None: 失敗時は {'itemIdentifier': messageId}、成功またはリトライ不要なら None
+    """
+    if current_throttle_cooldown().tripped:
+        # この呼び出しで DynamoDB がスロットリングしたため、処理せずにリトライへ回す
+        return {'itemIdentifier': record.get('messageId', 'unknown')}
     
-    # 注文処理の実行
-    processing_result = process_order(order_data)
+    try:
+        # 単一メッセージの処理
+        process_single_message(record)
+    except Exception as e:
+        return record_failure(record, e)
     
-    # DynamoDB への保存
-    save_to_dynamodb(order_data, processing_result)
+    return None
+
+
+def record_failure(record: dict, error: Exception):
+    """
+    レコードの処理中に発生した例外をログに記録し、batchItemFailures の要素に変換する
+
+    Args:
+        record: SQS メッセージレコード
+        error: 発生した例外
+
+    Returns:
+        dict | None: リトライが必要なら {'itemIdentifier': messageId}、不要なら None
+    """
+    message_id = record.get('messageId', 'unknown')
     
-    logger.info(json.dumps({
-        'message': 'メッセージの処理が完了しました',
+    if isinstance(error, OrderProcessingError):
+        # カスタム例外の処理
+        logger.error(json.dumps({
+            'message': '注文処理エラー',
+            'message_id': message_id,
+            'order_id': error.order_id,
+            'error': error.message,
+            'retryable': error.retryable
+        }, ensure_ascii=False))
+        
+        if error.retryable:
+            # リトライ可能なエラーの場合、失敗リストに追加
+            return {'itemIdentifier': message_id}
+        # リトライ不可の場合は、失敗リストに追加しない
+        # → メッセージは削除され、DLQ に送られる（DLQ 設定がある場合）
+        return None
+    
+    # 予期しないエラー
+    logger.error(json.dumps({
+        'message': '予期しないエラーが発生しました',
         'message_id': message_id,
-        'order_id': order_id
+        'error': str(error),
+        'error_type': type(error).__name__
+    }, ensure_ascii=False), exc_info=error)
+    
+    # 予期しないエラーはリトライする
+    return {'itemIdentifier': message_id}
+
+
+def backoff_sleep(attempt: int) -> None:
+    """未処理分を再送する前に、指数バックオフ + ジッターで待機する"""
+    time.sleep(PERSISTENCE_BASE_DELAY_SECONDS * (2 ** (attempt - 1)) * (1 + random.random()))
+
+
+def batch_get_existing_keys(keys: list) -> set:
+    """
+    BatchGetItem で、既に保存済みの注文のキー (order_id, created_at) を取得する
+
+    UnprocessedKeys（スロットリングなどで読めなかったキー）はバックオフして再送する
+
+    Raises:
+        OrderProcessingError: 再送しても読めなかったキーが残った場合（リトライ可能）
+    """
+    existing = set()
+    for start in range(0, len(keys), BATCH_GET_MAX_KEYS):
+        request_items = {
+            DYNAMODB_TABLE_NAME: {
+                'Keys': [
+                    {'order_id': order_id, 'created_at': created_at}
+                    for order_id, created_at in keys[start:start + BATCH_GET_MAX_KEYS]
+                ],
+                # 存在確認だけなので、キー属性だけを読む（読み込みサイズを抑える）
+                'ProjectionExpression': 'order_id, created_at',
+                'ConsistentRead': True
+            }
+        }
+        for attempt in range(PERSISTENCE_MAX_ATTEMPTS):
+            if attempt > 0:
+                backoff_sleep(attempt)
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            for item in response.get('Responses', {}).get(DYNAMODB_TABLE_NAME, []):
+                existing.add((item['order_id'], item['created_at']))
+            request_items = response.get('UnprocessedKeys') or {}
+            if not request_items:
+                break
+        if request_items:
+            # 再送しても残る UnprocessedKeys はスロットリングによるもの
+            current_throttle_cooldown().trip()
+            raise OrderProcessingError('BatchGetItem の未処理キーが残りました', retryable=True)
+    return existing
+
+
+def batch_write_items(items: list) -> tuple:
+    """
+    BatchWriteItem で注文を書き込み、書き込めなかったアイテムのキーを返す
+
+    UnprocessedItems はバックオフして再送する
+    呼び出し自体が失敗したチャンクは、すべて書き込めなかったものとして扱う
+    ただし ValidationException のチャンクは、どのアイテムが原因かを切り分けるため 1 件ずつ書き込み直す
+    スロットリングを検出した後のチャンクは書き込まずに、すべて書き込めなかったものとして扱う
+
+    Returns:
+        tuple: (書き込めなかったアイテムのキーの set（リトライ可能）,
+                DynamoDB に拒否されたアイテムのキーの set（リトライ不可）)
+    """
+    failed_keys = set()
+    rejected_keys = set()
+    for start in range(0, len(items), BATCH_WRITE_MAX_ITEMS):
+        chunk = items[start:start + BATCH_WRITE_MAX_ITEMS]
+        request_items = {
+            DYNAMODB_TABLE_NAME: [{'PutRequest': {'Item': item}} for item in chunk]
+        }
+        if current_throttle_cooldown().tripped:
+            failed_keys.update((item['order_id'], item['created_at']) for item in chunk)
+            continue
+        try:
+            for attempt in range(PERSISTENCE_MAX_ATTEMPTS):
+                if attempt > 0:
+                    backoff_sleep(attempt)
+                response = dynamodb.batch_write_item(RequestItems=request_items)
+                request_items = response.get('UnprocessedItems') or {}
+                if not request_items:
+                    break
+            else:
+                # 再送しても残る UnprocessedItems はスロットリングによるもの
+                current_throttle_cooldown().trip()
+        except ClientError as e:
+            if is_throttling_error(e):
+                current_throttle_cooldown().trip()
+            logger.error(json.dumps({
+                'message': 'BatchWriteItem に失敗しました',
+                'error_code': e.response['Error']['Code'],
+                'item_count': len(chunk)
+            }, ensure_ascii=False))
+            if e.response['Error']['Code'] == 'ValidationException':
+                chunk_failed, chunk_rejected = put_items_individually(chunk)
+                failed_keys |= chunk_failed
+                rejected_keys |= chunk_rejected
+                continue
+            request_items = {DYNAMODB_TABLE_NAME: [{'PutRequest': {'Item': item}} for item in chunk]}
+
+        for request in request_items.get(DYNAMODB_TABLE_NAME, []):
+            item = request['PutRequest']['Item']
+            failed_keys.add((item['order_id'], item['created_at']))
+    return failed_keys, rejected_keys
+
+
+def put_items_individually(items: list) -> tuple:
+    """
+    BatchWriteItem が ValidationException になったチャンクを、条件付き PutItem で 1 件ずつ書き込む
+
+    Returns:
+        tuple: (書き込めなかったキーの set（リトライ可能）, 拒否されたキーの set（リトライ不可）)
+    """
+    failed_keys = set()
+    rejected_keys = set()
+    for item in items:
+        key = (item['order_id'], item['created_at'])
+        try:
+            table.put_item(Item=item, ConditionExpression='attribute_not_exists(order_id)')
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code == 'ConditionalCheckFailedException':
+                # BatchGetItem の後に別の呼び出しが保存した（保存済みとして扱う）
+                continue
+            if error_code == 'ValidationException':
+                logger.error(json.dumps({
+                    'message': 'DynamoDB にアイテムを拒否されました',
+                    'order_id': item['order_id'],
+                    'error_message': e.response['Error']['Message']
+                }, ensure_ascii=False))
+                rejected_keys.add(key)
+                continue
+            if is_throttling_error(e):
+                current_throttle_cooldown().trip()
+            failed_keys.add(key)
+    return failed_keys, rejected_keys
+
+
+def chunk_aggregate_orders(items: list) -> list:
+    """
+    注文を TransactWriteItems の単位に分ける
+
+    1 つのトランザクションに含める顧客ごとの Update（1 件）とマーカーの Put（注文ごとに 1 件）の
+    合計が TRANSACT_MAX_ITEMS を超えないようにする
+    同じアイテムを 1 つのトランザクションで 2 回更新できないため、顧客はチャンク内で 1 回だけ現れる
+
+    Returns:
+        list: チャンクごとの {customer_name: [item, ...]}
+    """
+    by_customer: dict = {}
+    for item in items:
+        by_customer.setdefault(item['customer_name'], []).append(item)
+
+    chunks = []
+    current: dict = {}
+    size = 0
+    for customer_name, orders in by_customer.items():
+        while orders:
+            if TRANSACT_MAX_ITEMS - size < 2:
+                chunks.append(current)
+                current, size = {}, 0
+            take = orders[:TRANSACT_MAX_ITEMS - size - 1]
+            orders = orders[len(take):]
+            current[customer_name] = take
+            size += len(take) + 1
+            if orders:
+                # 同じ顧客の残りは次のチャンクへ
+                chunks.append(current)
+                current, size = {}, 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_aggregate_transaction(chunk: dict, now: str) -> list:
+    """
+    顧客ごとの加算（Update + ADD）と、注文ごとの適用済みマーカー（条件付き Put）を作る
+
+    dynamodb リソースのクライアントは Python の値を DynamoDB の型に自動で変換するため、
+    {'S': ...} のような型付きの表現は使わない
+
+    Returns:
+        list: TransactItems（マーカーの Put が先、顧客ごとの Update が後）
+    """
+    marker_expires_at = int((datetime.utcnow() + timedelta(days=AGGREGATE_MARKER_TTL_DAYS)).timestamp())
+    transact_items = []
+    for orders in chunk.values():
+        for item in orders:
+            transact_items.append({
+                'Put': {
+                    'TableName': AGGREGATE_MARKERS_TABLE_NAME,
+                    'Item': {
+                        'order_id': item['order_id'],
+                        'customer_name': item['customer_name'],
+                        'applied_at': now,
+                        'expires_at': marker_expires_at
+                    },
+                    'ConditionExpression': 'attribute_not_exists(order_id)'
+                }
+            })
+    for customer_name, orders in chunk.items():
+        revenue = sum(Decimal(str(item['total_amount'])) for item in orders)
+        transact_items.append({
+            'Update': {
+                'TableName': CUSTOMER_AGGREGATES_TABLE_NAME,
+                'Key': {'customer_name': customer_name},
+                'UpdateExpression': 'ADD order_count :count, revenue :revenue SET updated_at = :now',
+                'ExpressionAttributeValues': {
+                    ':count': len(orders),
+                    ':revenue': revenue,
+                    ':now': now
+                }
+            }
+        })
+    return transact_items
+
+
+def apply_aggregate_chunk(chunk: dict) -> bool:
+    """
+    1 つのチャンクを TransactWriteItems で適用する
+
+    適用済みの注文（マーカーの条件チェックに失敗した注文）を除いてやり直し、
+    トランザクションの競合はバックオフして再試行する
+
+    Returns:
+        bool: 適用できた（または全注文が適用済みだった）場合は True
+    """
+    for attempt in range(PERSISTENCE_MAX_ATTEMPTS):
+        if not chunk:
+            return True
+        if attempt > 0:
+            backoff_sleep(attempt)
+
+        transact_items = build_aggregate_transaction(chunk, datetime.utcnow().isoformat() + 'Z')
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                if is_throttling_error(e):
+                    current_throttle_cooldown().trip()
+                    return False
+                raise
+            reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+
+        if TRANSACT_THROTTLE_CODES.intersection(reasons):
+            current_throttle_cooldown().trip()
+            return False
+
+        # マーカーの Put は transact_items の先頭に、チャンク内の注文と同じ順番で並んでいる
+        orders = [item for customer_orders in chunk.values() for item in customer_orders]
+        applied = {
+            orders[index]['order_id']
+            for index, code in enumerate(reasons[:len(orders)])
+            if code == 'ConditionalCheckFailed'
+        }
+        if applied:
+            logger.warning(json.dumps({
+                'message': '集計に適用済みの注文を除いて再試行します（べき等性チェック）',
+                'order_ids': sorted(applied)
+            }, ensure_ascii=False))
+            chunk = {
+                customer_name: remaining
+                for customer_name, customer_orders in chunk.items()
+                if (remaining := [item for item in customer_orders if item['order_id'] not in applied])
+            }
+    return not chunk
+
+
+def apply_customer_aggregates(items: list) -> set:
+    """
+    保存できた注文を顧客ごとの集計（注文数・売上）に加算する
+
+    Args:
+        items: orders テーブルに保存済みのアイテム（同じ order_id の重複は 1 回だけ数える）
+
+    Returns:
+        set: 集計に適用できなかった注文の order_id（リトライが必要）
+    """
+    if not (CUSTOMER_AGGREGATES_TABLE_NAME and AGGREGATE_MARKERS_TABLE_NAME) or not items:
+        return set()
+
+    unique_items = list({item['order_id']: item for item in items}.values())
+    failed_order_ids = set()
+    for chunk in chunk_aggregate_orders(unique_items):
+        order_ids = {item['order_id'] for orders in chunk.values() for item in orders}
+        if current_throttle_cooldown().tripped:
+            failed_order_ids |= order_ids
+            continue
+        try:
+            applied = apply_aggregate_chunk(chunk)
+        except ClientError as e:
+            logger.error(json.dumps({
+                'message': '顧客ごとの集計の更新に失敗しました',
+                'error_code': e.response['Error']['Code'],
+                'order_count': len(order_ids)
+            }, ensure_ascii=False))
+            applied = False
+        if not applied:
+            failed_order_ids |= order_ids
+
+    logger.info(json.dumps({
+        'message': '顧客ごとの集計を更新しました',
+        'customer_count': len({item['customer_name'] for item in unique_items}),
+        'order_count': len(unique_items),
+        'failed_count': len(failed_order_ids)
     }, ensure_ascii=False))
+    return failed_order_ids
+
+
+def map_records(func, records: list):
+    """
+    レコードごとに func を実行し、結果をレコードの順番で返す
+
+    CONSUMER_CONCURRENCY > 1 ならスレッドプールで同時に実行する
+    直前の呼び出しでスロットリングが続いている間は、DynamoDB への負荷を抑えるため順番に実行する
+    """
+    if CONSUMER_CONCURRENCY > 1 and len(records) > 1 and current_throttle_cooldown().streak == 0:
+        return record_executor.map(func, records)
+    return map(func, records)
+
+
+def prepare_record(record: dict) -> tuple:
+    """
+    レコードをパース・処理して、保存するアイテムを作成する
+
+    Returns:
+        tuple: (record, item, None, timing) または 失敗時 (record, None, 例外, timing)
+            timing は (処理を始めた時刻のエポックミリ秒, 処理時間のミリ秒)
+    """
+    started_at_ms = epoch_millis()
+    started = time.perf_counter()
+    try:
+        order_data = parse_order_message(record)
+        processing_result = process_order(order_data)
+        item = build_order_item(order_data, processing_result)
+        return record, item, None, (started_at_ms, (time.perf_counter() - started) * 1000)
+    except Exception as e:
+        return record, None, e, None
+
+
+def process_records_in_batch(records: list) -> list:
+    """
+    バッチ全体をまとめて DynamoDB に保存する（PERSISTENCE_MODE = 'batch'）
+
+    【処理の流れ】
+    1. 各レコードをパース・処理してアイテムを作成（失敗したレコードは個別に失敗扱い）
+    2. BatchGetItem で保存済みの注文を一括確認（べき等性チェック）
+    3. 未保存の注文だけを BatchWriteItem で書き込み、UnprocessedItems はバックオフして再送
+    4. 書き込めなかったアイテムを messageId に戻して batchItemFailures に含める
+
+    【べき等性】
+    BatchWriteItem は条件式を指定できないため、既存チェックを BatchGetItem で行う
+    BatchGetItem の確認と書き込みの間は保護されないため、同じ注文が同時に 2 つの呼び出しに届いた場合は
+    両方が書き込み、後の書き込みが先の書き込みを上書きする（processed_at などの処理時の値が変わる）
+    顧客ごとの集計はマーカーで 1 回だけ加算されるため、二重に加算されることはない
+    上書きを許さない場合は PERSISTENCE_MODE=single（条件付き PutItem）を使う
+    同じバッチ内の重複メッセージ（同じキー）は 1 回だけ書き込む
+    order_id / created_at がないメッセージは、バッチにまとめる前にそのレコードだけを失敗させる
+
+    Args:
+        records: SQS メッセージレコード
+
+    Returns:
+        list: batchItemFailures の要素
+    """
+    failures = []
+    # キー (order_id, created_at) → [(record, item), ...]
+    pending: dict = {}
+
+    # パース・S3 からの取得・注文処理はレコードごとに独立しているため、
+    # CONSUMER_CONCURRENCY > 1 なら同時に実行する（結果はレコードの順番で受け取る）
+    # messageId → (処理を始めた時刻, 処理時間)（レイテンシー計測用）
+    timings: dict = {}
+    for record, item, error, timing in map_records(prepare_record, records):
+        if error is not None:
+            failure = record_failure(record, error)
+            if failure is not None:
+                failures.append(failure)
+            continue
+        key = (item['order_id'], item['created_at'])
+        if recently_persisted_orders.contains(key):
+            # この実行環境で保存済みの注文は、BatchGetItem にも含めずに処理済みとする
+            continue
+        timings[record.get('messageId')] = timing
+        pending.setdefault(key, []).append((record, item))
+
+    if not pending:
+        return failures
+
+    if not table:
+        error = OrderProcessingError('DYNAMODB_TABLE_NAME 環境変数が設定されていません', retryable=False)
+        for entries in pending.values():
+            for record, _ in entries:
+                record_failure(record, error)
+        return failures
+
+    write_started = time.perf_counter()
+    try:
+        existing = batch_get_existing_keys(list(pending))
+    except (ClientError, OrderProcessingError) as e:
+        # 既存チェックができない場合は、書き込まずにすべてリトライする
+        if isinstance(e, ClientError) and is_throttling_error(e):
+            current_throttle_cooldown().trip()
+        error = e if isinstance(e, OrderProcessingError) else OrderProcessingError(
+            f"BatchGetItem に失敗しました: {e.response['Error']['Code']}", retryable=True
+        )
+        for entries in pending.values():
+            for record, item in entries:
+                failure = record_failure(record, error)
+                if failure is not None:
+                    failures.append(failure)
+        return failures
+
+    for key in existing:
+        logger.warning(json.dumps({
+            'message': '注文は既に処理済みです（べき等性チェック）',
+            'order_id': key[0]
+        }, ensure_ascii=False))
+
+    new_items = [entries[0][1] for key, entries in pending.items() if key not in existing]
+    failed_keys, rejected_keys = batch_write_items(new_items) if new_items else (set(), set())
+    write_ms = (time.perf_counter() - write_started) * 1000
+
+    for key in failed_keys:
+        error = OrderProcessingError('DynamoDB への保存に失敗しました: UnprocessedItems', key[0], retryable=True)
+        for record, _ in pending[key]:
+            failures.append(record_failure(record, error))
+    for key in rejected_keys:
+        # リトライしても書き込めないため、batchItemFailures には含めずにメッセージを削除させる
+        error = OrderProcessingError('DynamoDB にアイテムを拒否されました: ValidationException', key[0], retryable=False)
+        for record, _ in pending[key]:
+            record_failure(record, error)
+
+    # 保存済みの注文（今回書き込んだもの + 既に保存されていたもの）を顧客ごとの集計に加算する
+    # 既に保存されていた注文は、前回の配信で集計の前に失敗した可能性があるため対象に含める
+    saved_keys = [key for key in pending if key not in failed_keys and key not in rejected_keys]
+    failed_aggregate_ids = apply_customer_aggregates([pending[key][0][1] for key in saved_keys])
+    for key in saved_keys:
+        if key[0] in failed_aggregate_ids:
+            error = OrderProcessingError('顧客ごとの集計の更新に失敗しました', key[0], retryable=True)
+            for record, _ in pending[key]:
+                failures.append(record_failure(record, error))
+
+    logger.info(json.dumps({
+        'message': 'バッチの DynamoDB 保存が完了しました',
+        'table_name': DYNAMODB_TABLE_NAME,
+        'order_count': len(pending),
+        'already_saved_count': len(existing),
+        'written_count': len(new_items) - len(failed_keys) - len(rejected_keys),
+        'failed_count': len(failed_keys),
+        'rejected_count': len(rejected_keys)
+    }, ensure_ascii=False))
+
+    recently_persisted_orders.add(key for key in saved_keys if key[0] not in failed_aggregate_ids)
+
+    failed_ids = {failure['itemIdentifier'] for failure in failures}
+    for key, entries in pending.items():
+        if key in rejected_keys:
+            continue
+        for record, _ in entries:
+            message_id = record.get('messageId')
+            if message_id not in failed_ids:
+                current_latency_recorder().add(record, *timings[message_id], write_ms)
+
+    return failures
+
+
+def process_message_group(records: list) -> list:
+    """
+    FIFO キューの 1 つのメッセージグループを順番に処理する
+
+    【FIFO キューの部分バッチ応答】
+    グループ内で 1 件でもリトライが必要になったら、以降のメッセージは処理せずに
+    すべて batchItemFailures に含める
+    後続のメッセージだけが成功して削除されると、グループ内の順序が崩れるため
+
+    Args:
+        records: 同じ MessageGroupId のレコード（受信順）
+
+    Returns:
+        list: batchItemFailures の要素
+    """
+    for index, record in enumerate(records):
+        failure = handle_record(record)
+        if failure is not None:
+            skipped = records[index + 1:]
+            if skipped:
+                logger.warning(json.dumps({
+                    'message': 'グループ内の順序を保つため、後続のメッセージをリトライに回します',
+                    'message_group_id': record.get('attributes', {}).get('MessageGroupId'),
+                    'failed_message_id': failure['itemIdentifier'],
+                    'skipped_count': len(skipped)
+                }, ensure_ascii=False))
+            return [failure] + [{'itemIdentifier': r.get('messageId', 'unknown')} for r in skipped]
+    return []
+
+
+def group_records(records: list) -> dict:
+    """
+    レコードを MessageGroupId ごとに分ける（受信順を保つ）
+
+    標準キューのレコードには MessageGroupId がないため、空の辞書を返す
+    """
+    groups: dict = {}
+    for record in records:
+        group_id = record.get('attributes', {}).get('MessageGroupId')
+        if group_id is None:
+            return {}
+        groups.setdefault(group_id, []).append(record)
+    return groups
 
 
 def lambda_handler(event, context):
@@ -340,6 +1491,14 @@ def lambda_handler(event, context):
     成功したメッセージは SQS から削除され、
     失敗したメッセージは可視性タイムアウト後に再処理される
     
+    【FIFO キュー】
+    レコードに MessageGroupId がある場合は、グループごとに順番に処理し、
+    異なるグループは FIFO_GROUP_WORKERS 個のスレッドで並列に処理する
+
+    【DynamoDB のスロットリング】
+    スロットリングを検出したら、残りのレコードは処理せずに batchItemFailures に含める
+    次の呼び出しはクールダウン（連続するほど長くなる）の間だけ待ってから処理を始める
+
     Args:
         event: SQS からのイベント
         context: Lambda 実行コンテキスト
@@ -353,51 +1512,44 @@ def lambda_handler(event, context):
         'record_count': len(event.get('Records', []))
     }, ensure_ascii=False))
     
+    # 直前の呼び出しで DynamoDB がスロットリングしていれば、クールダウンが明けるまで待つ
+    cooldown_wait = current_throttle_cooldown().begin_invocation()
+    if cooldown_wait > 0:
+        logger.warning(json.dumps({
+            'message': 'DynamoDB のスロットリング後のクールダウンで待機しました',
+            'wait_seconds': round(cooldown_wait, 3),
+            'throttle_streak': current_throttle_cooldown().streak
+        }, ensure_ascii=False))
+    
+    dedupe_hits_before = recently_persisted_orders.hits
+    
     # 失敗したメッセージを追跡するリスト
     # 部分バッチ応答で使用
     batch_item_failures = []
     
     # 各メッセージを処理
     records = event.get('Records', [])
+    groups = group_records(records)
     
-    for record in records:
-        message_id = record.get('messageId', 'unknown')
-        
-        try:
-            # 単一メッセージの処理
-            process_single_message(record)
-            
-        except OrderProcessingError as e:
-            # カスタム例外の処理
-            logger.error(json.dumps({
-                'message': '注文処理エラー',
-                'message_id': message_id,
-                'order_id': e.order_id,
-                'error': e.message,
-                'retryable': e.retryable
-            }, ensure_ascii=False))
-            
-            if e.retryable:
-                # リトライ可能なエラーの場合、失敗リストに追加
-                batch_item_failures.append({
-                    'itemIdentifier': message_id
-                })
-            # リトライ不可の場合は、失敗リストに追加しない
-            # → メッセージは削除され、DLQ に送られる（DLQ 設定がある場合）
-            
-        except Exception as e:
-            # 予期しないエラー
-            logger.exception(json.dumps({
-                'message': '予期しないエラーが発生しました',
-                'message_id': message_id,
-                'error': str(e),
-                'error_type': type(e).__name__
-            }, ensure_ascii=False))
-            
-            # 予期しないエラーはリトライする
-            batch_item_failures.append({
-                'itemIdentifier': message_id
-            })
+    if len(groups) > 1:
+        # FIFO キュー: グループ間は並列、グループ内は順番に処理
+        for failures in group_executor.map(process_message_group, groups.values()):
+            batch_item_failures.extend(failures)
+    elif groups:
+        # FIFO キューでグループが 1 つだけなら、スレッドを使わずに処理する
+        batch_item_failures.extend(process_message_group(records))
+    elif PERSISTENCE_MODE == 'batch':
+        # 標準キュー: バッチ全体を BatchGetItem / BatchWriteItem でまとめて保存
+        batch_item_failures.extend(process_records_in_batch(records))
+    else:
+        # 1 件ずつ条件付き PutItem で保存（CONSUMER_CONCURRENCY > 1 なら同時に処理）
+        for failure in map_records(handle_record, records):
+            if failure is not None:
+                batch_item_failures.append(failure)
+    
+    current_throttle_cooldown().end_invocation()
+    # FIFO キューは PERSISTENCE_MODE に関係なく 1 件ずつ保存する
+    current_latency_recorder().flush(len(records), 'single' if groups else PERSISTENCE_MODE)
     
     # 処理結果のサマリーをログ出力
     success_count = len(records) - len(batch_item_failures)
@@ -406,8 +1558,14 @@ def lambda_handler(event, context):
     logger.info(json.dumps({
         'message': 'バッチ処理が完了しました',
         'total_records': len(records),
+        'message_group_count': len(groups),
         'success_count': success_count,
-        'failure_count': failure_count
+        'failure_count': failure_count,
+        # True の場合、スロットリング後のレコードは処理せずにリトライへ回している
+        'throttled': current_throttle_cooldown().tripped,
+        # プロセス内キャッシュで DynamoDB への書き込みを省いた件数と、実行環境の累計ヒット率
+        'dedupe_skipped_count': recently_persisted_orders.hits - dedupe_hits_before,
+        **recently_persisted_orders.stats()
     }, ensure_ascii=False))
     
     # 部分バッチ応答を返す
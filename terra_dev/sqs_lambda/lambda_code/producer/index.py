@@ -22,15 +22,38 @@ API Gateway からのリクエストを受け取り、SQS キューに注文メ
    - 同じリクエストが複数回来ても問題ないように設計する
 """
 
+import gzip
+import hashlib
 import json
 import logging
+import math
+import operator
 import os
+import random
+import sys
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import boto3 # pyright: ignore[reportMissingImports]
 from botocore.exceptions import ClientError # pyright: ignore[reportMissingImports]
 
+# zstandard は Lambda ランタイムに含まれないため、デプロイパッケージに同梱した場合のみ使用する
+# 利用できない場合は標準ライブラリの gzip で圧縮する
+try:
+    import zstandard # pyright: ignore[reportMissingImports]
+except ImportError:
+    zstandard = None
+
+# NumPy も Lambda ランタイムには含まれない（レイヤーなどで追加した場合のみ使用する）
+# 商品数の多い注文で、合計金額の計算を列演算で行うために使う
+try:
+    import numpy # pyright: ignore[reportMissingImports]
+except ImportError:
+    numpy = None
+
 # ============================================================================
 # ロガーの設定
 # ============================================================================
@@ -48,11 +71,369 @@ logger.setLevel(logging.INFO)
 # ハンドラー外で初期化したオブジェクトは、次回の呼び出しでも使い回される
 # これにより、コールドスタート時のオーバーヘッドを削減できる
 sqs_client = boto3.client('sqs')
+s3_client = boto3.client('s3')
+dynamodb = boto3.resource('dynamodb')
 
 # 環境変数から設定を取得
 # Lambda コンソールまたは Terraform で設定する
 SQS_QUEUE_URL = os.environ.get('SQS_QUEUE_URL')
 
+# ============================================================================
+# Claim-Check（大きな注文本文の S3 オフロード）の設定
+# ============================================================================
+# SQS のメッセージ本文は最大 256 KB で、64 KB ごとに 1 リクエストとして課金される
+# 閾値を超える注文は本文を圧縮して S3 に保存し、SQS にはポインターだけを送る
+# バケットが設定されていない場合は、従来どおりすべて MessageBody に入れて送信する
+CLAIM_CHECK_BUCKET = os.environ.get('CLAIM_CHECK_BUCKET')
+CLAIM_CHECK_PREFIX = os.environ.get('CLAIM_CHECK_PREFIX', 'orders/')
+CLAIM_CHECK_THRESHOLD_BYTES = int(os.environ.get('CLAIM_CHECK_THRESHOLD_BYTES', str(64 * 1024)))
+CLAIM_CHECK_ENCODING = 'zstd' if zstandard is not None else 'gzip'
+
+# ============================================================================
+# Idempotency-Key の設定
+# ============================================================================
+# クライアントがタイムアウト後にリトライすると、新しい order_id で注文が二重に作られる
+# Idempotency-Key ヘッダーが付いたリクエストは、キーを DynamoDB に記録し、
+# 同じキーでの再送には最初の order_id を返して SQS には送信しない
+IDEMPOTENCY_TABLE_NAME = os.environ.get('IDEMPOTENCY_TABLE_NAME')
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400'))
+# 処理中（IN_PROGRESS）のキーを他のリクエストに引き継げるようになるまでの秒数
+# Lambda のタイムアウトより長くし、実行中のリクエストから奪わないようにする
+IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', '60'))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+# プロセス内キャッシュ（ウォームスタート時のリトライを DynamoDB に問い合わせずに返す）
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '256'))
+IDEMPOTENCY_CACHE_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_CACHE_TTL_SECONDS', '300'))
+# 完了記録の失敗は CloudWatch の Embedded Metric Format（EMF）でメトリクスとしても書き出す
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'OrderPipeline')
+METRICS_SERVICE_NAME = os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'order-producer')
+
+idempotency_table = dynamodb.Table(IDEMPOTENCY_TABLE_NAME) if IDEMPOTENCY_TABLE_NAME else None
+
+
+class RecentIdempotencyKeys:
+    """
+    直近に完了した Idempotency-Key のプロセス内キャッシュ（TTL 付き LRU）
+
+    リトライが集中したとき、同じ実行環境に届いたリクエストは
+    DynamoDB に問い合わせずに最初の結果を返せる
+    キャッシュは実行環境ごとなので、取りこぼしは DynamoDB 側の記録で判定する
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        cached_until, record = entry
+        if cached_until < time.monotonic() or record['expires_at'] < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return record
+
+    def put(self, key: str, record: dict) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, record)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+recent_idempotency_keys = RecentIdempotencyKeys(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_CACHE_TTL_SECONDS)
+
+# ============================================================================
+# バッチ送信（POST /orders/batch）の設定
+# ============================================================================
+# SendMessageBatch は 1 回の呼び出しで最大 10 件・合計 256 KB まで送信できる
+SQS_BATCH_MAX_ENTRIES = 10
+SQS_BATCH_MAX_BYTES = 256 * 1024
+# 1 リクエストで受け付ける注文数の上限（API Gateway のペイロード上限 10 MB とタイムアウトを考慮）
+MAX_BATCH_ORDERS = int(os.environ.get('MAX_BATCH_ORDERS', '100'))
+# SendMessageBatch を並列に呼び出すスレッド数
+BATCH_SEND_MAX_WORKERS = int(os.environ.get('BATCH_SEND_MAX_WORKERS', '4'))
+# 失敗したエントリだけを再送する最大試行回数（初回を含む）
+BATCH_SEND_MAX_ATTEMPTS = int(os.environ.get('BATCH_SEND_MAX_ATTEMPTS', '3'))
+BATCH_SEND_BASE_DELAY_SECONDS = 0.1
+
+# ============================================================================
+# FIFO モードの設定
+# ============================================================================
+# FIFO キューでは MessageGroupId が同じメッセージが送信順に 1 つずつ処理される
+# 顧客ごとに順序を保証しつつ並列度を確保するため、customer_name のハッシュを
+# FIFO_MESSAGE_GROUPS で割った余りでグループを決める
+SQS_FIFO_ENABLED = os.environ.get('SQS_FIFO_ENABLED', 'false').lower() == 'true'
+FIFO_MESSAGE_GROUPS = int(os.environ.get('FIFO_MESSAGE_GROUPS', '16'))
+
+# スレッドプールもクライアントと同様にハンドラー外で作成し、ウォームスタート時に使い回す
+# boto3 のクライアントはスレッドセーフなので、sqs_client を複数スレッドから共有できる
+batch_send_executor = ThreadPoolExecutor(max_workers=BATCH_SEND_MAX_WORKERS)
+
+
+# ============================================================================
+# 注文データのスキーマ（バリデーションルールの宣言）
+# ============================================================================
+# ルールをコードではなくデータとして宣言し、コールドスタート時に一度だけ
+# 検証関数へコンパイルする（compile_order_validator）
+# ハンドラー呼び出しごとにルールを解釈し直すコストを避けられる
+#
+# - type: 'string' / 'integer' / 'number' / 'array' / 'object'
+# - rules: 値に対する追加チェック（VALUE_RULES のキー）
+# - messages: 型エラー（type）と各ルール違反時のエラーメッセージ
+#   商品のメッセージでは {index} が商品のインデックスに置き換わる
+ORDER_SCHEMA = {
+    'required': ['customer_name', 'items', 'total_amount'],
+    'fields': {
+        'customer_name': {
+            'type': 'string',
+            'rules': ['not_blank'],
+            'messages': {
+                'type': 'customer_name は文字列である必要があります',
+                'not_blank': 'customer_name は空にできません'
+            }
+        },
+        'items': {
+            'type': 'array',
+            'rules': ['not_empty'],
+            'messages': {
+                'type': 'items は配列である必要があります',
+                'not_empty': 'items は少なくとも1つの商品を含む必要があります'
+            }
+        },
+        'total_amount': {
+            'type': 'number',
+            'rules': ['non_negative'],
+            'messages': {
+                'type': 'total_amount は数値である必要があります',
+                'non_negative': 'total_amount は0以上である必要があります'
+            }
+        }
+    },
+    # items 配列の各要素のスキーマ
+    'item': {
+        'array_field': 'items',
+        'required': ['name', 'quantity', 'price'],
+        'messages': {
+            'type': 'items[{index}] はオブジェクトである必要があります',
+            'required': "items[{index}] に '{field}' がありません"
+        },
+        'fields': {
+            'quantity': {
+                'type': 'integer',
+                'rules': ['positive'],
+                'messages': {
+                    'type': 'items[{index}].quantity は正の整数である必要があります',
+                    'positive': 'items[{index}].quantity は正の整数である必要があります'
+                }
+            },
+            'price': {
+                'type': 'number',
+                'rules': ['non_negative'],
+                'messages': {
+                    'type': 'items[{index}].price は0以上の数値である必要があります',
+                    'non_negative': 'items[{index}].price は0以上の数値である必要があります'
+                }
+            }
+        }
+    },
+    # total_amount が sum(quantity * price) と一致するかのチェック
+    # 浮動小数点の誤差を許容するため、abs_tolerance 以内の差は一致とみなす
+    'total_check': {
+        'quantity_field': 'quantity',
+        'price_field': 'price',
+        'total_field': 'total_amount',
+        'abs_tolerance': 0.01,
+        'message': 'total_amount（{total}）が商品の合計金額（{expected}）と一致しません'
+    }
+}
+
+# スキーマの型名 → isinstance で使う型
+# bool は int のサブクラスだが、従来のバリデーションと同じく isinstance の判定に従う
+SCHEMA_TYPES = {
+    'string': (str,),
+    'integer': (int,),
+    'number': (int, float),
+    'array': (list,),
+    'object': (dict,)
+}
+
+# 高速パスで使う「そのまま通してよい型」の集合（type() の完全一致で判定する）
+# ここに含まれない型（bool やサブクラスなど）が混ざっていたら通常パスで 1 件ずつ判定する
+SCHEMA_EXACT_TYPES = {
+    'string': frozenset({str}),
+    'integer': frozenset({int}),
+    'number': frozenset({int, float}),
+    'array': frozenset({list}),
+    'object': frozenset({dict})
+}
+
+# 1 つの値に対するルール
+VALUE_RULES = {
+    'not_blank': lambda value: len(value.strip()) > 0,
+    'not_empty': lambda value: len(value) > 0,
+    'positive': lambda value: value > 0,
+    'non_negative': lambda value: value >= 0
+}
+
+# 列（同じフィールドの値のリスト）に対してまとめて判定するルール
+# min() は C で実装されているため、要素ごとに Python の関数を呼ぶより速い
+COLUMN_RULES = {
+    'positive': lambda column: min(column) > 0,
+    'non_negative': lambda column: min(column) >= 0
+}
+
+# 商品数がこの値以上なら、合計金額の計算に NumPy を使う（NumPy がある場合のみ）
+NUMPY_TOTAL_MIN_ITEMS = int(os.environ.get('NUMPY_TOTAL_MIN_ITEMS', '1000'))
+
+# sum(quantity * price) の計算関数
+# Python 3.12 以降は C 実装の math.sumprod（誤差も小さい）、それ以前は math.fsum を使う
+if hasattr(math, 'sumprod'):
+    sum_of_products = math.sumprod
+else:
+    def sum_of_products(quantities, prices):
+        return math.fsum(map(operator.mul, quantities, prices))
+
+
+def compile_field(spec: dict) -> tuple:
+    """
+    フィールドのスキーマを (型のタプル, [(ルール関数, メッセージ), ...], 型エラーメッセージ) に変換する
+    """
+    rules = [(VALUE_RULES[rule], spec['messages'][rule]) for rule in spec.get('rules', [])]
+    return SCHEMA_TYPES[spec['type']], rules, spec['messages']['type']
+
+
+def compute_items_total(quantities: list, prices: list) -> float:
+    """
+    sum(quantity * price) を計算する
+
+    商品数が多い場合は NumPy の列演算（内積）でまとめて計算する
+    NumPy がない環境では sum_of_products（math.sumprod または math.fsum）で合計する
+    """
+    if numpy is not None and len(quantities) >= NUMPY_TOTAL_MIN_ITEMS:
+        return float(numpy.dot(
+            numpy.asarray(quantities, dtype=numpy.float64),
+            numpy.asarray(prices, dtype=numpy.float64)
+        ))
+    return sum_of_products(quantities, prices)
+
+
+def compile_order_validator(schema: dict):
+    """
+    宣言的なスキーマから注文の検証関数を組み立てる
+
+    【高速パス】
+    商品配列の検証では、まず各フィールドを列として取り出し、
+    - 値の型の集合が許可された型に含まれるか
+    - 列の最小値がルールを満たすか
+    をまとめて判定する。すべて満たせばその時点で有効と確定できる
+    どこかで満たさない場合だけ、従来どおり 1 件ずつ検証して
+    最初に違反した商品のエラーメッセージを返す
+
+    Args:
+        schema: ORDER_SCHEMA 形式のスキーマ
+
+    Returns:
+        callable: order_data を受け取り (成功フラグ, エラーメッセージ) を返す関数
+    """
+    required_fields = tuple(schema['required'])
+    top_fields = [(name, *compile_field(spec)) for name, spec in schema['fields'].items()]
+
+    item_schema = schema['item']
+    array_field = item_schema['array_field']
+    item_required = tuple(item_schema['required'])
+    item_messages = item_schema['messages']
+    item_fields = [(name, *compile_field(spec)) for name, spec in item_schema['fields'].items()]
+    # 高速パスで判定するフィールド: (名前, 許可する型の集合, [列ルール, ...])
+    bulk_fields = [
+        (
+            name,
+            SCHEMA_EXACT_TYPES[spec['type']],
+            [COLUMN_RULES[rule] for rule in spec.get('rules', [])]
+        )
+        for name, spec in item_schema['fields'].items()
+    ]
+    # フィールドごとに列を取り出す getter（C 実装の itemgetter を map で回す）
+    # 必須フィールドの列を取り出す時点で、存在チェックも兼ねる（無ければ KeyError）
+    column_getters = [(name, operator.itemgetter(name)) for name in item_required]
+
+    total_check = schema['total_check']
+    quantity_field = total_check['quantity_field']
+    price_field = total_check['price_field']
+
+    def extract_columns(items: list):
+        """商品配列を列（フィールド名 → 値のリスト）に変換する。構造が不正なら None"""
+        if set(map(type, items)) != {dict}:
+            return None
+        try:
+            return {name: list(map(getter, items)) for name, getter in column_getters}
+        except KeyError:
+            return None
+
+    def bulk_items_valid(columns: dict) -> bool:
+        for name, exact_types, column_rules in bulk_fields:
+            column = columns[name]
+            if not set(map(type, column)) <= exact_types:
+                return False
+            for column_rule in column_rules:
+                if not column_rule(column):
+                    return False
+        return True
+
+    def validate_items_one_by_one(items: list) -> str:
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                return item_messages['type'].format(index=index)
+            for field in item_required:
+                if field not in item:
+                    return item_messages['required'].format(index=index, field=field)
+            for name, types, rules, type_message in item_fields:
+                value = item[name]
+                if not isinstance(value, types):
+                    return type_message.format(index=index)
+                for rule, message in rules:
+                    if not rule(value):
+                        return message.format(index=index)
+        return ''
+
+    def validate(order_data: dict) -> tuple[bool, str]:
+        for field in required_fields:
+            if field not in order_data:
+                return False, f"必須フィールド '{field}' がありません"
+
+        for name, types, rules, type_message in top_fields:
+            value = order_data[name]
+            if not isinstance(value, types):
+                return False, type_message
+            for rule, message in rules:
+                if not rule(value):
+                    return False, message
+
+            if name == array_field:
+                # 商品配列: 高速パスで通らなければ 1 件ずつ検証してエラー箇所を特定する
+                items = value
+                columns = extract_columns(items)
+                if columns is None or not bulk_items_valid(columns):
+                    error_message = validate_items_one_by_one(items)
+                    if error_message:
+                        return False, error_message
+                    columns = {name: list(map(getter, items)) for name, getter in column_getters}
+
+        total = order_data[total_check['total_field']]
+        expected = compute_items_total(columns[quantity_field], columns[price_field])
+        if not math.isclose(total, expected, rel_tol=1e-9, abs_tol=total_check['abs_tolerance']):
+            return False, total_check['message'].format(total=total, expected=expected)
+
+        return True, ""
+
+    return validate
+
+
+# スキーマのコンパイルはコールドスタート時に一度だけ行う
+ORDER_VALIDATOR = compile_order_validator(ORDER_SCHEMA)
+
 
 def validate_order(order_data: dict) -> tuple[bool, str]:
     """
@@ -62,64 +443,765 @@ def validate_order(order_data: dict) -> tuple[bool, str]:
     - 必須フィールドの存在チェック
     - データ型のチェック
     - 値の範囲チェック
+    - 整合性のチェック（total_amount = sum(quantity * price)）
     - 早期リターンパターンで可読性を向上
     
+    ルールは ORDER_SCHEMA で宣言し、コールドスタート時にコンパイルした
+    ORDER_VALIDATOR で検証する
+    
     Args:
         order_data: 検証する注文データ
         
     Returns:
         tuple: (成功フラグ, エラーメッセージ)
     """
-    # 必須フィールドのチェック
-    required_fields = ['customer_name', 'items', 'total_amount']
-    
-    for field in required_fields:
-        if field not in order_data:
-            return False, f"必須フィールド '{field}' がありません"
-    
-    # customer_name のバリデーション
-    if not isinstance(order_data['customer_name'], str):
-        return False, "customer_name は文字列である必要があります"
-    
-    if len(order_data['customer_name'].strip()) == 0:
-        return False, "customer_name は空にできません"
-    
-    # items のバリデーション
-    if not isinstance(order_data['items'], list):
-        return False, "items は配列である必要があります"
-    
-    if len(order_data['items']) == 0:
-        return False, "items は少なくとも1つの商品を含む必要があります"
-    
-    # 各商品のバリデーション
-    for i, item in enumerate(order_data['items']):
-        if not isinstance(item, dict):
-            return False, f"items[{i}] はオブジェクトである必要があります"
-        
-        # 商品の必須フィールド
-        item_required = ['name', 'quantity', 'price']
-        for field in item_required:
-            if field not in item:
-                return False, f"items[{i}] に '{field}' がありません"
-        
-        # 数値のバリデーション
-        if not isinstance(item['quantity'], int) or item['quantity'] <= 0:
-            return False, f"items[{i}].quantity は正の整数である必要があります"
-        
-        if not isinstance(item['price'], (int, float)) or item['price'] < 0:
-            return False, f"items[{i}].price は0以上の数値である必要があります"
-    
-    # total_amount のバリデーション
-    if not isinstance(order_data['total_amount'], (int, float)):
-        return False, "total_amount は数値である必要があります"
-    
-    if order_data['total_amount'] < 0:
-        return False, "total_amount は0以上である必要があります"
-    
-    return True, ""
+    return ORDER_VALIDATOR(order_data)
+
+
+def build_order_message(order_data: dict, request_id: str) -> dict:
+    """
+    検証済みの注文データから SQS に送るメッセージ本文を組み立てる
+
+    単一注文（POST /orders）とバッチ（POST /orders/batch）の両方で使用する
+
+    Args:
+        order_data: バリデーション済みの注文データ
+        request_id: Lambda のリクエスト ID（トレース用）
+
+    Returns:
+        dict: 注文メッセージ
+    """
+    # UUID v4 を使用してユニークな注文IDを生成
+    # UUID は衝突の可能性が極めて低い（2^122 通り）
+    return {
+        'order_id': str(uuid.uuid4()),
+        'created_at': datetime.utcnow().isoformat() + 'Z',  # ISO 8601 形式（UTC）
+        'customer_name': order_data['customer_name'],
+        'items': order_data['items'],
+        'total_amount': order_data['total_amount'],
+        'request_id': request_id  # トレース用
+    }
+
+
+def compress_payload(payload: bytes) -> tuple[bytes, str]:
+    """
+    注文本文を圧縮する
+
+    zstandard が利用できれば zstd、なければ gzip を使用する
+    注文の JSON は商品名やキー名の繰り返しが多いため、どちらでも大きく縮む
+
+    Returns:
+        tuple: (圧縮後のバイト列, エンコーディング名)
+    """
+    if CLAIM_CHECK_ENCODING == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(payload), 'zstd'
+    # mtime=0 にして、同じ本文からは同じバイト列ができるようにする
+    return gzip.compress(payload, compresslevel=6, mtime=0), 'gzip'
+
+
+def serialize_order_message(order_message: dict) -> str:
+    """
+    注文メッセージを SQS の MessageBody に入れる文字列に変換する
+
+    【Claim-Check パターン】
+    - 本文が CLAIM_CHECK_THRESHOLD_BYTES 以下ならそのまま送信する（インライン）
+    - 超える場合は本文を圧縮して S3 に保存し、ポインターとチェックサムだけを送信する
+    - Consumer はポインターを見つけると S3 から本文を取得・展開して処理する
+
+    Args:
+        order_message: build_order_message で作成した注文メッセージ
+
+    Returns:
+        str: MessageBody
+
+    Raises:
+        ClientError: S3 への保存に失敗した場合
+    """
+    body = json.dumps(order_message, ensure_ascii=False)
+    payload = body.encode('utf-8')
+
+    if not CLAIM_CHECK_BUCKET or len(payload) <= CLAIM_CHECK_THRESHOLD_BYTES:
+        return body
+
+    compressed, encoding = compress_payload(payload)
+    extension = 'zst' if encoding == 'zstd' else 'gz'
+    key = f"{CLAIM_CHECK_PREFIX}{order_message['order_id']}.json.{extension}"
+    # チェックサムは展開後の本文に対して計算し、Consumer 側で改ざん・破損を検出する
+    checksum = hashlib.sha256(payload).hexdigest()
+
+    s3_client.put_object(
+        Bucket=CLAIM_CHECK_BUCKET,
+        Key=key,
+        Body=compressed,
+        ContentType='application/json',
+        ContentEncoding=encoding,
+        Metadata={'sha256': checksum, 'order-id': order_message['order_id']}
+    )
+
+    logger.info(json.dumps({
+        'message': '注文本文を S3 にオフロードしました',
+        'order_id': order_message['order_id'],
+        's3_key': key,
+        'original_bytes': len(payload),
+        'compressed_bytes': len(compressed),
+        'encoding': encoding
+    }, ensure_ascii=False))
+
+    # SQS には、ログやトレースに必要な最小限の項目とポインターだけを入れる
+    return json.dumps({
+        'order_id': order_message['order_id'],
+        'created_at': order_message['created_at'],
+        'request_id': order_message['request_id'],
+        'claim_check': {
+            'bucket': CLAIM_CHECK_BUCKET,
+            'key': key,
+            'encoding': encoding,
+            'sha256': checksum,
+            'size': len(payload)
+        }
+    }, ensure_ascii=False)
+
+
+def message_group_id(customer_name: str) -> str:
+    """
+    customer_name から FIFO キューの MessageGroupId を決める
+
+    Python の hash() はプロセスごとにランダム化されるため、
+    実行環境が変わっても同じ値になる SHA-256 を使う
+    """
+    digest = hashlib.sha256(customer_name.encode('utf-8')).digest()
+    return f"customer-group-{int.from_bytes(digest[:8], 'big') % FIFO_MESSAGE_GROUPS}"
+
+
+def fifo_message_parameters(order_message: dict, idempotency_key: str = None) -> dict:
+    """
+    FIFO モードのときに send_message / send_message_batch に追加するパラメーター
+
+    MessageDeduplicationId には order_id を使う
+    SendMessageBatch の再送などで同じメッセージが 5 分以内に送られても、SQS 側で 1 件にまとめられる
+    Idempotency-Key が付いたリクエストでは、キーの SHA-256 を使う
+    （キーに使えない文字が含まれていても 128 文字以内の英数字になる）
+    """
+    if not SQS_FIFO_ENABLED:
+        return {}
+    if idempotency_key is not None:
+        deduplication_id = hashlib.sha256(idempotency_key.encode('utf-8')).hexdigest()
+    else:
+        deduplication_id = order_message['order_id']
+    return {
+        'MessageGroupId': message_group_id(order_message['customer_name']),
+        'MessageDeduplicationId': deduplication_id
+    }
+
+
+def epoch_millis() -> float:
+    """現在時刻の UNIX エポックミリ秒（マイクロ秒までの小数付き）"""
+    return time.time_ns() / 1_000_000
+
+
+def build_message_attributes(trace_id: str = None, received_at_ms: float = None) -> dict:
+    """
+    注文メッセージに付与するメッセージ属性を作成する
+
+    メッセージ属性を使用すると、Consumer 側でフィルタリングが可能
+
+    【レイテンシーの計測用の属性】
+    - TraceId: リクエストのトレース ID（Producer と Consumer のログを結び付ける）
+    - RequestReceivedAt: Producer がリクエストを受け取った時刻（エポックミリ秒）
+    - EnqueuedAt: SQS に送信する直前の時刻（エポックミリ秒）
+    Consumer はこれらと SQS のシステム属性（SentTimestamp など）から、
+    API 呼び出しから DynamoDB への書き込みまでの各区間の時間を計算する
+    """
+    attributes = {
+        'OrderType': {
+            'DataType': 'String',
+            'StringValue': 'NEW_ORDER'
+        },
+        'Priority': {
+            'DataType': 'String',
+            'StringValue': 'NORMAL'
+        }
+    }
+    if trace_id:
+        attributes['TraceId'] = {'DataType': 'String', 'StringValue': trace_id}
+    if received_at_ms is not None:
+        attributes['RequestReceivedAt'] = {'DataType': 'Number', 'StringValue': f'{received_at_ms:.3f}'}
+    attributes['EnqueuedAt'] = {'DataType': 'Number', 'StringValue': f'{epoch_millis():.3f}'}
+    return attributes
+
+
+def entry_size_bytes(entry: dict) -> int:
+    """
+    SendMessageBatch のエントリが 256 KB の上限に数えられるサイズ
+
+    SQS はメッセージ本文に加えて、メッセージ属性の名前・データ型・値もメッセージサイズに含める
+    """
+    size = len(entry['MessageBody'].encode('utf-8'))
+    for name, attribute in entry.get('MessageAttributes', {}).items():
+        size += len(name.encode('utf-8')) + len(attribute['DataType'].encode('utf-8'))
+        if 'StringValue' in attribute:
+            size += len(attribute['StringValue'].encode('utf-8'))
+        if 'BinaryValue' in attribute:
+            size += len(attribute['BinaryValue'])
+    return size
+
+
+def chunk_batch_entries(entries: list[dict]) -> list[list[dict]]:
+    """
+    SendMessageBatch の制限（10 件・合計 256 KB）に収まるようにエントリを分割する
+
+    Args:
+        entries: SendMessageBatch の Entries 形式のリスト
+
+    Returns:
+        list: 1 回の SendMessageBatch で送れる単位に分割したリスト
+    """
+    chunks: list[list[dict]] = []
+    current: list[dict] = []
+    current_bytes = 0
+
+    for entry in entries:
+        entry_bytes = entry_size_bytes(entry)
+        if current and (len(current) >= SQS_BATCH_MAX_ENTRIES or current_bytes + entry_bytes > SQS_BATCH_MAX_BYTES):
+            chunks.append(current)
+            current = []
+            current_bytes = 0
+        current.append(entry)
+        current_bytes += entry_bytes
+
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+
+def send_batch_chunk(entries: list[dict]) -> tuple[dict, dict]:
+    """
+    1 チャンク（最大 10 件）を SendMessageBatch で送信し、失敗したエントリだけを再送する
+
+    【SendMessageBatch の部分失敗】
+    - 呼び出し自体が成功しても、一部のエントリだけ失敗することがある（Failed に入る）
+    - SenderFault が True の失敗はリクエスト内容の問題なので再送しない
+    - SenderFault が False の失敗（SQS 側の一時的な問題）と、呼び出し自体の ClientError は再送する
+    - Successful にも Failed にも入っていないエントリは、送信できたか分からないため失敗として再送する
+
+    FIFO キューでは、1 回の呼び出しに同じ MessageGroupId のエントリを 1 件までしか含めない（send_fifo_entries）
+    失敗したエントリを再送しても、同じグループの後続のエントリはまだ送信していないため順序は入れ替わらない
+
+    Args:
+        entries: SendMessageBatch の Entries
+
+    Returns:
+        tuple: (エントリ Id → MessageId, エントリ Id → 失敗情報)
+    """
+    pending = {entry['Id']: entry for entry in entries}
+    succeeded: dict = {}
+    failed: dict = {}
 
+    for attempt in range(BATCH_SEND_MAX_ATTEMPTS):
+        if attempt > 0:
+            # 指数バックオフ + ジッター（同時に再送が集中しないようにする）
+            time.sleep(BATCH_SEND_BASE_DELAY_SECONDS * (2 ** (attempt - 1)) * (1 + random.random()))
 
-def create_response(status_code: int, body: dict) -> dict:
+        try:
+            response = sqs_client.send_message_batch(
+                QueueUrl=SQS_QUEUE_URL,
+                Entries=list(pending.values())
+            )
+        except ClientError as e:
+            for entry_id in pending:
+                failed[entry_id] = {
+                    'error_code': e.response['Error']['Code'],
+                    'error_message': e.response['Error']['Message'],
+                    'retryable': True
+                }
+            continue
+
+        for result in response.get('Successful', []):
+            succeeded[result['Id']] = result['MessageId']
+            pending.pop(result['Id'], None)
+            failed.pop(result['Id'], None)
+
+        for result in response.get('Failed', []):
+            failed[result['Id']] = {
+                'error_code': result.get('Code'),
+                'error_message': result.get('Message'),
+                'retryable': not result.get('SenderFault', False)
+            }
+            if result.get('SenderFault', False):
+                pending.pop(result['Id'], None)
+
+        reported = {result['Id'] for result in response.get('Successful', []) + response.get('Failed', [])}
+        for entry_id in pending:
+            if entry_id not in reported:
+                failed[entry_id] = {
+                    'error_code': 'MissingResult',
+                    'error_message': 'SendMessageBatch の応答にエントリの結果がありません',
+                    'retryable': True
+                }
+
+        if not pending:
+            break
+
+    return succeeded, failed
+
+
+def send_fifo_entries(entries: list[dict]) -> list[tuple[dict, dict]]:
+    """
+    FIFO キューのエントリを、同じ MessageGroupId の中での順序を保って送信する
+
+    【順序の保ち方】
+    - 各グループの先頭のエントリだけを集めて SendMessageBatch で送信する（1 回の呼び出しにグループあたり 1 件）
+    - 先頭のエントリが受け付けられたら、そのグループの次のエントリに進む
+    - 再送しても受け付けられなかったグループは、後続のエントリを送信せずに失敗として返す
+      （後続だけが届くと、クライアントが失敗した注文を再送したときに順序が入れ替わるため）
+
+    Args:
+        entries: SendMessageBatch の Entries（リクエスト内の順序）
+
+    Returns:
+        list: SendMessageBatch の呼び出しごとの (エントリ Id → MessageId, エントリ Id → 失敗情報)
+    """
+    groups: dict = {}
+    for entry in entries:
+        groups.setdefault(entry['MessageGroupId'], []).append(entry)
+
+    results = []
+    while groups:
+        heads = [group_entries[0] for group_entries in groups.values()]
+        for chunk in chunk_batch_entries(heads):
+            succeeded, failed = send_batch_chunk(chunk)
+            for entry in chunk:
+                group_entries = groups[entry['MessageGroupId']]
+                if entry['Id'] in succeeded:
+                    group_entries.pop(0)
+                    continue
+                # 失敗したエントリより後ろは送信しない
+                for blocked in group_entries[1:]:
+                    failed[blocked['Id']] = {
+                        'error_code': 'NotSentAfterGroupFailure',
+                        'error_message': f"同じ MessageGroupId の注文（index {entry['Id']}）の送信に失敗したため送信していません",
+                        'retryable': True
+                    }
+                group_entries.clear()
+            results.append((succeeded, failed))
+        groups = {group_id: group_entries for group_id, group_entries in groups.items() if group_entries}
+
+    return results
+
+
+def handle_batch_request(payload, request_id: str, trace_id: str = None, received_at_ms: float = None) -> dict:
+    """
+    POST /orders/batch: 複数の注文をまとめて受け付ける
+
+    【処理の流れ】
+    1. 各注文を個別にバリデーション（不正な注文があっても他の注文は受け付ける）
+    2. 有効な注文を SendMessageBatch の単位（10 件）に分割
+    3. 分割したチャンクを並列に送信し、失敗したエントリだけを再送
+    4. 注文ごとの結果をまとめて返す
+
+    Args:
+        payload: リクエストボディ（{"orders": [...]} または注文の配列）
+        request_id: Lambda のリクエスト ID
+        trace_id: リクエストのトレース ID（各メッセージの TraceId 属性）
+        received_at_ms: リクエストを受け取った時刻（エポックミリ秒）
+
+    Returns:
+        dict: API Gateway 形式のレスポンス
+            - 201: すべての注文を受け付けた
+            - 207: 一部の注文が失敗した（results で注文ごとの結果を確認する）
+            - 400: リクエスト形式が不正、またはすべての注文がバリデーションエラー
+    """
+    orders = payload.get('orders') if isinstance(payload, dict) else payload
+
+    if not isinstance(orders, list) or len(orders) == 0:
+        return create_response(400, {
+            'error': 'Validation Error',
+            'message': 'orders は少なくとも1件の注文を含む配列である必要があります'
+        })
+
+    if len(orders) > MAX_BATCH_ORDERS:
+        return create_response(400, {
+            'error': 'Validation Error',
+            'message': f'1 回のリクエストで送信できる注文は {MAX_BATCH_ORDERS} 件までです'
+        })
+
+    results: list = [None] * len(orders)
+    entries: list[dict] = []
+    order_ids: dict = {}
+
+    for index, order_data in enumerate(orders):
+        if not isinstance(order_data, dict):
+            is_valid, error_message = False, '注文はオブジェクトである必要があります'
+        else:
+            is_valid, error_message = validate_order(order_data)
+
+        if not is_valid:
+            results[index] = {
+                'index': index,
+                'status': 'REJECTED',
+                'error': 'Validation Error',
+                'message': error_message
+            }
+            continue
+
+        order_message = build_order_message(order_data, request_id)
+        order_ids[str(index)] = order_message['order_id']
+
+        try:
+            message_body = serialize_order_message(order_message)
+        except ClientError as e:
+            # S3 へのオフロードに失敗した注文だけを FAILED とし、他の注文は送信を続ける
+            results[index] = {
+                'index': index,
+                'status': 'FAILED',
+                'order_id': order_message['order_id'],
+                'error': 'Internal Server Error',
+                'error_code': e.response['Error']['Code'],
+                'retryable': True
+            }
+            continue
+
+        entries.append({
+            # Id はバッチ内で一意であればよいので、リクエスト内のインデックスを使う
+            'Id': str(index),
+            'MessageBody': message_body,
+            'MessageAttributes': build_message_attributes(trace_id, received_at_ms),
+            **fifo_message_parameters(order_message)
+        })
+
+    # チャンクごとの SendMessageBatch を並列に実行する
+    # FIFO モードでは、同じ顧客の注文がリクエスト内の順序で届くようにグループごとに 1 件ずつ順番に送信する
+    if SQS_FIFO_ENABLED:
+        chunk_results = send_fifo_entries(entries)
+    else:
+        chunk_results = list(batch_send_executor.map(send_batch_chunk, chunk_batch_entries(entries)))
+
+    for succeeded, failed in chunk_results:
+        for entry_id, message_id in succeeded.items():
+            results[int(entry_id)] = {
+                'index': int(entry_id),
+                'status': 'ACCEPTED',
+                'order_id': order_ids[entry_id],
+                'message_id': message_id
+            }
+        for entry_id, failure in failed.items():
+            results[int(entry_id)] = {
+                'index': int(entry_id),
+                'status': 'FAILED',
+                'order_id': order_ids[entry_id],
+                'error': 'Internal Server Error',
+                'error_code': failure['error_code'],
+                'retryable': failure['retryable']
+            }
+
+    accepted_count = sum(1 for result in results if result['status'] == 'ACCEPTED')
+    rejected_count = sum(1 for result in results if result['status'] == 'REJECTED')
+    failed_count = sum(1 for result in results if result['status'] == 'FAILED')
+
+    logger.info(json.dumps({
+        'message': 'バッチ注文の処理が完了しました',
+        'request_id': request_id,
+        'trace_id': trace_id,
+        'order_count': len(orders),
+        'accepted_count': accepted_count,
+        'rejected_count': rejected_count,
+        'failed_count': failed_count,
+        'send_message_batch_calls': len(chunk_results)
+    }, ensure_ascii=False))
+
+    if accepted_count == len(orders):
+        status_code = 201
+    elif rejected_count == len(orders):
+        status_code = 400
+    else:
+        status_code = 207
+
+    return create_response(status_code, {
+        'message': 'バッチ注文を処理しました',
+        'accepted_count': accepted_count,
+        'rejected_count': rejected_count,
+        'failed_count': failed_count,
+        'results': results
+    })
+
+
+def is_batch_route(event: dict) -> bool:
+    """
+    リクエストがバッチ送信ルート（POST /orders/batch）かどうかを判定する
+    """
+    resource = event.get('resource') or ''
+    path = (event.get('path') or '').rstrip('/')
+    return resource == '/orders/batch' or path.endswith('/orders/batch')
+
+
+def get_header(event: dict, header_name: str):
+    """
+    リクエストヘッダーを取得する
+
+    API Gateway はヘッダー名の大文字・小文字をクライアントの送信どおりに渡すため、
+    大文字・小文字を区別せずに探す
+
+    Returns:
+        str | None: ヘッダーの値（ヘッダーがなければ None）
+    """
+    header_name = header_name.lower()
+    for name, value in (event.get('headers') or {}).items():
+        if name.lower() == header_name:
+            return value.strip() if isinstance(value, str) else value
+    return None
+
+
+def get_idempotency_key(event: dict):
+    """
+    リクエストヘッダーから Idempotency-Key を取得する
+
+    Returns:
+        str | None: キー（ヘッダーがなければ None）
+    """
+    return get_header(event, 'Idempotency-Key')
+
+
+def get_trace_id(event: dict) -> str:
+    """
+    リクエストのトレース ID を決める
+
+    API Gateway で X-Ray トレースが有効なら X-Amzn-Trace-Id の Root を使い、
+    なければ新しく発行する
+    """
+    trace_header = get_header(event, 'X-Amzn-Trace-Id')
+    if isinstance(trace_header, str):
+        for part in trace_header.split(';'):
+            key, _, value = part.strip().partition('=')
+            if key == 'Root' and value:
+                return value
+    return uuid.uuid4().hex
+
+
+def request_fingerprint(order_data: dict) -> str:
+    """
+    同じキーが別の内容のリクエストに使い回されていないかを判定するためのハッシュ
+    """
+    canonical = json.dumps(order_data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def idempotent_replay_response(idempotency_key: str, record: dict, fingerprint: str):
+    """
+    記録済みのキーに対するレスポンスを作成する
+
+    - 内容が異なる: 422（同じキーを別の注文に使い回している）
+    - 送信完了済み: 最初のリクエストと同じ order_id を 201 で返す
+    - 処理中: 409（最初のリクエストの完了を待ってリトライしてもらう）
+    """
+    if record.get('request_hash') != fingerprint:
+        return create_response(422, {
+            'error': 'Unprocessable Entity',
+            'message': '同じ Idempotency-Key が異なるリクエスト内容で使用されています'
+        })
+
+    if record.get('status') == 'COMPLETED':
+        logger.info(json.dumps({
+            'message': 'Idempotency-Key の再送のため、最初の注文を返します',
+            'idempotency_key': idempotency_key,
+            'order_id': record['order_id']
+        }, ensure_ascii=False))
+        return create_response(201, {
+            'message': '注文を受け付けました',
+            'order_id': record['order_id'],
+            'status': 'PENDING'
+        }, headers={'Idempotent-Replayed': 'true'})
+
+    return create_response(409, {
+        'error': 'Conflict',
+        'message': '同じ Idempotency-Key のリクエストを処理中です。しばらく経ってから再度お試しください。'
+    })
+
+
+def claim_idempotency_key(idempotency_key: str, fingerprint: str, order_message: dict):
+    """
+    Idempotency-Key を確保する（DynamoDB の条件付き書き込み）
+
+    【条件】
+    以下のいずれかの場合だけ書き込める
+    - キーがまだ存在しない
+    - キーの保持期間が切れている（TTL による削除は最大で数日遅れることがある）
+
+    【処理中のキーの引き継ぎ】
+    処理中のまま IDEMPOTENCY_LOCK_SECONDS を過ぎたキーは、同じ内容のリクエストが引き継げる
+    前のリクエストは SQS に送信した後で失敗した（完了記録の失敗・クラッシュ）かもしれないため、
+    新しい order_id は使わず、前のリクエストの order_id / created_at を order_message に引き継いで送信する
+    既に届いていた場合も、Consumer の条件付き書き込み（order_id, created_at）と
+    FIFO キューの MessageDeduplicationId（Idempotency-Key）で 1 件にまとめられる
+
+    Returns:
+        dict | None: 既に記録済みの場合は返すべきレスポンス、確保できた場合は None
+
+    Raises:
+        ClientError: 条件チェック以外の DynamoDB エラー
+    """
+    now = int(time.time())
+
+    try:
+        idempotency_table.put_item(
+            Item={
+                'idempotency_key': idempotency_key,
+                'status': 'IN_PROGRESS',
+                'order_id': order_message['order_id'],
+                'request_hash': fingerprint,
+                'request_id': order_message['request_id'],
+                'created_at': order_message['created_at'],
+                'locked_until': now + IDEMPOTENCY_LOCK_SECONDS,
+                'expires_at': now + IDEMPOTENCY_TTL_SECONDS
+            },
+            ConditionExpression='attribute_not_exists(idempotency_key) OR expires_at < :now',
+            ExpressionAttributeValues={':now': now},
+            # 条件チェックに失敗したとき、既存のアイテムを返してもらう（GetItem を省ける）
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+        return None
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        record = e.response.get('Item')
+
+    if record is None:
+        record = idempotency_table.get_item(
+            Key={'idempotency_key': idempotency_key},
+            ConsistentRead=True
+        ).get('Item')
+    else:
+        # ReturnValuesOnConditionCheckFailure の Item は低レベル API の形式（{'S': ...}）で返る
+        record = {name: next(iter(value.values())) for name, value in record.items()}
+
+    if record is None:
+        # 条件チェックの直後に TTL で削除された（まれ）: 呼び出し元でリトライしてもらう
+        return create_response(409, {
+            'error': 'Conflict',
+            'message': '同じ Idempotency-Key のリクエストを処理中です。しばらく経ってから再度お試しください。'
+        })
+
+    if (record.get('status') == 'IN_PROGRESS' and record.get('request_hash') == fingerprint
+            and int(record.get('locked_until', 0)) < now):
+        if take_over_idempotency_key(idempotency_key, record, order_message, now):
+            return None
+        return create_response(409, {
+            'error': 'Conflict',
+            'message': '同じ Idempotency-Key のリクエストを処理中です。しばらく経ってから再度お試しください。'
+        })
+
+    if record.get('status') == 'COMPLETED' and record.get('request_hash') == fingerprint:
+        recent_idempotency_keys.put(idempotency_key, {
+            'order_id': record['order_id'],
+            'request_hash': record['request_hash'],
+            'status': 'COMPLETED',
+            'expires_at': int(record['expires_at'])
+        })
+
+    return idempotent_replay_response(idempotency_key, record, fingerprint)
+
+
+def take_over_idempotency_key(idempotency_key: str, record: dict, order_message: dict, now: int) -> bool:
+    """
+    処理中のまま IDEMPOTENCY_LOCK_SECONDS を過ぎたキーを引き継ぐ
+
+    前のリクエストの order_id / created_at を order_message に書き戻し、同じ注文として送信し直す
+    ロックの更新は、前のリクエストや同時に引き継ごうとした他のリクエストと競合しないよう
+    locked_until が読み取ったときのままである場合だけ行う
+
+    Returns:
+        bool: 引き継げた場合は True（他のリクエストが先に引き継いだ・完了した場合は False）
+    """
+    try:
+        idempotency_table.update_item(
+            Key={'idempotency_key': idempotency_key},
+            UpdateExpression='SET locked_until = :locked_until, request_id = :request_id',
+            ConditionExpression='#status = :in_progress AND order_id = :order_id AND locked_until = :previous',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':locked_until': now + IDEMPOTENCY_LOCK_SECONDS,
+                ':request_id': order_message['request_id'],
+                ':in_progress': 'IN_PROGRESS',
+                ':order_id': record['order_id'],
+                ':previous': int(record['locked_until'])
+            }
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+
+    order_message['order_id'] = record['order_id']
+    order_message['created_at'] = record['created_at']
+    logger.warning(json.dumps({
+        'message': '処理中のまま期限が切れた Idempotency-Key を引き継ぎ、同じ注文として送信し直します',
+        'idempotency_key': idempotency_key,
+        'order_id': record['order_id'],
+        'previous_request_id': record.get('request_id')
+    }, ensure_ascii=False))
+    return True
+
+
+def put_idempotency_complete_failure_metric() -> None:
+    """
+    完了記録の失敗を EMF のメトリクス（IdempotencyCompleteFailures）として書き出す
+
+    記録できなかったキーは IDEMPOTENCY_LOCK_SECONDS の間 409 を返し続けるため、アラームで検知できるようにする
+    """
+    document = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['Service']],
+                'Metrics': [{'Name': 'IdempotencyCompleteFailures', 'Unit': 'Count'}]
+            }]
+        },
+        'Service': METRICS_SERVICE_NAME,
+        'IdempotencyCompleteFailures': 1
+    }
+    # EMF はログイベント全体が JSON である必要があるため、ロガーの書式を通さずに出力する
+    sys.stdout.write(json.dumps(document) + '\n')
+    sys.stdout.flush()
+
+
+def complete_idempotency_key(idempotency_key: str, order_id: str, message_id: str) -> None:
+    """
+    SQS への送信完了を記録し、以降の再送に order_id を返せるようにする
+    """
+    idempotency_table.update_item(
+        Key={'idempotency_key': idempotency_key},
+        UpdateExpression='SET #status = :completed, message_id = :message_id REMOVE locked_until',
+        ConditionExpression='order_id = :order_id',
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={
+            ':completed': 'COMPLETED',
+            ':message_id': message_id,
+            ':order_id': order_id
+        }
+    )
+
+
+def release_idempotency_key(idempotency_key: str, order_id: str) -> None:
+    """
+    SQS への送信に失敗したときにキーを解放し、クライアントが同じキーでリトライできるようにする
+    """
+    try:
+        idempotency_table.delete_item(
+            Key={'idempotency_key': idempotency_key},
+            ConditionExpression='order_id = :order_id',
+            ExpressionAttributeValues={':order_id': order_id}
+        )
+    except ClientError as e:
+        # 解放できなくても IDEMPOTENCY_LOCK_SECONDS 後には引き継げるため、ログだけ残す
+        logger.warning(json.dumps({
+            'message': 'Idempotency-Key の解放に失敗しました',
+            'idempotency_key': idempotency_key,
+            'error_code': e.response['Error']['Code']
+        }, ensure_ascii=False))
+
+
+def create_response(status_code: int, body: dict, headers: dict = None) -> dict:
     """
     API Gateway 用のレスポンスを作成する
     
@@ -131,6 +1213,7 @@ def create_response(status_code: int, body: dict) -> dict:
     Args:
         status_code: HTTP ステータスコード
         body: レスポンスボディ（辞書）
+        headers: 追加のレスポンスヘッダー（オプション）
         
     Returns:
         dict: API Gateway 形式のレスポンス
@@ -141,8 +1224,9 @@ def create_response(status_code: int, body: dict) -> dict:
             'Content-Type': 'application/json',
             # CORS ヘッダー（必要に応じて設定）
             'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type',
-            'Access-Control-Allow-Methods': 'POST, OPTIONS'
+            'Access-Control-Allow-Headers': 'Content-Type, Idempotency-Key',
+            'Access-Control-Allow-Methods': 'POST, OPTIONS',
+            **(headers or {})
         },
         'body': json.dumps(body, ensure_ascii=False)  # 日本語を正しく出力
     }
@@ -170,10 +1254,14 @@ def lambda_handler(event, context):
     """
     # リクエスト開始のログ
     # request_id を含めることで、CloudWatch Logs でトレースしやすくなる
+    # エンドツーエンドのレイテンシー計測の起点（メッセージ属性 RequestReceivedAt として送る）
+    received_at_ms = epoch_millis()
     request_id = context.aws_request_id
+    trace_id = get_trace_id(event)
     logger.info(json.dumps({
         'message': 'リクエストを受信しました',
         'request_id': request_id,
+        'trace_id': trace_id,
         'event': event
     }, ensure_ascii=False))
     
@@ -215,6 +1303,12 @@ def lambda_handler(event, context):
         else:
             order_data = body
         
+        # ============================================================
+        # バッチ送信ルート（POST /orders/batch）
+        # ============================================================
+        if is_batch_route(event):
+            return handle_batch_request(order_data, request_id, trace_id, received_at_ms)
+        
         # ============================================================
         # バリデーション
         # ============================================================
@@ -227,22 +1321,39 @@ def lambda_handler(event, context):
                 'message': error_message
             })
         
+        # ============================================================
+        # Idempotency-Key のチェック（キャッシュ）
+        # ============================================================
+        # 同じキーでの再送には、最初の order_id を返して SQS には送信しない
+        idempotency_key = get_idempotency_key(event) if idempotency_table else None
+        
+        if idempotency_key is not None:
+            if not isinstance(idempotency_key, str) or not 0 < len(idempotency_key) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+                return create_response(400, {
+                    'error': 'Bad Request',
+                    'message': f'Idempotency-Key は 1〜{IDEMPOTENCY_KEY_MAX_LENGTH} 文字で指定してください'
+                })
+            
+            fingerprint = request_fingerprint(order_data)
+            cached = recent_idempotency_keys.get(idempotency_key)
+            if cached is not None:
+                return idempotent_replay_response(idempotency_key, cached, fingerprint)
+        
         # ============================================================
         # 注文IDの生成
         # ============================================================
-        # UUID v4 を使用してユニークな注文IDを生成
-        # UUID は衝突の可能性が極めて低い（2^122 通り）
-        order_id = str(uuid.uuid4())
+        # 注文データに注文ID・作成日時などの追加情報を付与
+        order_message = build_order_message(order_data, request_id)
         
-        # 注文データに追加情報を付与
-        order_message = {
-            'order_id': order_id,
-            'created_at': datetime.utcnow().isoformat() + 'Z',  # ISO 8601 形式（UTC）
-            'customer_name': order_data['customer_name'],
-            'items': order_data['items'],
-            'total_amount': order_data['total_amount'],
-            'request_id': request_id  # トレース用
-        }
+        # ============================================================
+        # Idempotency-Key の確保（DynamoDB の条件付き書き込み）
+        # ============================================================
+        # 期限切れのキーを引き継いだ場合は、order_message の order_id が前のリクエストのものになる
+        if idempotency_key is not None:
+            replay_response = claim_idempotency_key(idempotency_key, fingerprint, order_message)
+            if replay_response is not None:
+                return replay_response
+        order_id = order_message['order_id']
         
         # ============================================================
         # SQS へのメッセージ送信
@@ -255,22 +1366,15 @@ def lambda_handler(event, context):
         
         try:
             # SQS にメッセージを送信
-            # MessageBody: 送信するメッセージ本文
+            # MessageBody: 送信するメッセージ本文（大きな注文は S3 へのポインター）
             # MessageAttributes: メタデータ（オプション）
             response = sqs_client.send_message(
                 QueueUrl=SQS_QUEUE_URL,
-                MessageBody=json.dumps(order_message, ensure_ascii=False),
+                MessageBody=serialize_order_message(order_message),
                 # メッセージ属性を使用すると、Consumer 側でフィルタリングが可能
-                MessageAttributes={
-                    'OrderType': {
-                        'DataType': 'String',
-                        'StringValue': 'NEW_ORDER'
-                    },
-                    'Priority': {
-                        'DataType': 'String',
-                        'StringValue': 'NORMAL'
-                    }
-                }
+                MessageAttributes=build_message_attributes(trace_id, received_at_ms),
+                # FIFO モードでは MessageGroupId / MessageDeduplicationId を付与する
+                **fifo_message_parameters(order_message, idempotency_key)
             )
             
             message_id = response['MessageId']
@@ -292,17 +1396,46 @@ def lambda_handler(event, context):
                 'order_id': order_id
             }, ensure_ascii=False))
             
+            # キーを解放し、クライアントが同じキーでリトライできるようにする
+            if idempotency_key is not None:
+                release_idempotency_key(idempotency_key, order_id)
+            
             return create_response(500, {
                 'error': 'Internal Server Error',
                 'message': '注文の処理中にエラーが発生しました。しばらく経ってから再度お試しください。'
             })
         
+        # ============================================================
+        # Idempotency-Key の完了記録
+        # ============================================================
+        if idempotency_key is not None:
+            try:
+                complete_idempotency_key(idempotency_key, order_id, message_id)
+                recent_idempotency_keys.put(idempotency_key, {
+                    'order_id': order_id,
+                    'request_hash': fingerprint,
+                    'status': 'COMPLETED',
+                    'expires_at': int(time.time()) + IDEMPOTENCY_TTL_SECONDS
+                })
+            except ClientError as e:
+                # メッセージは送信済みなので成功として返す
+                # 記録できなかったキーは IDEMPOTENCY_LOCK_SECONDS の間 409 を返し、
+                # その後は同じ order_id のまま引き継がれる（take_over_idempotency_key）
+                put_idempotency_complete_failure_metric()
+                logger.error(json.dumps({
+                    'message': 'Idempotency-Key の完了記録に失敗しました',
+                    'idempotency_key': idempotency_key,
+                    'order_id': order_id,
+                    'error_code': e.response['Error']['Code']
+                }, ensure_ascii=False))
+        
         # ============================================================
         # 成功レスポンス
         # ============================================================
         logger.info(json.dumps({
             'message': '注文を正常に受け付けました',
-            'order_id': order_id
+            'order_id': order_id,
+            'trace_id': trace_id
         }, ensure_ascii=False))
         
         # 201 Created: リソースが正常に作成されたことを示す
@@ -135,6 +135,9 @@ module "sqs" {
   # DLQ 移動までの最大受信回数
   max_receive_count = var.sqs_max_receive_count
 
+  # FIFO モード（顧客ごとの順序保証）
+  fifo_queue = var.sqs_fifo_enabled
+
   # オプション: 追加タグ
   tags = {
     Component = "Messaging"
@@ -142,6 +145,37 @@ module "sqs" {
   }
 }
 
+#-------------------------------------------------------------------------------
+# S3 モジュール（Claim-Check 用ペイロードバケット）
+#-------------------------------------------------------------------------------
+#
+# SQS のメッセージ本文に収めるには大きすぎる注文を保存するバケットです。
+#
+# ■ モジュールの役割
+#   - ペイロード保存用バケットの作成（パブリックアクセス禁止、SSE-S3）
+#   - ライフサイクルルールによる自動削除
+#
+# ■ 依存関係
+#   - 他のモジュールに依存しない（独立して作成可能）
+#   - Producer Lambda が圧縮した注文本文を書き込む
+#   - Consumer Lambda が注文本文を読み込む
+#
+module "s3" {
+  source = "./modules/s3"
+
+  environment  = var.environment
+  project_name = var.project_name
+  account_id   = data.aws_caller_identity.current.account_id
+
+  # DLQ から再処理する可能性があるため、SQS の保持期間より長く残す
+  expiration_days = var.claim_check_expiration_days
+
+  tags = {
+    Component = "Storage"
+    Purpose   = "Order payload claim-check"
+  }
+}
+
 #-------------------------------------------------------------------------------
 # Producer Lambda モジュール
 #-------------------------------------------------------------------------------
@@ -212,6 +246,25 @@ module "lambda_producer" {
 
     # ログレベル（開発時は DEBUG、本番は INFO を推奨）
     LOG_LEVEL = var.environment == "dev" ? "DEBUG" : "INFO"
+
+    # POST /orders/batch で 1 リクエストに受け付ける最大注文数
+    MAX_BATCH_ORDERS = "100"
+
+    # SendMessageBatch（10 件単位）を並列に送信するスレッド数
+    BATCH_SEND_MAX_WORKERS = "4"
+
+    # Claim-Check: このサイズ（バイト）を超える注文本文は S3 に圧縮保存する
+    CLAIM_CHECK_BUCKET          = module.s3.bucket_name
+    CLAIM_CHECK_PREFIX          = module.s3.key_prefix
+    CLAIM_CHECK_THRESHOLD_BYTES = tostring(var.claim_check_threshold_bytes)
+
+    # Idempotency-Key: キーの記録先テーブルと保持期間（秒）
+    IDEMPOTENCY_TABLE_NAME  = module.dynamodb.idempotency_table_name
+    IDEMPOTENCY_TTL_SECONDS = tostring(var.idempotency_ttl_seconds)
+
+    # FIFO モード: MessageGroupId を customer_name のハッシュから N グループに割り当てる
+    SQS_FIFO_ENABLED    = tostring(var.sqs_fifo_enabled)
+    FIFO_MESSAGE_GROUPS = tostring(var.sqs_fifo_message_groups)
   }
 
   #-----------------------------------------------------------------------------
@@ -243,6 +296,28 @@ module "lambda_producer" {
           # SQS モジュールの出力から ARN を取得
           # 特定のキューのみに制限（最小権限）
           Resource = module.sqs.queue_arn
+        },
+        {
+          # Claim-Check: 大きな注文本文を S3 に書き込む権限
+          # ペイロード用のプレフィックス配下のみに制限
+          Sid    = "AllowS3PutOrderPayload"
+          Effect = "Allow"
+          Action = [
+            "s3:PutObject"
+          ]
+          Resource = "${module.s3.bucket_arn}/${module.s3.key_prefix}*"
+        },
+        {
+          # Idempotency-Key の確保（条件付き書き込み）・完了記録・解放
+          Sid    = "AllowIdempotencyTableOperations"
+          Effect = "Allow"
+          Action = [
+            "dynamodb:PutItem",    # キーの確保（attribute_not_exists 条件付き）
+            "dynamodb:GetItem",    # 既存キーの参照
+            "dynamodb:UpdateItem", # 送信完了の記録
+            "dynamodb:DeleteItem"  # 送信失敗時のキー解放
+          ]
+          Resource = module.dynamodb.idempotency_table_arn
         }
       ]
     })
@@ -286,6 +361,7 @@ module "lambda_producer" {
 #      - dynamodb:PutItem: 新規アイテムの書き込み
 #      - dynamodb:GetItem: アイテムの取得（重複チェック用）
 #      - dynamodb:UpdateItem: 既存アイテムの更新
+#      - dynamodb:BatchGetItem / BatchWriteItem: バッチ単位の既存チェックと書き込み
 #
 module "lambda_consumer" {
   source = "./modules/lambda"
@@ -319,6 +395,24 @@ module "lambda_consumer" {
     # DynamoDB モジュールの出力を参照
     DYNAMODB_TABLE_NAME = module.dynamodb.table_name
 
+    # 顧客ごとの集計（注文数・売上）と、集計に適用済みの注文のマーカー
+    CUSTOMER_AGGREGATES_TABLE_NAME = module.dynamodb.customer_aggregates_table_name
+    AGGREGATE_MARKERS_TABLE_NAME   = module.dynamodb.aggregate_markers_table_name
+
+    # Claim-Check: S3 に保存された注文本文の取得先
+    CLAIM_CHECK_BUCKET = module.s3.bucket_name
+
+    # FIFO モード: 1 回の呼び出しで並列に処理するメッセージグループ数
+    FIFO_GROUP_WORKERS = "4"
+
+    # DynamoDB への保存方式（single: 1 件ずつ条件付き PutItem、batch: BatchGetItem + BatchWriteItem）
+    # batch は往復が減るが、同時に届いた同じ注文を上書きしうる（条件付き書き込みではない）
+    PERSISTENCE_MODE = "single"
+
+    # 1 回の呼び出し内でレコードを同時に処理するスレッド数（1 なら順番に処理）
+    # batch モードではパース・S3 からの取得・注文処理を、single モードでは PutItem までを同時に行う
+    CONSUMER_CONCURRENCY = "4"
+
     # 環境名
     ENVIRONMENT = var.environment
 
@@ -360,12 +454,38 @@ module "lambda_consumer" {
           Sid    = "AllowDynamoDBOperations"
           Effect = "Allow"
           Action = [
-            "dynamodb:PutItem",   # 新規アイテム作成
-            "dynamodb:GetItem",   # アイテム取得（重複チェック、べき等性）
-            "dynamodb:UpdateItem" # 既存アイテム更新
+            "dynamodb:PutItem",        # 新規アイテム作成
+            "dynamodb:GetItem",        # アイテム取得（重複チェック、べき等性）
+            "dynamodb:UpdateItem",     # 既存アイテム更新
+            "dynamodb:BatchGetItem",   # バッチ単位の既存チェック（PERSISTENCE_MODE = batch）
+            "dynamodb:BatchWriteItem"  # バッチ単位の書き込み（PERSISTENCE_MODE = batch）
           ]
           # DynamoDB モジュールの出力から ARN を取得
           Resource = module.dynamodb.table_arn
+        },
+        {
+          # 顧客ごとの集計: TransactWriteItems で集計の加算（UpdateItem）と
+          # 適用済みマーカーの作成（PutItem）をまとめて行う
+          # TransactWriteItems の権限は、含まれる各操作のアクションで判定される
+          Sid    = "AllowCustomerAggregates"
+          Effect = "Allow"
+          Action = [
+            "dynamodb:UpdateItem", # 集計の加算（ADD）
+            "dynamodb:PutItem"     # 適用済みマーカー（attribute_not_exists 条件付き）
+          ]
+          Resource = [
+            module.dynamodb.customer_aggregates_table_arn,
+            module.dynamodb.aggregate_markers_table_arn
+          ]
+        },
+        {
+          # Claim-Check: S3 に保存された注文本文の読み込み権限
+          Sid    = "AllowS3GetOrderPayload"
+          Effect = "Allow"
+          Action = [
+            "s3:GetObject"
+          ]
+          Resource = "${module.s3.bucket_arn}/${module.s3.key_prefix}*"
         }
       ]
     })
@@ -434,7 +554,9 @@ resource "aws_lambda_event_source_mapping" "sqs_to_consumer" {
   # トレードオフ:
   # - 0: 低レイテンシー、Lambda 呼び出し回数が増加
   # - 長い値: 高スループット、レイテンシーが増加
-  maximum_batching_window_in_seconds = 0
+  #
+  # FIFO キューではバッチウィンドウを指定できないため、null（未設定）にする
+  maximum_batching_window_in_seconds = var.sqs_fifo_enabled ? null : 0
 
   #-----------------------------------------------------------------------------
   # 失敗処理設定
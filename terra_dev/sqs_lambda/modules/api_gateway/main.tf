@@ -133,6 +133,41 @@ resource "aws_api_gateway_integration" "lambda" {
   uri = var.lambda_invoke_arn
 }
 
+#-------------------------------------------------------------------------------
+# バッチ送信エンドポイント（POST /orders/batch）
+#-------------------------------------------------------------------------------
+# 複数の注文を 1 リクエストで受け付けるためのリソースです。
+# Producer Lambda は event の resource / path を見て単一注文と処理を分けるため、
+# /orders と同じ Lambda に AWS_PROXY で統合します。
+#
+# 1 リクエストで最大 N 件（MAX_BATCH_ORDERS）の注文を受け付け、
+# Lambda 内で SendMessageBatch（10 件単位）にまとめて SQS に送信します。
+#-------------------------------------------------------------------------------
+resource "aws_api_gateway_resource" "orders_batch" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+
+  # 親リソースは /orders（/orders/batch となる）
+  parent_id = aws_api_gateway_resource.orders.id
+  path_part = "batch"
+}
+
+resource "aws_api_gateway_method" "post_orders_batch" {
+  rest_api_id   = aws_api_gateway_rest_api.this.id
+  resource_id   = aws_api_gateway_resource.orders_batch.id
+  http_method   = "POST"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "lambda_batch" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.orders_batch.id
+  http_method = aws_api_gateway_method.post_orders_batch.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.lambda_invoke_arn
+}
+
 #-------------------------------------------------------------------------------
 # Lambda 実行権限
 #-------------------------------------------------------------------------------
@@ -169,6 +204,7 @@ resource "aws_api_gateway_deployment" "this" {
   # 依存するリソースが作成されてからデプロイ
   depends_on = [
     aws_api_gateway_integration.lambda,
+    aws_api_gateway_integration.lambda_batch,
   ]
 
   # API の設定が変更されたら再デプロイ
@@ -178,6 +214,9 @@ resource "aws_api_gateway_deployment" "this" {
       aws_api_gateway_resource.orders.id,
       aws_api_gateway_method.post_orders.id,
       aws_api_gateway_integration.lambda.id,
+      aws_api_gateway_resource.orders_batch.id,
+      aws_api_gateway_method.post_orders_batch.id,
+      aws_api_gateway_integration.lambda_batch.id,
     ]))
   }
 
@@ -121,6 +121,20 @@ output "orders_endpoint" {
   value       = "${aws_api_gateway_stage.this.invoke_url}/orders"
 }
 
+output "orders_batch_endpoint" {
+  description = <<-EOT
+    /orders/batch エンドポイントの完全な URL。
+    
+    形式: https://{api-id}.execute-api.{region}.amazonaws.com/{stage}/orders/batch
+    
+    使用例:
+    curl -X POST {orders_batch_endpoint} \\
+      -H "Content-Type: application/json" \\
+      -d '{"orders": [{"customer_name": "山田太郎", "items": [{"name": "laptop", "quantity": 1, "price": 98000}], "total_amount": 98000}]}'
+  EOT
+  value       = "${aws_api_gateway_stage.this.invoke_url}/orders/batch"
+}
+
 #-------------------------------------------------------------------------------
 # CloudWatch Logs 情報
 #-------------------------------------------------------------------------------
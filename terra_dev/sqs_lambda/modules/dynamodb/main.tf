@@ -294,6 +294,126 @@ resource "aws_dynamodb_table" "orders" {
   # }
 }
 
+#-------------------------------------------------------------------------------
+# DynamoDB テーブル - Idempotency-Key 用
+#-------------------------------------------------------------------------------
+#
+# Producer Lambda が Idempotency-Key ヘッダーの処理状況を記録するテーブルです。
+#
+# ■ 仕組み
+#   1. 最初のリクエストが条件付き書き込み（attribute_not_exists）でキーを確保
+#   2. SQS への送信が完了したら status を COMPLETED にし、order_id を記録
+#   3. 同じキーでの再送（タイムアウト後のリトライなど）は、記録済みの
+#      order_id を返すだけで SQS には送信しない
+#
+# ■ TTL
+#   キーはクライアントがリトライする期間だけ保持できればよいため、
+#   expires_at（UNIX 秒）で自動削除する
+#
+resource "aws_dynamodb_table" "idempotency" {
+  name = "${var.project_name}-idempotency-${var.environment}"
+
+  # パーティションキーのみ（Idempotency-Key の値そのもの）
+  hash_key = "idempotency_key"
+
+  attribute {
+    name = "idempotency_key"
+    type = "S"
+  }
+
+  billing_mode = "PAY_PER_REQUEST"
+
+  ttl {
+    enabled        = true
+    attribute_name = "expires_at"
+  }
+
+  tags = merge(
+    {
+      Name        = "${var.project_name}-idempotency-${var.environment}"
+      Environment = var.environment
+      ManagedBy   = "terraform"
+      Purpose     = "Idempotency keys for order submission"
+    },
+    var.tags
+  )
+}
+
+#-------------------------------------------------------------------------------
+# DynamoDB テーブル - 顧客ごとの集計用
+#-------------------------------------------------------------------------------
+#
+# Consumer Lambda が顧客ごとの注文数（order_count）と売上（revenue）を
+# UpdateItem の ADD で加算するテーブルです。
+# ダッシュボードは orders テーブルをスキャンせずに、このテーブルを読みます。
+#
+resource "aws_dynamodb_table" "customer_aggregates" {
+  name = "${var.project_name}-customer-aggregates-${var.environment}"
+
+  # パーティションキーのみ（顧客 1 人につき 1 アイテム）
+  hash_key = "customer_name"
+
+  attribute {
+    name = "customer_name"
+    type = "S"
+  }
+
+  billing_mode = "PAY_PER_REQUEST"
+
+  tags = merge(
+    {
+      Name        = "${var.project_name}-customer-aggregates-${var.environment}"
+      Environment = var.environment
+      ManagedBy   = "terraform"
+      Purpose     = "Per-customer order aggregates"
+    },
+    var.tags
+  )
+}
+
+#-------------------------------------------------------------------------------
+# DynamoDB テーブル - 集計の適用済みマーカー用
+#-------------------------------------------------------------------------------
+#
+# 集計に加算済みの order_id を記録するテーブルです。
+#
+# ■ 仕組み
+#   顧客ごとの加算と同じ TransactWriteItems で、注文ごとのマーカーを
+#   条件付き書き込み（attribute_not_exists）で作成します。
+#   SQS の再配信で同じ注文が届いてもマーカーの条件チェックで検出し、二重に加算しません。
+#
+# ■ TTL
+#   再配信が起こりうるのは SQS の保持期間（最大 14 日）の間だけなので、
+#   expires_at（UNIX 秒）で自動削除する
+#
+resource "aws_dynamodb_table" "aggregate_markers" {
+  name = "${var.project_name}-aggregate-markers-${var.environment}"
+
+  hash_key = "order_id"
+
+  attribute {
+    name = "order_id"
+    type = "S"
+  }
+
+  billing_mode = "PAY_PER_REQUEST"
+
+  ttl {
+    enabled        = true
+    attribute_name = "expires_at"
+  }
+
+  tags = merge(
+    {
+      Name        = "${var.project_name}-aggregate-markers-${var.environment}"
+      Environment = var.environment
+      ManagedBy   = "terraform"
+      Purpose     = "Orders already applied to customer aggregates"
+    },
+    var.tags
+  )
+}
+
 #===============================================================================
 # 追加設定オプション（参考）
 #===============================================================================
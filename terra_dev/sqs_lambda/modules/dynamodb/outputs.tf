@@ -193,6 +193,45 @@ output "range_key" {
   value       = aws_dynamodb_table.orders.range_key
 }
 
+output "idempotency_table_name" {
+  description = <<-EOT
+    Idempotency-Key 用テーブルの名前。
+    
+    Producer Lambda の環境変数 IDEMPOTENCY_TABLE_NAME に設定します。
+  EOT
+  value       = aws_dynamodb_table.idempotency.name
+}
+
+output "idempotency_table_arn" {
+  description = "Idempotency-Key 用テーブルの ARN（Producer Lambda の IAM ポリシーで使用）"
+  value       = aws_dynamodb_table.idempotency.arn
+}
+
+output "customer_aggregates_table_name" {
+  description = <<-EOT
+    顧客ごとの集計テーブルの名前。
+    
+    Consumer Lambda の環境変数 CUSTOMER_AGGREGATES_TABLE_NAME に設定します。
+    scripts/customer_aggregates.py で集計を読み出せます。
+  EOT
+  value       = aws_dynamodb_table.customer_aggregates.name
+}
+
+output "customer_aggregates_table_arn" {
+  description = "顧客ごとの集計テーブルの ARN（Consumer Lambda の IAM ポリシーで使用）"
+  value       = aws_dynamodb_table.customer_aggregates.arn
+}
+
+output "aggregate_markers_table_name" {
+  description = "集計の適用済みマーカーテーブルの名前（Consumer Lambda の環境変数 AGGREGATE_MARKERS_TABLE_NAME）"
+  value       = aws_dynamodb_table.aggregate_markers.name
+}
+
+output "aggregate_markers_table_arn" {
+  description = "集計の適用済みマーカーテーブルの ARN（Consumer Lambda の IAM ポリシーで使用）"
+  value       = aws_dynamodb_table.aggregate_markers.arn
+}
+
 #===============================================================================
 # 追加の output 例（拡張時に使用）
 #===============================================================================
@@ -0,0 +1,86 @@
+#===============================================================================
+# S3 モジュール - 大きな注文ペイロード用バケット（Claim-Check パターン）
+#===============================================================================
+#
+# 【Claim-Check パターンについて】
+# SQS のメッセージ本文は最大 256 KB で、64 KB ごとに 1 リクエストとして課金されます。
+# 商品数の多い注文をそのまま MessageBody に入れると、上限に近づくうえに
+# 1 メッセージあたりのコストも増えます。
+#
+# Claim-Check パターンでは:
+# 1. Producer が大きな注文本文を圧縮して S3 に保存
+# 2. SQS には S3 のキーとチェックサムだけを持つ小さなメッセージを送信
+# 3. Consumer が S3 から本文を取得・展開して処理
+#
+# 小さな注文は従来どおり MessageBody にそのまま入れて送信します。
+#
+#===============================================================================
+
+#-------------------------------------------------------------------------------
+# ペイロード保存用バケット
+#-------------------------------------------------------------------------------
+resource "aws_s3_bucket" "payloads" {
+  # バケット名はグローバルで一意である必要があるため、アカウント ID を含める
+  bucket = "${var.project_name}-order-payloads-${var.environment}-${var.account_id}"
+
+  # 学習用のため、terraform destroy でオブジェクトごと削除できるようにする
+  force_destroy = var.environment != "prod"
+
+  tags = merge(
+    var.tags,
+    {
+      Name        = "${var.project_name}-order-payloads-${var.environment}"
+      Environment = var.environment
+      Purpose     = "Claim-check storage for large order payloads"
+    }
+  )
+}
+
+#-------------------------------------------------------------------------------
+# パブリックアクセスのブロック
+#-------------------------------------------------------------------------------
+# 注文データには個人情報が含まれるため、パブリックアクセスをすべて禁止する
+resource "aws_s3_bucket_public_access_block" "payloads" {
+  bucket = aws_s3_bucket.payloads.id
+
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+#-------------------------------------------------------------------------------
+# サーバーサイド暗号化
+#-------------------------------------------------------------------------------
+# SSE-S3（S3 管理のキー、追加コストなし）で暗号化する
+resource "aws_s3_bucket_server_side_encryption_configuration" "payloads" {
+  bucket = aws_s3_bucket.payloads.id
+
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm = "AES256"
+    }
+  }
+}
+
+#-------------------------------------------------------------------------------
+# ライフサイクルルール
+#-------------------------------------------------------------------------------
+# ペイロードは Consumer が DynamoDB に保存した時点で不要になる
+# ただし DLQ からの再処理にも使うため、DLQ の保持期間より長く残す
+resource "aws_s3_bucket_lifecycle_configuration" "payloads" {
+  bucket = aws_s3_bucket.payloads.id
+
+  rule {
+    id     = "expire-order-payloads"
+    status = "Enabled"
+
+    filter {
+      prefix = var.key_prefix
+    }
+
+    expiration {
+      days = var.expiration_days
+    }
+  }
+}
@@ -0,0 +1,26 @@
+#===============================================================================
+# S3 モジュール - 出力定義
+#===============================================================================
+
+output "bucket_name" {
+  description = <<-EOT
+    ペイロード保存用バケットの名前
+    
+    Producer / Consumer Lambda の環境変数 CLAIM_CHECK_BUCKET に設定します。
+  EOT
+  value       = aws_s3_bucket.payloads.id
+}
+
+output "bucket_arn" {
+  description = <<-EOT
+    ペイロード保存用バケットの ARN
+    
+    IAM ポリシーでオブジェクトを指定する場合は "<bucket_arn>/*" の形式で使用します。
+  EOT
+  value       = aws_s3_bucket.payloads.arn
+}
+
+output "key_prefix" {
+  description = "ペイロードを保存するオブジェクトキーのプレフィックス"
+  value       = var.key_prefix
+}
@@ -0,0 +1,88 @@
+#===============================================================================
+# S3 モジュール - 変数定義
+#===============================================================================
+
+#-------------------------------------------------------------------------------
+# 必須変数
+#-------------------------------------------------------------------------------
+
+variable "environment" {
+  description = <<-EOT
+    デプロイ環境を指定します。
+    例: dev, staging, prod
+    
+    この値はバケット名のサフィックスとして使用されます。
+    prod 以外では force_destroy を有効にします。
+  EOT
+  type        = string
+
+  validation {
+    condition     = contains(["dev", "staging", "prod"], var.environment)
+    error_message = "environment は 'dev', 'staging', 'prod' のいずれかである必要があります。"
+  }
+}
+
+variable "project_name" {
+  description = <<-EOT
+    プロジェクト名を指定します。
+    
+    この値はバケット名のプレフィックスとして使用されます。
+  EOT
+  type        = string
+
+  validation {
+    condition     = can(regex("^[a-z0-9-]{3,20}$", var.project_name))
+    error_message = "project_name は小文字の英数字とハイフンのみ、3〜20文字で指定してください。"
+  }
+}
+
+variable "account_id" {
+  description = <<-EOT
+    AWS アカウント ID
+    
+    S3 バケット名はすべての AWS アカウントで一意である必要があるため、
+    バケット名の末尾に付与します。
+  EOT
+  type        = string
+}
+
+#-------------------------------------------------------------------------------
+# オプション変数
+#-------------------------------------------------------------------------------
+
+variable "key_prefix" {
+  description = <<-EOT
+    ペイロードを保存するオブジェクトキーのプレフィックス
+    
+    ライフサイクルルールの対象を絞り込むために使用します。
+    Producer Lambda の CLAIM_CHECK_PREFIX と同じ値を指定してください。
+  EOT
+  type        = string
+  default     = "orders/"
+}
+
+variable "expiration_days" {
+  description = <<-EOT
+    ペイロードを自動削除するまでの日数
+    
+    DLQ のメッセージ保持期間（最大 14 日）より長く設定しないと、
+    DLQ から再処理する際にペイロードが失われます。
+  EOT
+  type        = number
+  default     = 15
+
+  validation {
+    condition     = var.expiration_days >= 1
+    error_message = "expiration_days は 1 以上で指定してください。"
+  }
+}
+
+variable "tags" {
+  description = <<-EOT
+    リソースに付与する追加タグ
+    
+    Name, Environment タグは自動的に付与されます。
+  EOT
+  type        = map(string)
+  default     = {}
+}
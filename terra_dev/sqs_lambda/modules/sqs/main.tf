@@ -38,6 +38,16 @@
 #
 #===============================================================================
 
+#-------------------------------------------------------------------------------
+# FIFO モード
+#-------------------------------------------------------------------------------
+# fifo_queue = true の場合、メインキューと DLQ の両方を FIFO キューにする
+# （FIFO キューの DLQ も FIFO キューである必要がある）
+# FIFO キューの名前は .fifo で終わる必要がある
+locals {
+  queue_name_suffix = var.fifo_queue ? ".fifo" : ""
+}
+
 #-------------------------------------------------------------------------------
 # Dead Letter Queue (DLQ)
 #-------------------------------------------------------------------------------
@@ -45,8 +55,9 @@
 # メインキューより先に作成する必要がある（リドライブポリシーで参照するため）
 #-------------------------------------------------------------------------------
 resource "aws_sqs_queue" "dead_letter_queue" {
-  # キュー名: プロジェクト名-orders-dlq-環境名
-  name = "${var.project_name}-orders-dlq-${var.environment}"
+  # キュー名: プロジェクト名-orders-dlq-環境名（FIFO の場合は末尾に .fifo）
+  name       = "${var.project_name}-orders-dlq-${var.environment}${local.queue_name_suffix}"
+  fifo_queue = var.fifo_queue
 
   #-----------------------------------------------------------------------------
   # メッセージ保持期間（Message Retention Period）
@@ -97,8 +108,23 @@ resource "aws_sqs_queue" "dead_letter_queue" {
 # Lambda からトリガーされ、処理に失敗したメッセージは DLQ に移動
 #-------------------------------------------------------------------------------
 resource "aws_sqs_queue" "main_queue" {
-  # キュー名: プロジェクト名-orders-queue-環境名
-  name = "${var.project_name}-orders-queue-${var.environment}"
+  # キュー名: プロジェクト名-orders-queue-環境名（FIFO の場合は末尾に .fifo）
+  name = "${var.project_name}-orders-queue-${var.environment}${local.queue_name_suffix}"
+
+  #-----------------------------------------------------------------------------
+  # FIFO 設定
+  #-----------------------------------------------------------------------------
+  # MessageGroupId が同じメッセージは送信順に 1 つずつ処理される
+  # 異なるグループのメッセージは並列に処理できる
+  #
+  # - content_based_deduplication: false
+  #     Producer が MessageDeduplicationId（order_id）を明示的に指定する
+  # - deduplication_scope / fifo_throughput_limit: メッセージグループ単位
+  #     高スループット FIFO: グループごとにスループット上限が適用される
+  fifo_queue                  = var.fifo_queue
+  content_based_deduplication = var.fifo_queue ? false : null
+  deduplication_scope         = var.fifo_queue ? "messageGroup" : null
+  fifo_throughput_limit       = var.fifo_queue ? "perMessageGroupId" : null
 
   #-----------------------------------------------------------------------------
   # メッセージ保持期間
@@ -128,6 +128,25 @@ variable "max_receive_count" {
   }
 }
 
+#-------------------------------------------------------------------------------
+# オプション変数 - FIFO モード
+#-------------------------------------------------------------------------------
+
+variable "fifo_queue" {
+  description = <<-EOT
+    メインキューと DLQ を FIFO キューとして作成するかどうか
+    
+    true にすると、同じ MessageGroupId のメッセージは送信順に処理されます。
+    キュー名の末尾には .fifo が付きます。
+    
+    注意:
+    - 既存のキューの種類は変更できないため、切り替えるとキューが再作成されます
+    - 送信時に MessageGroupId（と MessageDeduplicationId）が必須になります
+  EOT
+  type        = bool
+  default     = false
+}
+
 #-------------------------------------------------------------------------------
 # オプション変数 - タグ
 #-------------------------------------------------------------------------------
@@ -49,6 +49,21 @@ output "orders_endpoint" {
   value       = module.api_gateway.orders_endpoint
 }
 
+output "orders_batch_endpoint" {
+  description = <<-EOT
+    /orders/batch エンドポイントの完全な URL
+    
+    複数の注文をまとめて作成するための POST リクエスト先です。
+    注文ごとの結果（ACCEPTED / REJECTED / FAILED）が results に返ります。
+    
+    使用例:
+    curl -X POST {orders_batch_endpoint} \
+      -H "Content-Type: application/json" \
+      -d '{"orders": [{"customer_name": "山田太郎", "items": [{"name": "laptop", "quantity": 1, "price": 98000}], "total_amount": 98000}]}'
+  EOT
+  value       = module.api_gateway.orders_batch_endpoint
+}
+
 #-------------------------------------------------------------------------------
 # Lambda 関連の出力
 #-------------------------------------------------------------------------------
@@ -197,6 +212,30 @@ output "dynamodb_table_arn" {
   value       = module.dynamodb.table_arn
 }
 
+output "customer_aggregates_table_name" {
+  description = <<-EOT
+    顧客ごとの集計（注文数・売上）テーブルの名前
+
+    集計の確認:
+    python scripts/customer_aggregates.py list --table {customer_aggregates_table_name}
+  EOT
+  value       = module.dynamodb.customer_aggregates_table_name
+}
+
+#-------------------------------------------------------------------------------
+# S3 関連の出力
+#-------------------------------------------------------------------------------
+
+output "claim_check_bucket_name" {
+  description = <<-EOT
+    大きな注文本文を保存する S3 バケット名
+    
+    閾値（claim_check_threshold_bytes）を超えた注文の本文は
+    {bucket}/orders/{order_id}.json.gz（または .json.zst）に保存されます。
+  EOT
+  value       = module.s3.bucket_name
+}
+
 #-------------------------------------------------------------------------------
 # アカウント情報
 #-------------------------------------------------------------------------------
@@ -0,0 +1,112 @@
+"""
+顧客ごとの集計（注文数・売上）を読み出す CLI
+=============================================
+Consumer Lambda が加算している集計テーブルを読み、顧客ごとの注文数と売上を表示する
+集計テーブルは顧客 1 人につき 1 アイテムなので、orders テーブルをスキャンする必要はない
+
+使い方:
+    python scripts/customer_aggregates.py get 山田太郎 佐藤花子
+    python scripts/customer_aggregates.py list --top 20 --sort revenue
+    python scripts/customer_aggregates.py list --json
+
+テーブル名は --table、または環境変数 CUSTOMER_AGGREGATES_TABLE_NAME で指定する
+（terraform output -raw customer_aggregates_table_name で確認できる）
+
+必要なパッケージ: boto3
+"""
+
+import argparse
+import json
+import os
+import sys
+from decimal import Decimal
+
+import boto3
+
+# BatchGetItem の 1 リクエストあたりの上限
+BATCH_GET_MAX_KEYS = 100
+
+
+def to_row(item: dict) -> dict:
+    revenue = item.get('revenue', Decimal(0))
+    return {
+        'customer_name': item['customer_name'],
+        'order_count': int(item.get('order_count', 0)),
+        'revenue': float(revenue),
+        'updated_at': item.get('updated_at')
+    }
+
+
+def get_aggregates(table_name: str, customer_names: list) -> list:
+    """指定した顧客の集計を BatchGetItem で読む（集計がない顧客は注文数 0 として返す）"""
+    # BatchGetItem は同じキーが重複すると ValidationException になるため、指定順を保って重複を除く
+    customer_names = list(dict.fromkeys(customer_names))
+    dynamodb = boto3.resource('dynamodb')
+    found = {}
+    for start in range(0, len(customer_names), BATCH_GET_MAX_KEYS):
+        request_items = {
+            table_name: {'Keys': [{'customer_name': name} for name in customer_names[start:start + BATCH_GET_MAX_KEYS]]}
+        }
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            for item in response['Responses'].get(table_name, []):
+                found[item['customer_name']] = to_row(item)
+            request_items = response.get('UnprocessedKeys') or {}
+    return [
+        found.get(name, {'customer_name': name, 'order_count': 0, 'revenue': 0.0, 'updated_at': None})
+        for name in customer_names
+    ]
+
+
+def list_aggregates(table_name: str, sort_key: str, top: int) -> list:
+    """全顧客の集計を読み、sort_key の降順で上位 top 件を返す"""
+    table = boto3.resource('dynamodb').Table(table_name)
+    rows = []
+    kwargs = {}
+    while True:
+        response = table.scan(**kwargs)
+        rows.extend(to_row(item) for item in response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    rows.sort(key=lambda row: row[sort_key], reverse=True)
+    return rows[:top] if top else rows
+
+
+def print_rows(rows: list) -> None:
+    print(f"{'customer_name':<30} {'orders':>8} {'revenue':>14}  updated_at")
+    for row in rows:
+        print(f"{row['customer_name']:<30} {row['order_count']:>8} {row['revenue']:>14,.2f}  {row['updated_at'] or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='顧客ごとの集計（注文数・売上）を読み出す')
+    parser.add_argument('--table', default=os.environ.get('CUSTOMER_AGGREGATES_TABLE_NAME'),
+                        help='集計テーブル名（既定: 環境変数 CUSTOMER_AGGREGATES_TABLE_NAME）')
+    parser.add_argument('--json', action='store_true', help='JSON で出力する')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    get_parser = subparsers.add_parser('get', help='指定した顧客の集計を表示する')
+    get_parser.add_argument('customer_names', nargs='+')
+
+    list_parser = subparsers.add_parser('list', help='全顧客の集計を表示する')
+    list_parser.add_argument('--sort', default='revenue', choices=['revenue', 'order_count'])
+    list_parser.add_argument('--top', type=int, default=0, help='上位 N 件だけ表示する（0 なら全件）')
+
+    args = parser.parse_args()
+    if not args.table:
+        sys.exit('--table または CUSTOMER_AGGREGATES_TABLE_NAME を指定してください')
+
+    if args.command == 'get':
+        rows = get_aggregates(args.table, args.customer_names)
+    else:
+        rows = list_aggregates(args.table, args.sort, args.top)
+
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    else:
+        print_rows(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+注文パイプラインのレイテンシーレポート
+======================================
+Consumer（Lambda / worker）が Embedded Metric Format（EMF）で出力したレイテンシーのログを読み、
+区間ごとのパーセンタイル（p50 / p90 / p99 / max）を表示する
+
+batch_size・maximum_batching_window_in_seconds・CONSUMER_CONCURRENCY を変えたときに、
+どの区間の時間が変わったかを数値で比べるために使う
+
+- ProducerMs: Producer がリクエストを受け取ってから SQS に送信するまで
+- QueueWaitMs: SQS に届いてから最初に受信されるまで
+- DispatchDelayMs: 最初に受信されてから処理を始めるまで（バッチウィンドウでの待ちを含む）
+- ProcessingMs: パース・S3 からの取得・注文処理
+- WriteMs: DynamoDB への書き込み
+- EndToEndMs: API がリクエストを受け取ってから書き込みが終わるまで
+
+使い方:
+    # CloudWatch Logs から直近 60 分のログを読む
+    python scripts/latency_report.py --log-group /aws/lambda/sqs-lambda-consumer-dev --minutes 60
+
+    # ファイル（worker の標準出力など）から読む。--by でバッチサイズなどごとに分ける
+    python worker/worker.py --local 500 > worker.log
+    python scripts/latency_report.py worker.log --by BatchSize
+
+必要なパッケージ: boto3（--log-group の場合）
+"""
+
+import argparse
+import json
+import sys
+import time
+
+METRIC_NAMES = ('ProducerMs', 'QueueWaitMs', 'DispatchDelayMs', 'ProcessingMs', 'WriteMs', 'EndToEndMs')
+PERCENTILES = (50, 90, 99)
+
+
+def parse_documents(lines):
+    """ログの行から EMF のドキュメントだけを取り出す（JSON の前に付いた文字列は読み飛ばす）"""
+    for line in lines:
+        start = line.find('{')
+        if start < 0 or '"_aws"' not in line:
+            continue
+        try:
+            document = json.loads(line[start:])
+        except json.JSONDecodeError:
+            continue
+        if isinstance(document, dict) and any(name in document for name in METRIC_NAMES):
+            yield document
+
+
+def read_log_group(log_group: str, minutes: int):
+    """CloudWatch Logs から EMF のログイベントを読む"""
+    import boto3
+
+    logs = boto3.client('logs')
+    kwargs = {
+        'logGroupName': log_group,
+        'startTime': int((time.time() - minutes * 60) * 1000),
+        'filterPattern': '"EndToEndMs"'
+    }
+    for page in logs.get_paginator('filter_log_events').paginate(**kwargs):
+        for event in page['events']:
+            yield event['message']
+
+
+def percentile(values: list, pct: float) -> float:
+    """最近傍法によるパーセンタイル（values はソート済み）"""
+    index = max(0, min(len(values) - 1, round(pct / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def summarize(documents, group_by: str = None) -> dict:
+    """
+    グループ → メトリクス名 → {count, p50, p90, p99, max} を作る
+    """
+    samples: dict = {}
+    for document in documents:
+        group = str(document.get(group_by)) if group_by else 'all'
+        for name in METRIC_NAMES:
+            values = document.get(name)
+            if isinstance(values, (int, float)):
+                values = [values]
+            if values:
+                samples.setdefault(group, {}).setdefault(name, []).extend(values)
+
+    report = {}
+    for group, metrics in sorted(samples.items()):
+        report[group] = {}
+        for name in METRIC_NAMES:
+            values = sorted(metrics.get(name, []))
+            if not values:
+                continue
+            report[group][name] = {
+                'count': len(values),
+                **{f'p{pct}': round(percentile(values, pct), 1) for pct in PERCENTILES},
+                'max': round(values[-1], 1)
+            }
+    return report
+
+
+def print_report(report: dict, group_by: str = None) -> None:
+    for group, metrics in report.items():
+        if group_by:
+            print(f"\n{group_by} = {group}")
+        print(f"{'metric':<16} {'count':>7} {'p50 (ms)':>10} {'p90 (ms)':>10} {'p99 (ms)':>10} {'max (ms)':>10}")
+        for name, stats in metrics.items():
+            print(f"{name:<16} {stats['count']:>7} {stats['p50']:>10.1f} {stats['p90']:>10.1f} "
+                  f"{stats['p99']:>10.1f} {stats['max']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='注文パイプラインのレイテンシーレポート')
+    parser.add_argument('files', nargs='*', help='EMF のログを含むファイル（- で標準入力）')
+    parser.add_argument('--log-group', help='CloudWatch Logs のロググループ名')
+    parser.add_argument('--minutes', type=int, default=60, help='--log-group で読む期間（分）')
+    parser.add_argument('--by', default=None, choices=['BatchSize', 'ConsumerConcurrency', 'PersistenceMode', 'Service'],
+                        help='このプロパティの値ごとに分けて集計する')
+    parser.add_argument('--json', action='store_true', help='JSON で出力する')
+    args = parser.parse_args()
+
+    if args.log_group:
+        lines = read_log_group(args.log_group, args.minutes)
+    elif args.files:
+        lines = (
+            line
+            for path in args.files
+            for line in (sys.stdin if path == '-' else open(path, encoding='utf-8'))
+        )
+    else:
+        sys.exit('ファイルまたは --log-group を指定してください')
+
+    report = summarize(parse_documents(lines), args.by)
+    if not report:
+        sys.exit('レイテンシーのメトリクスが見つかりませんでした')
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args.by)
+
+
+if __name__ == '__main__':
+    main()
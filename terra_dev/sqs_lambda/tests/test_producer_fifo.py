@@ -0,0 +1,90 @@
+"""
+FIFO モードのバッチ送信で、グループ内の順序が保たれることのテスト
+
+SendMessageBatch をスタブに置き換え、グループの途中のエントリを失敗させて
+- 1 回の呼び出しに同じ MessageGroupId のエントリが 1 件までしか含まれない
+- 失敗したエントリより後ろの同じグループのエントリは送信されず、FAILED で返る
+- 他のグループはリクエスト内の順序で送信される
+ことを確認する
+
+使い方:
+    python -m pytest tests/test_producer_fifo.py
+"""
+
+import importlib.util
+import json
+import os
+from pathlib import Path
+
+LAMBDA_CODE_DIR = Path(__file__).resolve().parent.parent / 'lambda_code'
+
+
+def load_producer():
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-1')
+    os.environ['SQS_FIFO_ENABLED'] = 'true'
+    os.environ['SQS_QUEUE_URL'] = 'https://sqs.ap-northeast-1.amazonaws.com/123456789012/orders.fifo'
+    spec = importlib.util.spec_from_file_location('producer_index', LAMBDA_CODE_DIR / 'producer' / 'index.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class StubSqsClient:
+    """指定したエントリ Id を常に失敗（SenderFault: False）させる SendMessageBatch のスタブ"""
+
+    def __init__(self, failing_ids: set):
+        self.failing_ids = failing_ids
+        self.calls: list = []
+        self.delivered: list = []
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.calls.append([entry['Id'] for entry in Entries])
+        successful, failed = [], []
+        for entry in Entries:
+            if entry['Id'] in self.failing_ids:
+                failed.append({'Id': entry['Id'], 'Code': 'InternalError', 'Message': 'stub', 'SenderFault': False})
+            else:
+                self.delivered.append(entry)
+                successful.append({'Id': entry['Id'], 'MessageId': f"msg-{entry['Id']}"})
+        return {'Successful': successful, 'Failed': failed}
+
+
+def test_failed_entry_blocks_following_entries_of_the_same_group(monkeypatch):
+    producer = load_producer()
+    monkeypatch.setattr(producer, 'BATCH_SEND_BASE_DELAY_SECONDS', 0)
+
+    orders = [
+        {'customer_name': customer, 'items': [{'name': f'item-{index}', 'quantity': 1, 'price': 100}], 'total_amount': 100}
+        for index, customer in enumerate(['alice', 'alice', 'alice', 'bob', 'bob'])
+    ]
+    group_of = {
+        customer: producer.fifo_message_parameters({'order_id': 'x', 'customer_name': customer})['MessageGroupId']
+        for customer in ('alice', 'bob')
+    }
+    assert group_of['alice'] != group_of['bob']
+
+    # alice の 2 件目（index 1）だけを失敗させる
+    stub = StubSqsClient(failing_ids={'1'})
+    monkeypatch.setattr(producer, 'sqs_client', stub)
+
+    response = producer.handle_batch_request({'orders': orders}, request_id='req-1')
+    results = json.loads(response['body'])['results']
+    statuses = [result['status'] for result in results]
+
+    assert response['statusCode'] == 207
+    assert statuses == ['ACCEPTED', 'FAILED', 'FAILED', 'ACCEPTED', 'ACCEPTED']
+    assert results[1]['error_code'] == 'InternalError'
+    assert results[2]['error_code'] == 'NotSentAfterGroupFailure'
+    assert results[2]['retryable'] is True
+
+    # 1 回の呼び出しに同じグループのエントリは 1 件まで
+    entries_by_id = {str(index): orders[index]['customer_name'] for index in range(len(orders))}
+    for call in stub.calls:
+        customers = [entries_by_id[entry_id] for entry_id in call]
+        assert len(customers) == len(set(customers))
+
+    # index 2 は一度も送信されず、届いた順序はグループごとにリクエスト内の順序
+    assert all('2' not in call for call in stub.calls)
+    delivered = [(entry['MessageGroupId'], entry['Id']) for entry in stub.delivered]
+    assert [entry_id for group, entry_id in delivered if group == group_of['alice']] == ['0']
+    assert [entry_id for group, entry_id in delivered if group == group_of['bob']] == ['3', '4']
@@ -251,6 +251,106 @@ variable "sqs_max_receive_count" {
   }
 }
 
+variable "sqs_fifo_enabled" {
+  description = <<-EOT
+    注文キューを FIFO キューにするかどうか
+    
+    true にすると、Producer は customer_name のハッシュから MessageGroupId を、
+    order_id から MessageDeduplicationId を設定します。
+    同じ顧客の注文は送信順に 1 つずつ処理され、異なるグループは並列に処理されます。
+    
+    デフォルト: false（標準キュー）
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "sqs_fifo_message_groups" {
+  description = <<-EOT
+    FIFO モードで顧客を割り当てるメッセージグループ数（N）
+    
+    customer_name のハッシュを N で割った余りでグループを決めます。
+    
+    考慮事項:
+    - 大きいほど並列に処理できるグループが増え、スループットが上がる
+    - 同じグループに入った別の顧客の注文も順番待ちになる
+    - Lambda の同時実行数はアクティブなグループ数が上限になる
+  EOT
+  type        = number
+  default     = 16
+
+  validation {
+    condition     = var.sqs_fifo_message_groups >= 1 && var.sqs_fifo_message_groups <= 1024
+    error_message = "sqs_fifo_message_groups は 1 ～ 1024 の範囲で指定してください"
+  }
+}
+
+#-------------------------------------------------------------------------------
+# Claim-Check（S3 オフロード）関連変数
+#-------------------------------------------------------------------------------
+# SQS のメッセージ本文は最大 256 KB で、64 KB ごとに 1 リクエストとして課金されます。
+# 閾値を超える注文は本文を S3 に圧縮保存し、SQS にはポインターだけを送ります。
+
+variable "claim_check_threshold_bytes" {
+  description = <<-EOT
+    S3 にオフロードする注文本文のサイズ閾値（バイト）
+    
+    JSON にシリアライズした注文本文がこのサイズを超えると、
+    本文を圧縮して S3 に保存し、SQS にはポインターとチェックサムのみを送信します。
+    
+    デフォルト: 65,536 バイト（64 KB）
+    
+    考慮事項:
+    - 64 KB 以下のメッセージは SQS の 1 リクエスト分の料金で送信できる
+    - 小さくしすぎると、S3 の PUT/GET のコストとレイテンシーが増える
+    - 256 KB（SQS の上限）より大きい値は指定できない
+  EOT
+  type        = number
+  default     = 65536
+
+  validation {
+    condition     = var.claim_check_threshold_bytes >= 1024 && var.claim_check_threshold_bytes <= 262144
+    error_message = "claim_check_threshold_bytes は 1024 ～ 262144（256 KB）の範囲で指定してください"
+  }
+}
+
+variable "claim_check_expiration_days" {
+  description = <<-EOT
+    S3 に保存した注文本文を自動削除するまでの日数
+    
+    DLQ から再処理する際にも本文が必要なため、
+    SQS のメッセージ保持期間より長く設定してください。
+  EOT
+  type        = number
+  default     = 15
+}
+
+#-------------------------------------------------------------------------------
+# Idempotency-Key 関連変数
+#-------------------------------------------------------------------------------
+
+variable "idempotency_ttl_seconds" {
+  description = <<-EOT
+    Idempotency-Key を保持する期間（秒）
+    
+    この期間内に同じキーで再送されたリクエストは、最初のリクエストで
+    作成した order_id を返し、SQS には送信しません。
+    
+    デフォルト: 86,400 秒（24時間）
+    
+    考慮事項:
+    - クライアントがリトライする可能性のある期間より長く設定する
+    - 期間を過ぎたキーは DynamoDB TTL で自動削除される
+  EOT
+  type        = number
+  default     = 86400
+
+  validation {
+    condition     = var.idempotency_ttl_seconds >= 60
+    error_message = "idempotency_ttl_seconds は 60 以上で指定してください"
+  }
+}
+
 #-------------------------------------------------------------------------------
 # CloudWatch Logs 関連変数
 #-------------------------------------------------------------------------------
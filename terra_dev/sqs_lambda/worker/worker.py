@@ -0,0 +1,404 @@
+"""
+SQS ロングポーリング Worker（常駐型の Consumer）
+=================================================
+Consumer Lambda（lambda_code/consumer/index.py）の処理を、Lambda ではなく常駐プロセスで実行する
+大量のメッセージが途切れずに届く場合は、バッチごとに Lambda を起動するより常駐 Worker の方が安くなる
+
+【動作】
+1. --threads 個のスレッドがそれぞれ receive_message をロングポーリング（1 回最大 10 件）で呼ぶ
+2. 受信したメッセージを Consumer の handle_record（内部で process_single_message）で 1 件ずつ処理する
+3. 処理に時間がかかっているメッセージは、ハートビートスレッドが ChangeMessageVisibility で
+   可視性タイムアウトを延長する（処理中に他の Worker へ再配信されないようにする）
+4. 成功したメッセージとリトライ不要なメッセージは delete_message_batch でまとめて削除する
+   リトライが必要なメッセージは削除せず、可視性タイムアウト後に再配信させる（Lambda の部分バッチ応答と同じ）
+5. SIGINT / SIGTERM を受けたら新しい受信をやめ、処理中のメッセージを片付けてから終了する
+
+使い方:
+    # 実際のキューに対して実行（テーブル名などは Consumer Lambda と同じ環境変数で渡す）
+    DYNAMODB_TABLE_NAME=... python worker/worker.py --queue-url https://sqs... --threads 8
+
+    # moto のキューとテーブルに合成した注文を入れて、ローカルでスループットを計測
+    python worker/worker.py --local 500 --threads 8
+    python worker/worker.py --local 500 --threads 8 --latency-ms 8
+
+必要なパッケージ: boto3（--local の場合は moto も）
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+CONSUMER_PATH = Path(__file__).resolve().parent.parent / 'lambda_code' / 'consumer' / 'index.py'
+
+# receive_message / delete_message_batch / change_message_visibility_batch の 1 回あたりの上限
+SQS_MAX_MESSAGES = 10
+
+logger = logging.getLogger('worker')
+
+
+def load_consumer():
+    """Consumer Lambda のコードをモジュールとして読み込む（環境変数は読み込み前に設定しておく）"""
+    spec = importlib.util.spec_from_file_location('consumer', CONSUMER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def to_lambda_message_attributes(message_attributes: dict) -> dict:
+    """receive_message の MessageAttributes を、Lambda のイベントと同じ形（キーが小文字始まり）にする"""
+    return {
+        name: {'stringValue': value.get('StringValue'), 'dataType': value['DataType']}
+        for name, value in message_attributes.items()
+    }
+
+
+def to_lambda_record(message: dict) -> dict:
+    """receive_message のメッセージを、SQS トリガーの Lambda に届くレコードと同じ形にする"""
+    return {
+        'messageId': message['MessageId'],
+        'receiptHandle': message['ReceiptHandle'],
+        'body': message['Body'],
+        'attributes': message.get('Attributes', {}),
+        'messageAttributes': to_lambda_message_attributes(message.get('MessageAttributes', {})),
+        'eventSource': 'aws:sqs'
+    }
+
+
+class WorkerStats:
+    """スレッドをまたいで処理件数を数える"""
+
+    def __init__(self):
+        self.received = 0
+        self.deleted = 0
+        self.retried = 0
+        self.extended = 0
+        self.started_at = time.monotonic()
+        # スループットは最後に削除した時刻までで計算する（終了前の待ち時間を含めない）
+        self.last_deleted_at = self.started_at
+        self._lock = threading.Lock()
+
+    def add(self, **counts) -> None:
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+            if counts.get('deleted'):
+                self.last_deleted_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = self.last_deleted_at - self.started_at
+            return {
+                'received': self.received,
+                'deleted': self.deleted,
+                'retried': self.retried,
+                'visibility_extended': self.extended,
+                'elapsed_seconds': round(elapsed, 1),
+                'messages_per_second': round(self.deleted / elapsed, 1) if elapsed else 0.0
+            }
+
+
+class VisibilityHeartbeat:
+    """
+    処理中のメッセージの可視性タイムアウトを定期的に延長する
+
+    受信してから heartbeat_interval 秒以上経っても処理が終わっていないメッセージについて、
+    可視性タイムアウトを visibility_timeout 秒に延ばし直す
+    heartbeat_interval は visibility_timeout より十分短くする（既定は半分）
+    """
+
+    def __init__(self, sqs, queue_url: str, visibility_timeout: int, heartbeat_interval: float, stats: WorkerStats):
+        self.sqs = sqs
+        self.queue_url = queue_url
+        self.visibility_timeout = visibility_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.stats = stats
+        # receipt_handle → 最後に受信または延長した時刻（time.monotonic）
+        self._in_flight: dict = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='heartbeat', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def track(self, receipt_handles: list) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for receipt_handle in receipt_handles:
+                self._in_flight[receipt_handle] = now
+
+    def untrack(self, receipt_handles: list) -> None:
+        with self._lock:
+            for receipt_handle in receipt_handles:
+                self._in_flight.pop(receipt_handle, None)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.heartbeat_interval / 2):
+            now = time.monotonic()
+            with self._lock:
+                slow = [handle for handle, since in self._in_flight.items() if now - since >= self.heartbeat_interval]
+                for handle in slow:
+                    self._in_flight[handle] = now
+            for start in range(0, len(slow), SQS_MAX_MESSAGES):
+                entries = [
+                    {'Id': str(i), 'ReceiptHandle': handle, 'VisibilityTimeout': self.visibility_timeout}
+                    for i, handle in enumerate(slow[start:start + SQS_MAX_MESSAGES])
+                ]
+                try:
+                    response = self.sqs.change_message_visibility_batch(QueueUrl=self.queue_url, Entries=entries)
+                except Exception:
+                    logger.exception('可視性タイムアウトの延長に失敗しました')
+                    continue
+                self.stats.add(extended=len(response.get('Successful', [])))
+
+
+class Worker:
+    """
+    複数スレッドで SQS をロングポーリングし、Consumer の処理を実行する
+    """
+
+    def __init__(self, consumer, sqs, queue_url: str, threads: int, wait_seconds: int,
+                 visibility_timeout: int, heartbeat_interval: float, idle_exit_seconds: float = 0):
+        self.consumer = consumer
+        self.sqs = sqs
+        self.queue_url = queue_url
+        self.threads = threads
+        self.wait_seconds = wait_seconds
+        self.visibility_timeout = visibility_timeout
+        self.idle_exit_seconds = idle_exit_seconds
+        self.stats = WorkerStats()
+        self.heartbeat = VisibilityHeartbeat(sqs, queue_url, visibility_timeout, heartbeat_interval, self.stats)
+        self.stopping = threading.Event()
+
+    def request_stop(self, signum=None, frame=None) -> None:
+        """新しい受信をやめる（処理中のメッセージは削除まで終わらせる）"""
+        if not self.stopping.is_set():
+            logger.info('停止要求を受け付けました。処理中のメッセージを片付けて終了します')
+        self.stopping.set()
+
+    def poll_loop(self) -> None:
+        # スロットリングの状態は受信 1 回（= Lambda の 1 回の呼び出し）単位なので、ポーリングスレッドごとに持つ
+        throttle_cooldown = self.consumer.ThrottleCooldown(
+            self.consumer.THROTTLE_COOLDOWN_SECONDS, self.consumer.THROTTLE_COOLDOWN_MAX_SECONDS
+        )
+        self.consumer.use_throttle_cooldown(throttle_cooldown)
+        # レイテンシーのサンプルも、自分の受信分だけを書き出すようにポーリングスレッドごとに持つ
+        self.consumer.use_latency_recorder(self.consumer.LatencyRecorder())
+        idle_since = time.monotonic()
+        while not self.stopping.is_set():
+            # DynamoDB がスロットリングしていれば、クールダウンが明けるまで受信を待つ
+            throttle_cooldown.begin_invocation()
+            try:
+                response = self.sqs.receive_message(
+                    QueueUrl=self.queue_url,
+                    MaxNumberOfMessages=SQS_MAX_MESSAGES,
+                    WaitTimeSeconds=self.wait_seconds,
+                    VisibilityTimeout=self.visibility_timeout,
+                    AttributeNames=['All'],
+                    MessageAttributeNames=['All']
+                )
+            except Exception:
+                logger.exception('receive_message に失敗しました')
+                self.stopping.wait(1)
+                continue
+
+            messages = response.get('Messages', [])
+            if not messages:
+                if self.idle_exit_seconds and time.monotonic() - idle_since >= self.idle_exit_seconds:
+                    self.request_stop()
+                continue
+            idle_since = time.monotonic()
+            self.process_messages(messages)
+            throttle_cooldown.end_invocation()
+
+    def process_messages(self, messages: list) -> None:
+        records = [to_lambda_record(message) for message in messages]
+        self.heartbeat.track([record['receiptHandle'] for record in records])
+        self.stats.add(received=len(records))
+
+        to_delete = []
+        retried = 0
+        try:
+            for record in records:
+                # handle_record は process_single_message を呼び、リトライが必要な場合だけ失敗を返す
+                if self.consumer.handle_record(record) is None:
+                    to_delete.append(record)
+                else:
+                    retried += 1
+        finally:
+            self.heartbeat.untrack([record['receiptHandle'] for record in records])
+
+        self.delete_messages(to_delete)
+        self.stats.add(retried=retried)
+        # レイテンシーのメトリクス（EMF）を受信単位で書き出す（handle_record は 1 件ずつ保存する）
+        self.consumer.current_latency_recorder().flush(len(records), 'single')
+
+    def delete_messages(self, records: list) -> None:
+        for start in range(0, len(records), SQS_MAX_MESSAGES):
+            entries = [
+                {'Id': str(i), 'ReceiptHandle': record['receiptHandle']}
+                for i, record in enumerate(records[start:start + SQS_MAX_MESSAGES])
+            ]
+            try:
+                response = self.sqs.delete_message_batch(QueueUrl=self.queue_url, Entries=entries)
+            except Exception:
+                # 削除できなかったメッセージは再配信されるが、Consumer の処理はべき等なので問題ない
+                logger.exception('delete_message_batch に失敗しました')
+                continue
+            for failure in response.get('Failed', []):
+                logger.warning(json.dumps({
+                    'message': 'メッセージを削除できませんでした',
+                    'id': failure['Id'],
+                    'code': failure.get('Code')
+                }, ensure_ascii=False))
+            self.stats.add(deleted=len(response.get('Successful', [])))
+
+    def report_loop(self, interval: float) -> None:
+        while not self.stopping.wait(interval):
+            print(json.dumps({'message': 'worker stats', **self.stats.snapshot()}), flush=True)
+
+    def run(self, report_interval: float) -> dict:
+        self.heartbeat.start()
+        pollers = [
+            threading.Thread(target=self.poll_loop, name=f'poller-{i}')
+            for i in range(self.threads)
+        ]
+        for poller in pollers:
+            poller.start()
+        reporter = threading.Thread(target=self.report_loop, args=(report_interval,), name='reporter', daemon=True)
+        reporter.start()
+
+        # シグナルはメインスレッドで受けるため、join はタイムアウト付きで回す
+        for poller in pollers:
+            while poller.is_alive():
+                poller.join(timeout=0.5)
+        self.heartbeat.stop()
+        return {**self.stats.snapshot(), **self.consumer.recently_persisted_orders.stats()}
+
+
+def seed_local_queue(count: int, item_count: int) -> str:
+    """moto にキューとテーブルを作成し、合成した注文を count 件送信してキューの URL を返す"""
+    import boto3
+
+    dynamodb = boto3.client('dynamodb')
+    dynamodb.create_table(
+        TableName=os.environ['DYNAMODB_TABLE_NAME'],
+        KeySchema=[
+            {'AttributeName': 'order_id', 'KeyType': 'HASH'},
+            {'AttributeName': 'created_at', 'KeyType': 'RANGE'}
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'order_id', 'AttributeType': 'S'},
+            {'AttributeName': 'created_at', 'AttributeType': 'S'}
+        ],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    sqs = boto3.client('sqs')
+    queue_url = sqs.create_queue(QueueName='orders-local')['QueueUrl']
+    for start in range(0, count, SQS_MAX_MESSAGES):
+        entries = []
+        for n in range(start, min(start + SQS_MAX_MESSAGES, count)):
+            items = [{'name': f'item-{i}', 'quantity': 1, 'price': 100.5} for i in range(item_count)]
+            entries.append({
+                'Id': str(n - start),
+                'MessageBody': json.dumps({
+                    'order_id': str(uuid.uuid4()),
+                    'created_at': '2024-01-01T00:00:00Z',
+                    'customer_name': f'customer-{n % 50}',
+                    'items': items,
+                    'total_amount': 100.5 * item_count,
+                    'request_id': 'local'
+                })
+            })
+        sqs.send_message_batch(QueueUrl=queue_url, Entries=entries)
+    return queue_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQS ロングポーリング Worker（常駐型の Consumer）')
+    parser.add_argument('--queue-url', default=os.environ.get('SQS_QUEUE_URL'))
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--wait-seconds', type=int, default=20, help='ロングポーリングの待ち時間（最大 20 秒）')
+    parser.add_argument('--visibility-timeout', type=int, default=30)
+    parser.add_argument('--heartbeat-interval', type=float, default=None,
+                        help='この秒数を超えて処理中のメッセージの可視性タイムアウトを延長する（既定: 可視性タイムアウトの半分）')
+    parser.add_argument('--idle-exit-seconds', type=float, default=0,
+                        help='キューが空の状態がこの秒数続いたら終了する（0 なら終了しない）')
+    parser.add_argument('--report-interval', type=float, default=10)
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--local', type=int, default=0, metavar='N',
+                        help='moto のキューに合成した注文を N 件入れて、空になるまで処理する')
+    parser.add_argument('--items', type=int, default=5, help='--local の注文あたりの商品数')
+    parser.add_argument('--latency-ms', type=float, default=0,
+                        help='--local で AWS の API 呼び出しごとに加える遅延（ネットワーク往復の代わり）')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format='%(message)s')
+
+    mock = None
+    if args.local:
+        os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-1')
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+        os.environ.setdefault('DYNAMODB_TABLE_NAME', 'orders-local')
+        try:
+            from moto import mock_aws
+        except ImportError:
+            sys.exit('--local には moto が必要です: pip install moto')
+        mock = mock_aws()
+        mock.start()
+        args.queue_url = seed_local_queue(args.local, args.items)
+        args.wait_seconds = min(args.wait_seconds, 1)
+        args.idle_exit_seconds = args.idle_exit_seconds or 2
+    elif not args.queue_url:
+        sys.exit('--queue-url または SQS_QUEUE_URL を指定してください')
+
+    import boto3
+    from botocore.config import Config
+
+    consumer = load_consumer()
+    # Consumer はルートロガーを INFO にするため、Worker の指定で上書きする
+    logging.getLogger().setLevel(args.log_level)
+    # ロングポーリング中の接続がスレッド数だけ必要になるため、接続プールを広げる
+    sqs = boto3.client('sqs', config=Config(max_pool_connections=max(10, args.threads + 1)))
+
+    if args.local and args.latency_ms > 0:
+        def sleep_before_call(**kwargs):
+            time.sleep(args.latency_ms / 1000)
+        for client in (consumer.dynamodb.meta.client, sqs):
+            client.meta.events.register('before-call.*.*', sleep_before_call)
+
+    worker = Worker(
+        consumer, sqs, args.queue_url,
+        threads=args.threads,
+        wait_seconds=args.wait_seconds,
+        visibility_timeout=args.visibility_timeout,
+        heartbeat_interval=args.heartbeat_interval or args.visibility_timeout / 2,
+        idle_exit_seconds=args.idle_exit_seconds
+    )
+    signal.signal(signal.SIGINT, worker.request_stop)
+    signal.signal(signal.SIGTERM, worker.request_stop)
+
+    try:
+        summary = worker.run(args.report_interval)
+    finally:
+        if mock is not None:
+            mock.stop()
+
+    print(json.dumps({'message': 'worker stopped', 'threads': args.threads, **summary}), flush=True)
+
+
+if __name__ == '__main__':
+    main()
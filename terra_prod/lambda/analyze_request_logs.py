@@ -3,23 +3,64 @@
 from __future__ import annotations
 
 import argparse
+import gzip
+import heapq
 import json
 import os
+import queue
 import re
 import shutil
 import subprocess
 import sys
-from dataclasses import dataclass
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator, TextIO
 
 
 RECORD_PATTERN = re.compile(r"(REQUEST_SUMMARY|RESPONSE_SUMMARY|ERROR_SUMMARY)\s+(\{.*\})$")
+REPORT_PATTERN = re.compile(
+    r"REPORT RequestId:\s*(?P<request_id>\S+)\s+"
+    r"Duration:\s*(?P<duration>[\d.]+) ms\s+"
+    r"Billed Duration:\s*(?P<billed_duration>[\d.]+) ms\s+"
+    r"Memory Size:\s*(?P<memory_size>\d+) MB\s+"
+    r"Max Memory Used:\s*(?P<max_memory_used>\d+) MB"
+    r"(?:\s+Init Duration:\s*(?P<init_duration>[\d.]+) ms)?"
+)
 SUPPORTED_METHODS = {"POST", "GET", "ALL"}
 SUPPORTED_RECORD_TYPES = {"request_summary", "response_summary", "error_summary"}
 THROTTLING_ERROR_CODES = {"ThrottlingException", "TooManyRequestsException"}
 MAX_TOKEN_STOP_REASONS = {"max_tokens", "maxtokens"}
+K6_LATENCY_METRIC = "api_request_duration"
+K6_TIME_RANGE_MARGIN = timedelta(minutes=1)
+K6_FRACTION_PATTERN = re.compile(r"(\.\d{6})\d+")
+LATENCY_COMPONENTS = ("network_and_client", "api_gateway", "authorizer", "lambda", "bedrock")
+FOLLOW_WINDOWS_SECONDS = (60, 300)
+FOLLOW_REDRAW_INTERVAL_SECONDS = 1.0
+# CloudWatch Logs への取り込み遅延を吸収するため、前回取得位置より少し前から取り直して eventId で重複排除する。
+# 取得位置はイベントの有無にかかわらず毎回 (現在時刻 - FOLLOW_OVERLAP_MS) まで進め、取得範囲を一定に保つ。
+FOLLOW_OVERLAP_MS = 30_000
+# ライブビューで集計するのは要約ログだけなので、サーバー側で絞り込んで転送量を抑える。
+FOLLOW_FILTER_PATTERN = "?REQUEST_SUMMARY ?RESPONSE_SUMMARY ?ERROR_SUMMARY"
+FOLLOW_COUNTER_NAMES = (
+    "requests",
+    "success",
+    "errors",
+    "throttled",
+    "max_tokens",
+    "output_tokens",
+    "latency_sum_ms",
+    "latency_count",
+)
+# オンデマンド料金 (USD / 1,000 tokens) の参考値。最新の料金は --price-table で上書きする。
+DEFAULT_PRICE_TABLE = {
+    "amazon.nova-micro-v1:0": {"input_per_1k_tokens": 0.000035, "output_per_1k_tokens": 0.00014},
+    "amazon.nova-lite-v1:0": {"input_per_1k_tokens": 0.00006, "output_per_1k_tokens": 0.00024},
+    "amazon.nova-pro-v1:0": {"input_per_1k_tokens": 0.0008, "output_per_1k_tokens": 0.0032},
+}
 
 
 @dataclass(frozen=True)
@@ -31,6 +72,94 @@ class Config:
     log_group_name: str
     aws_region: str
     script_dir: Path
+    k6_results: str = ""
+    api_log_group_name: str = ""
+    token_bucket: str = "5m"
+    price_table: dict[str, dict[str, float]] = field(default_factory=lambda: dict(DEFAULT_PRICE_TABLE))
+    top_prompts: int = 5
+    follow: bool = False
+    poll_interval: float = 2.0
+    authorizer: bool = False
+    authorizer_log_group_name: str = ""
+
+
+@dataclass(frozen=True)
+class LambdaReport:
+    request_id: str
+    duration_ms: float
+    billed_duration_ms: float
+    memory_size_mb: int
+    max_memory_used_mb: int
+    init_duration_ms: float | None
+
+
+@dataclass(frozen=True)
+class K6Point:
+    timestamp_ms: int
+    duration_ms: float
+    method: str
+    stage: str
+    status: int
+    lambda_request_id: str
+
+
+class SlidingWindowCounter:
+    """1秒単位のバケットで直近 window_seconds 秒の合計を差分更新する。
+
+    保持するのは window_seconds 個までのバケットだけなので、実行時間に関係なくメモリ使用量は一定。
+    """
+
+    def __init__(self, window_seconds: int) -> None:
+        self.window_seconds = window_seconds
+        self.buckets: dict[int, dict[str, float]] = {}
+        self.bucket_heap: list[int] = []
+        self.totals = {name: 0.0 for name in FOLLOW_COUNTER_NAMES}
+
+    def add(self, second: int, counters: dict[str, float], now_second: int) -> None:
+        if second <= now_second - self.window_seconds:
+            return
+
+        bucket = self.buckets.get(second)
+        if bucket is None:
+            bucket = {name: 0.0 for name in FOLLOW_COUNTER_NAMES}
+            self.buckets[second] = bucket
+            heapq.heappush(self.bucket_heap, second)
+
+        for name, value in counters.items():
+            bucket[name] += value
+            self.totals[name] += value
+
+    def expire(self, now_second: int) -> None:
+        while self.bucket_heap and self.bucket_heap[0] <= now_second - self.window_seconds:
+            bucket = self.buckets.pop(heapq.heappop(self.bucket_heap))
+            for name, value in bucket.items():
+                self.totals[name] -= value
+
+
+@dataclass
+class StageLatency:
+    method: str
+    stage: str
+    client_durations: list[float] = field(default_factory=list)
+    throttled_count: int = 0
+    joined_by_request_id: int = 0
+    joined_by_time_window: int = 0
+    window_start_ms: int = 0
+    window_end_ms: int = 0
+    component_sums: dict[str, float] = field(default_factory=dict)
+    component_counts: dict[str, int] = field(default_factory=dict)
+
+    def add_component(self, name: str, value: float | None) -> None:
+        if value is None:
+            return
+        self.component_sums[name] = self.component_sums.get(name, 0.0) + value
+        self.component_counts[name] = self.component_counts.get(name, 0) + 1
+
+    def component_mean(self, name: str) -> float | None:
+        count = self.component_counts.get(name, 0)
+        if count == 0:
+            return None
+        return self.component_sums[name] / count
 
 
 def env_or_default(name: str, default: str = "") -> str:
@@ -59,6 +188,55 @@ def build_parser() -> argparse.ArgumentParser:
         default=env_or_default("AWS_REGION"),
         help="AWS リージョン。省略時は terraform output deployment_summary.region を使用",
     )
+    parser.add_argument(
+        "--k6-results",
+        default=env_or_default("K6_RESULTS"),
+        help="k6 run --out json=<file> の出力 (.json / .json.gz)。指定時は k6 ステージ別のレイテンシ内訳を出力",
+    )
+    parser.add_argument(
+        "--api-log-group-name",
+        default=env_or_default("API_LOG_GROUP_NAME"),
+        help="API Gateway アクセスログのグループ名。省略時は terraform output api_gateway_log_group_name を使用",
+    )
+    parser.add_argument(
+        "--token-bucket",
+        default=env_or_default("TOKEN_BUCKET", "5m") or "5m",
+        help="トークン集計の時間バケット幅 (例: 1m, 5m, 1h)。既定: 5m",
+    )
+    parser.add_argument(
+        "--price-table",
+        default=env_or_default("PRICE_TABLE"),
+        help='モデル別単価の JSON ファイル。{"<model_id>": {"input_per_1k_tokens": 0.0, "output_per_1k_tokens": 0.0}} 形式',
+    )
+    parser.add_argument(
+        "--top-prompts",
+        type=int,
+        default=int(env_or_default("TOP_PROMPTS", "5") or "5"),
+        help="トークン使用量が多いプロンプトの表示件数。既定: 5",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        default=env_or_default("FOLLOW").lower() in {"1", "true", "yes"},
+        help="新しい要約ログを継続的に取得し、直近1分 / 5分の集計を1秒ごとに再描画する",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=float(env_or_default("POLL_INTERVAL", "2") or "2"),
+        help="--follow 時に CloudWatch Logs を取得する間隔 (秒)。既定: 2",
+    )
+    parser.add_argument(
+        "--authorizer",
+        action="store_true",
+        default=env_or_default("AUTHORIZER_ANALYSIS").lower() in {"1", "true", "yes"},
+        help="Authorizer Lambda のログも取得し、REPORT 行から Authorizer の占める割合とコールドスタートを集計する",
+    )
+    parser.add_argument(
+        "--authorizer-log-group-name",
+        default=env_or_default("AUTHORIZER_LOG_GROUP_NAME"),
+        help="Authorizer Lambda のロググループ名。省略時は terraform output authorizer_log_group_name を使用",
+    )
     return parser
 
 
@@ -159,6 +337,33 @@ def resolve_time_range(start_time: str, end_time: str, since: str) -> tuple[int,
     )
 
 
+def load_price_table(path: str) -> dict[str, dict[str, float]]:
+    price_table = dict(DEFAULT_PRICE_TABLE)
+    if not path:
+        return price_table
+
+    try:
+        payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as exc:
+        raise SystemExit(f"PRICE_TABLE を読み込めませんでした: {exc}") from exc
+
+    if not isinstance(payload, dict):
+        raise SystemExit("PRICE_TABLE はモデル ID をキーにした JSON オブジェクトで指定してください。")
+
+    for model_id, prices in payload.items():
+        if not isinstance(prices, dict):
+            raise SystemExit(f"PRICE_TABLE の {model_id} はオブジェクトで指定してください。")
+        try:
+            price_table[str(model_id)] = {
+                "input_per_1k_tokens": float(prices.get("input_per_1k_tokens", 0)),
+                "output_per_1k_tokens": float(prices.get("output_per_1k_tokens", 0)),
+            }
+        except (TypeError, ValueError) as exc:
+            raise SystemExit(f"PRICE_TABLE の {model_id} の単価が数値ではありません。") from exc
+
+    return price_table
+
+
 def parse_args(script_dir: Path) -> Config:
     args = build_parser().parse_args()
     method = args.method.upper()
@@ -179,6 +384,36 @@ def parse_args(script_dir: Path) -> Config:
     if not aws_region:
         raise SystemExit("AWS リージョンを取得できませんでした。AWS_REGION を指定してください。")
 
+    try:
+        token_bucket = parse_since(args.token_bucket)
+    except ValueError as exc:
+        raise SystemExit("TOKEN_BUCKET は 1m / 5m / 1h のように指定してください。") from exc
+    if token_bucket <= timedelta(0):
+        raise SystemExit("TOKEN_BUCKET は 1m / 5m / 1h のように指定してください。")
+
+    if args.top_prompts < 0:
+        raise SystemExit("TOP_PROMPTS は 0 以上の整数で指定してください。")
+
+    if args.poll_interval <= 0:
+        raise SystemExit("POLL_INTERVAL は 0 より大きい秒数で指定してください。")
+
+    if args.follow and args.k6_results:
+        raise SystemExit("--follow と K6_RESULTS は同時に指定できません。")
+
+    api_log_group_name = args.api_log_group_name
+    if args.k6_results and not Path(args.k6_results).is_file():
+        raise SystemExit(f"k6 の結果ファイルが見つかりません: {args.k6_results}")
+    # アクセスログの responseLatency は k6 の区間分解と Authorizer の割合の両方で使う。
+    if (args.k6_results or args.authorizer) and not api_log_group_name and shutil.which("terraform"):
+        api_log_group_name = terraform_output_raw("api_gateway_log_group_name", script_dir)
+
+    authorizer_log_group_name = args.authorizer_log_group_name
+    if args.authorizer and not authorizer_log_group_name:
+        if shutil.which("terraform"):
+            authorizer_log_group_name = terraform_output_raw("authorizer_log_group_name", script_dir)
+        if not authorizer_log_group_name:
+            raise SystemExit("Authorizer のロググループ名を取得できませんでした。AUTHORIZER_LOG_GROUP_NAME を指定してください。")
+
     return Config(
         start_time=args.start_time,
         end_time=args.end_time,
@@ -187,28 +422,43 @@ def parse_args(script_dir: Path) -> Config:
         log_group_name=log_group_name,
         aws_region=aws_region,
         script_dir=script_dir,
+        k6_results=args.k6_results,
+        api_log_group_name=api_log_group_name,
+        token_bucket=args.token_bucket,
+        price_table=load_price_table(args.price_table),
+        top_prompts=args.top_prompts,
+        follow=args.follow,
+        poll_interval=args.poll_interval,
+        authorizer=args.authorizer,
+        authorizer_log_group_name=authorizer_log_group_name,
     )
 
 
-def fetch_log_events(config: Config, start_ms: int, end_ms: int) -> list[dict[str, Any]]:
-    output = run_command(
-        [
-            "aws",
-            "logs",
-            "filter-log-events",
-            "--log-group-name",
-            config.log_group_name,
-            "--region",
-            config.aws_region,
-            "--start-time",
-            str(start_ms),
-            "--end-time",
-            str(end_ms),
-            "--output",
-            "json",
-        ],
-        config.script_dir,
-    )
+def fetch_log_events(
+    config: Config,
+    start_ms: int,
+    end_ms: int,
+    log_group_name: str | None = None,
+    filter_pattern: str | None = None,
+) -> list[dict[str, Any]]:
+    command = [
+        "aws",
+        "logs",
+        "filter-log-events",
+        "--log-group-name",
+        log_group_name or config.log_group_name,
+        "--region",
+        config.aws_region,
+        "--start-time",
+        str(start_ms),
+        "--end-time",
+        str(end_ms),
+        "--output",
+        "json",
+    ]
+    if filter_pattern:
+        command.extend(["--filter-pattern", filter_pattern])
+    output = run_command(command, config.script_dir)
 
     try:
         payload = json.loads(output)
@@ -219,6 +469,43 @@ def fetch_log_events(config: Config, start_ms: int, end_ms: int) -> list[dict[st
     return events if isinstance(events, list) else []
 
 
+def fetch_log_groups(
+    config: Config,
+    start_ms: int,
+    end_ms: int,
+    log_group_names: list[str],
+) -> dict[str, list[dict[str, Any]]]:
+    # ロググループごとの filter-log-events は独立しているため、並列に実行して待ち時間を重ねない。
+    unique_names = list(dict.fromkeys(name for name in log_group_names if name))
+    with ThreadPoolExecutor(max_workers=max(len(unique_names), 1)) as executor:
+        futures = {
+            name: executor.submit(fetch_log_events, config, start_ms, end_ms, name)
+            for name in unique_names
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+def parse_report_lines(events: list[dict[str, Any]]) -> dict[str, LambdaReport]:
+    reports: dict[str, LambdaReport] = {}
+
+    for event in events:
+        match = REPORT_PATTERN.search(str(event.get("message", "")))
+        if not match:
+            continue
+
+        init_duration = match.group("init_duration")
+        reports[match.group("request_id")] = LambdaReport(
+            request_id=match.group("request_id"),
+            duration_ms=float(match.group("duration")),
+            billed_duration_ms=float(match.group("billed_duration")),
+            memory_size_mb=int(match.group("memory_size")),
+            max_memory_used_mb=int(match.group("max_memory_used")),
+            init_duration_ms=None if init_duration is None else float(init_duration),
+        )
+
+    return reports
+
+
 def parse_records(events: list[dict[str, Any]]) -> list[dict[str, Any]]:
     records: list[dict[str, Any]] = []
 
@@ -240,15 +527,219 @@ def parse_records(events: list[dict[str, Any]]) -> list[dict[str, Any]]:
         if record_type not in SUPPORTED_RECORD_TYPES:
             continue
 
+        payload["log_timestamp_ms"] = event.get("timestamp")
         records.append(payload)
 
     return records
 
 
+def optional_float(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_access_log_entries(events: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    entries: dict[str, dict[str, Any]] = {}
+
+    for event in events:
+        try:
+            payload = json.loads(str(event.get("message", "")))
+        except json.JSONDecodeError:
+            continue
+
+        if not isinstance(payload, dict):
+            continue
+
+        integration_request_id = str(payload.get("integrationRequestId") or "").strip()
+        if integration_request_id and integration_request_id != "-":
+            entries[integration_request_id] = payload
+
+    return entries
+
+
 def request_ids(records: list[dict[str, Any]]) -> list[str]:
     return sorted({str(record.get("request_id", "")).strip() for record in records if str(record.get("request_id", "")).strip()})
 
 
+def open_text_stream(path: Path) -> TextIO:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return path.open("r", encoding="utf-8")
+
+
+def parse_k6_time(value: str) -> int:
+    # k6 はナノ秒精度の時刻を出力するため、datetime が扱えるマイクロ秒までに切り詰める。
+    normalized = K6_FRACTION_PATTERN.sub(r"\1", value)
+    return int(parse_iso8601(normalized).timestamp() * 1000)
+
+
+def iter_k6_points(path: Path, metric_name: str = K6_LATENCY_METRIC) -> Iterator[K6Point]:
+    # k6 の JSON 出力は 1 リクエストにつき十数行のメトリクスを書き出すため、全体を読み込まずに 1 行ずつ処理する。
+    # 対象メトリクス名を含まない行は json.loads する前に読み飛ばす。
+    metric_marker = f'"{metric_name}"'
+
+    with open_text_stream(path) as stream:
+        for line in stream:
+            if metric_marker not in line:
+                continue
+
+            try:
+                payload = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            if payload.get("type") != "Point" or payload.get("metric") != metric_name:
+                continue
+
+            data = payload.get("data") or {}
+            tags = data.get("tags") or {}
+            metadata = data.get("metadata") or {}
+
+            try:
+                timestamp_ms = parse_k6_time(str(data.get("time", "")))
+                duration_ms = float(data.get("value"))
+            except (TypeError, ValueError):
+                continue
+
+            try:
+                status = int(tags.get("status", 0))
+            except (TypeError, ValueError):
+                status = 0
+
+            yield K6Point(
+                timestamp_ms=timestamp_ms,
+                duration_ms=duration_ms,
+                method=str(tags.get("method", "")).upper(),
+                stage=str(tags.get("stage", "1")),
+                status=status,
+                lambda_request_id=str(metadata.get("lambda_request_id") or tags.get("lambda_request_id") or "").strip(),
+            )
+
+
+def load_k6_points(path: Path, method: str) -> list[K6Point]:
+    return [point for point in iter_k6_points(path) if method == "ALL" or point.method == method]
+
+
+def k6_time_range(points: list[K6Point]) -> tuple[int, int, str, str]:
+    start_dt = datetime.fromtimestamp(min(point.timestamp_ms for point in points) / 1000, tz=timezone.utc) - K6_TIME_RANGE_MARGIN
+    end_dt = datetime.fromtimestamp(max(point.timestamp_ms for point in points) / 1000, tz=timezone.utc) + K6_TIME_RANGE_MARGIN
+    return (
+        int(start_dt.timestamp() * 1000),
+        int(end_dt.timestamp() * 1000),
+        start_dt.isoformat().replace("+00:00", "Z"),
+        end_dt.isoformat().replace("+00:00", "Z"),
+    )
+
+
+def server_latency_components(
+    record: dict[str, Any],
+    access_entry: dict[str, Any] | None,
+) -> dict[str, float | None]:
+    bedrock_ms = optional_float(record.get("bedrock_latency_ms"))
+    handler_ms = optional_float(record.get("handler_duration_ms"))
+    response_latency_ms = optional_float((access_entry or {}).get("responseLatency"))
+    integration_latency_ms = optional_float((access_entry or {}).get("integrationLatency"))
+    # Authorizer のキャッシュがヒットした場合は "-" になるため 0ms として扱う。
+    authorizer_ms = optional_float((access_entry or {}).get("authorizerLatency")) if access_entry else None
+    if access_entry and authorizer_ms is None:
+        authorizer_ms = 0.0
+
+    # integrationLatency は Lambda の起動 (コールドスタート含む) から応答までを含むため、
+    # アクセスログが取れた場合は handler_duration_ms より優先して Lambda 区間とみなす。
+    lambda_total_ms = integration_latency_ms if integration_latency_ms is not None else handler_ms
+    lambda_ms = None if lambda_total_ms is None else max(lambda_total_ms - (bedrock_ms or 0.0), 0.0)
+
+    api_gateway_ms = None
+    if response_latency_ms is not None and integration_latency_ms is not None:
+        api_gateway_ms = max(response_latency_ms - integration_latency_ms - (authorizer_ms or 0.0), 0.0)
+
+    return {
+        "api_gateway": api_gateway_ms,
+        "authorizer": authorizer_ms,
+        "lambda": lambda_ms,
+        "bedrock": bedrock_ms,
+        "server_total": response_latency_ms,
+    }
+
+
+def build_stage_latencies(
+    points: list[K6Point],
+    records: list[dict[str, Any]],
+    access_entries: dict[str, dict[str, Any]],
+) -> list[StageLatency]:
+    final_records = {
+        str(record.get("request_id", "")).strip(): record
+        for record in records
+        if record.get("record_type") in {"response_summary", "error_summary"} and str(record.get("request_id", "")).strip()
+    }
+    stages: dict[tuple[str, str], StageLatency] = {}
+    joined_request_ids: set[str] = set()
+
+    for point in points:
+        key = (point.method, point.stage)
+        stage = stages.get(key)
+        if stage is None:
+            stage = StageLatency(
+                method=point.method,
+                stage=point.stage,
+                window_start_ms=point.timestamp_ms,
+                window_end_ms=point.timestamp_ms,
+            )
+            stages[key] = stage
+
+        stage.window_start_ms = min(stage.window_start_ms, point.timestamp_ms)
+        stage.window_end_ms = max(stage.window_end_ms, point.timestamp_ms)
+        stage.client_durations.append(point.duration_ms)
+        if point.status == 429:
+            stage.throttled_count += 1
+
+        record = final_records.get(point.lambda_request_id)
+        if record is None:
+            continue
+
+        joined_request_ids.add(point.lambda_request_id)
+        stage.joined_by_request_id += 1
+        components = server_latency_components(record, access_entries.get(point.lambda_request_id))
+        for name in ("api_gateway", "authorizer", "lambda", "bedrock"):
+            stage.add_component(name, components[name])
+
+        server_total_ms = components["server_total"]
+        if server_total_ms is None:
+            server_total_ms = sum(components[name] or 0.0 for name in ("lambda", "bedrock"))
+        stage.add_component("network_and_client", max(point.duration_ms - server_total_ms, 0.0))
+
+    # request_id を持たない k6 結果 (古いスクリプトで取得したもの等) 向けに、
+    # 未突合のサーバー側レコードは同じメソッドのステージ時間帯に入るものへ割り当てる。
+    for request_id, record in final_records.items():
+        if request_id in joined_request_ids:
+            continue
+
+        timestamp_ms = record.get("log_timestamp_ms")
+        if not isinstance(timestamp_ms, int):
+            continue
+
+        method = str(record.get("method", "")).upper()
+        for stage in stages.values():
+            if stage.method == method and stage.window_start_ms <= timestamp_ms <= stage.window_end_ms:
+                stage.joined_by_time_window += 1
+                components = server_latency_components(record, access_entries.get(request_id))
+                for name in ("api_gateway", "authorizer", "lambda", "bedrock"):
+                    stage.add_component(name, components[name])
+                break
+
+    return sorted(stages.values(), key=lambda item: (item.method, int(item.stage) if item.stage.isdigit() else 0, item.stage))
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
 def summarize_records(records: list[dict[str, Any]], method: str) -> dict[str, Any]:
     filtered = [record for record in records if method == "ALL" or str(record.get("method", "")).upper() == method]
     requests = [record for record in filtered if record.get("record_type") == "request_summary"]
@@ -292,6 +783,286 @@ def summarize_records(records: list[dict[str, Any]], method: str) -> dict[str, A
     }
 
 
+def resolve_model_price(model_id: str, price_table: dict[str, dict[str, float]]) -> dict[str, float] | None:
+    if model_id in price_table:
+        return price_table[model_id]
+
+    # クロスリージョン推論プロファイル (例: apac.amazon.nova-lite-v1:0) は先頭のリージョン接頭辞を外して引く。
+    _, _, base_model_id = model_id.partition(".")
+    return price_table.get(base_model_id)
+
+
+def token_count(usage: dict[str, Any], key: str) -> int:
+    try:
+        return int(usage.get(key) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def summarize_token_usage(records: list[dict[str, Any]], config: Config) -> dict[str, Any]:
+    bucket_ms = int(parse_since(config.token_bucket).total_seconds() * 1000)
+    prompts = {
+        str(record.get("request_id", "")): record
+        for record in records
+        if record.get("record_type") == "request_summary"
+    }
+    by_model: dict[str, dict[str, Any]] = {}
+    by_bucket: dict[tuple[int, str], dict[str, int]] = {}
+    prompt_usages: list[dict[str, Any]] = []
+
+    for record in records:
+        if record.get("record_type") != "response_summary":
+            continue
+        if config.method != "ALL" and str(record.get("method", "")).upper() != config.method:
+            continue
+
+        usage = record.get("usage") or {}
+        if not isinstance(usage, dict) or not usage:
+            continue
+
+        input_tokens = token_count(usage, "inputTokens")
+        output_tokens = token_count(usage, "outputTokens")
+        total_tokens = token_count(usage, "totalTokens") or input_tokens + output_tokens
+        model_id = str(record.get("model_id") or "unknown")
+        bedrock_latency_ms = optional_float(record.get("bedrock_latency_ms"))
+
+        model = by_model.setdefault(model_id, {
+            "model_id": model_id,
+            "responses": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "total_tokens": 0,
+            "timed_output_tokens": 0,
+            "generation_seconds": 0.0,
+        })
+        model["responses"] += 1
+        model["input_tokens"] += input_tokens
+        model["output_tokens"] += output_tokens
+        model["total_tokens"] += total_tokens
+        # 出力トークン/秒は bedrock_latency_ms を記録しているレスポンスだけで算出する。
+        if bedrock_latency_ms:
+            model["timed_output_tokens"] += output_tokens
+            model["generation_seconds"] += bedrock_latency_ms / 1000
+
+        timestamp_ms = record.get("log_timestamp_ms")
+        if isinstance(timestamp_ms, int):
+            bucket = by_bucket.setdefault((timestamp_ms - timestamp_ms % bucket_ms, model_id), {
+                "responses": 0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "total_tokens": 0,
+            })
+            bucket["responses"] += 1
+            bucket["input_tokens"] += input_tokens
+            bucket["output_tokens"] += output_tokens
+            bucket["total_tokens"] += total_tokens
+
+        request_id = str(record.get("request_id", ""))
+        prompt = prompts.get(request_id, {})
+        prompt_usages.append({
+            "request_id": request_id,
+            "model_id": model_id,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": total_tokens,
+            "prompt_preview": prompt.get("prompt_preview", ""),
+            "prompt_length": prompt.get("prompt_length"),
+        })
+
+    for model in by_model.values():
+        price = resolve_model_price(model["model_id"], config.price_table)
+        model["output_tokens_per_second"] = (
+            model["timed_output_tokens"] / model["generation_seconds"] if model["generation_seconds"] else None
+        )
+        model["estimated_cost_usd"] = None if price is None else (
+            model["input_tokens"] / 1000 * price["input_per_1k_tokens"]
+            + model["output_tokens"] / 1000 * price["output_per_1k_tokens"]
+        )
+
+    return {
+        "models": sorted(by_model.values(), key=lambda item: (-item["total_tokens"], item["model_id"])),
+        "buckets": [
+            {"bucket_start_ms": bucket_start_ms, "model_id": model_id, **values}
+            for (bucket_start_ms, model_id), values in sorted(by_bucket.items())
+        ],
+        "top_prompts": sorted(prompt_usages, key=lambda item: (-item["total_tokens"], item["request_id"]))[: config.top_prompts],
+    }
+
+
+def print_token_usage(token_usage: dict[str, Any], config: Config) -> None:
+    models = token_usage["models"]
+    if not models:
+        return
+
+    print()
+    print("==> Token usage")
+    total_cost = 0.0
+    has_unpriced_model = False
+    for model in models:
+        tokens_per_second = model["output_tokens_per_second"]
+        cost = model["estimated_cost_usd"]
+        if cost is None:
+            has_unpriced_model = True
+        else:
+            total_cost += cost
+        print(f"{model['model_id']}: {model['responses']} responses")
+        print(f"  - Input tokens: {model['input_tokens']}")
+        print(f"  - Output tokens: {model['output_tokens']}")
+        print(f"  - Total tokens: {model['total_tokens']}")
+        print(f"  - Output tokens/sec (generation time): {'-' if tokens_per_second is None else f'{tokens_per_second:.1f}'}")
+        print(f"  - Estimated cost: {'unknown (not in price table)' if cost is None else f'${cost:.6f}'}")
+
+    print(f"Estimated total cost: ${total_cost:.6f}{' (excluding unpriced models)' if has_unpriced_model else ''}")
+
+    buckets = token_usage["buckets"]
+    if buckets:
+        print(f"\nTokens per {config.token_bucket} bucket:")
+        for bucket in buckets:
+            bucket_start = datetime.fromtimestamp(bucket["bucket_start_ms"] / 1000, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+            print(
+                f"  - {bucket_start} {bucket['model_id']}: responses={bucket['responses']} "
+                f"input={bucket['input_tokens']} output={bucket['output_tokens']} total={bucket['total_tokens']}"
+            )
+
+    top_prompts = token_usage["top_prompts"]
+    if top_prompts:
+        print("\nTop prompts by total tokens:")
+        for item in top_prompts:
+            print(
+                f"  - {item['request_id']} total={item['total_tokens']} (in={item['input_tokens']} out={item['output_tokens']}) "
+                f"prompt_preview={item['prompt_preview']!r} prompt_length={item['prompt_length']}"
+            )
+
+
+def summarize_function_reports(reports: dict[str, LambdaReport]) -> dict[str, Any]:
+    durations = [report.duration_ms for report in reports.values()]
+    init_durations = [report.init_duration_ms for report in reports.values() if report.init_duration_ms is not None]
+    return {
+        "invocations": len(reports),
+        "cold_starts": len(init_durations),
+        "duration_p50_ms": percentile(durations, 50),
+        "duration_p95_ms": percentile(durations, 95),
+        "billed_duration_total_ms": sum(report.billed_duration_ms for report in reports.values()),
+        "max_memory_used_mb": max((report.max_memory_used_mb for report in reports.values()), default=0),
+        "init_duration_min_ms": min(init_durations, default=0.0),
+        "init_duration_p50_ms": percentile(init_durations, 50),
+        "init_duration_p95_ms": percentile(init_durations, 95),
+        "init_duration_max_ms": max(init_durations, default=0.0),
+    }
+
+
+def summarize_authorizer_overhead(
+    records: list[dict[str, Any]],
+    method: str,
+    handler_reports: dict[str, LambdaReport],
+    authorizer_reports: dict[str, LambdaReport],
+    access_entries: dict[str, dict[str, Any]],
+) -> dict[str, Any]:
+    requests = {
+        str(record.get("request_id", "")).strip(): record
+        for record in records
+        if record.get("record_type") == "request_summary"
+        and (method == "ALL" or str(record.get("method", "")).upper() == method)
+    }
+    authorizer_durations: list[float] = []
+    authorizer_response_shares: list[float] = []
+    authorizer_lambda_shares: list[float] = []
+    authorizer_cold_start_joins = 0
+    missing_authorizer_id = 0
+    authorizer_request_ids: set[str] = set()
+
+    for request_id, record in requests.items():
+        handler_report = handler_reports.get(request_id)
+        authorizer_request_id = str(record.get("authorizer_request_id") or "").strip()
+        if not authorizer_request_id:
+            missing_authorizer_id += 1
+            continue
+
+        authorizer_report = authorizer_reports.get(authorizer_request_id)
+        if handler_report is None or authorizer_report is None:
+            continue
+
+        # Authorizer キャッシュが有効な場合、同じ authorizerRequestId を複数リクエストが共有する。
+        # その場合 Authorizer の時間を払ったのは最初の1件だけなので、2件目以降は 0ms として扱う。
+        if authorizer_request_id in authorizer_request_ids:
+            authorizer_ms = 0.0
+        else:
+            authorizer_request_ids.add(authorizer_request_id)
+            authorizer_ms = authorizer_report.duration_ms + (authorizer_report.init_duration_ms or 0.0)
+            if authorizer_report.init_duration_ms is not None:
+                authorizer_cold_start_joins += 1
+
+        handler_ms = handler_report.duration_ms + (handler_report.init_duration_ms or 0.0)
+        authorizer_durations.append(authorizer_ms)
+        # API Gateway から見たリクエスト全体 (responseLatency) に占める割合。アクセスログがない場合は数えない。
+        response_latency_ms = optional_float((access_entries.get(request_id) or {}).get("responseLatency"))
+        if response_latency_ms is not None and response_latency_ms > 0:
+            authorizer_response_shares.append(min(authorizer_ms / response_latency_ms, 1.0))
+        if authorizer_ms + handler_ms > 0:
+            authorizer_lambda_shares.append(authorizer_ms / (authorizer_ms + handler_ms))
+
+    return {
+        "requests": len(requests),
+        "joined_requests": len(authorizer_durations),
+        "missing_authorizer_id": missing_authorizer_id,
+        "distinct_authorizer_invocations": len(authorizer_request_ids),
+        "authorizer_cold_start_joins": authorizer_cold_start_joins,
+        "authorizer_mean_ms": sum(authorizer_durations) / len(authorizer_durations) if authorizer_durations else 0.0,
+        "authorizer_p50_ms": percentile(authorizer_durations, 50),
+        "authorizer_p95_ms": percentile(authorizer_durations, 95),
+        "response_latency_joins": len(authorizer_response_shares),
+        "authorizer_response_share_mean": (
+            sum(authorizer_response_shares) / len(authorizer_response_shares) if authorizer_response_shares else None
+        ),
+        "authorizer_lambda_share_mean": (
+            sum(authorizer_lambda_shares) / len(authorizer_lambda_shares) if authorizer_lambda_shares else 0.0
+        ),
+        "functions": {
+            "handler": summarize_function_reports(handler_reports),
+            "authorizer": summarize_function_reports(authorizer_reports),
+        },
+    }
+
+
+def print_authorizer_overhead(overhead: dict[str, Any], config: Config) -> None:
+    print()
+    print("==> Authorizer overhead")
+    print(f"Authorizer log group: {config.authorizer_log_group_name}")
+    print(f"Requests: {overhead['requests']}")
+    print(f"Joined with authorizer REPORT: {overhead['joined_requests']}")
+    print(f"  - Distinct authorizer invocations: {overhead['distinct_authorizer_invocations']}")
+    print(f"  - Authorizer cold starts on the request path: {overhead['authorizer_cold_start_joins']}")
+    print(f"  - Requests without authorizer_request_id: {overhead['missing_authorizer_id']}")
+    print(
+        f"Authorizer time per request (ms): mean={overhead['authorizer_mean_ms']:.1f} "
+        f"p50={overhead['authorizer_p50_ms']:.1f} p95={overhead['authorizer_p95_ms']:.1f}"
+    )
+    if overhead["authorizer_response_share_mean"] is None:
+        print("Authorizer share of responseLatency: n/a (no API Gateway access log entries joined)")
+    else:
+        print(
+            f"Authorizer share of responseLatency (authorizer / responseLatency): "
+            f"{overhead['authorizer_response_share_mean'] * 100:.1f}% ({overhead['response_latency_joins']} requests)"
+        )
+    print(
+        f"Authorizer share of Lambda time (authorizer / (authorizer + handler)): "
+        f"{overhead['authorizer_lambda_share_mean'] * 100:.1f}%"
+    )
+
+    for function_name, stats in overhead["functions"].items():
+        print(f"\n{function_name} function:")
+        print(f"  - Invocations: {stats['invocations']}")
+        print(f"  - Cold starts: {stats['cold_starts']} ({percent(stats['cold_starts'], stats['invocations'])}%)")
+        print(f"  - Duration (ms): p50={stats['duration_p50_ms']:.1f} p95={stats['duration_p95_ms']:.1f}")
+        print(f"  - Billed duration total (ms): {stats['billed_duration_total_ms']:.0f}")
+        print(f"  - Max memory used (MB): {stats['max_memory_used_mb']}")
+        if stats["cold_starts"]:
+            print(
+                f"  - Init duration (ms): min={stats['init_duration_min_ms']:.1f} p50={stats['init_duration_p50_ms']:.1f} "
+                f"p95={stats['init_duration_p95_ms']:.1f} max={stats['init_duration_max_ms']:.1f}"
+            )
+
+
 def percent(numerator: int, denominator: int) -> str:
     if denominator == 0:
         return "0.0"
@@ -338,6 +1109,186 @@ def print_summary(summary: dict[str, Any], config: Config, start_iso: str, end_i
             print(f"  - {item['error_code']}: {item['count']}")
 
 
+def format_ms(value: float | None) -> str:
+    return "-" if value is None else f"{value:.0f}"
+
+
+def print_stage_latencies(stage_latencies: list[StageLatency], config: Config) -> None:
+    print()
+    print("==> k6 stage latency breakdown (mean ms)")
+    print(f"k6 results: {config.k6_results}")
+    print(f"API Gateway access log: {config.api_log_group_name or '(not available)'}")
+    if not config.api_log_group_name:
+        print("  * アクセスログが無いため api_gateway / authorizer は算出できません。lambda は handler_duration_ms を使用します。")
+    print()
+
+    header = f"{'method':<6} {'stage':>5} {'reqs':>6} {'429':>5} {'joined':>11} {'p50':>7} {'p95':>7}"
+    for name in LATENCY_COMPONENTS:
+        header += f" {name:>18}"
+    print(header)
+
+    for stage in stage_latencies:
+        joined = f"{stage.joined_by_request_id}/{stage.joined_by_time_window}"
+        row = (
+            f"{stage.method:<6} {stage.stage:>5} {len(stage.client_durations):>6} {stage.throttled_count:>5} "
+            f"{joined:>11} {percentile(stage.client_durations, 50):>7.0f} {percentile(stage.client_durations, 95):>7.0f}"
+        )
+        for name in LATENCY_COMPONENTS:
+            row += f" {format_ms(stage.component_mean(name)):>18}"
+        print(row)
+
+    print()
+    print("joined = request_id で突合した件数 / 時間帯で割り当てたサーバー側レコード数")
+    print("network_and_client は request_id で突合できたリクエストのみで算出します。")
+
+
+def follow_counters(record: dict[str, Any]) -> dict[str, float]:
+    record_type = record.get("record_type")
+    if record_type == "request_summary":
+        return {"requests": 1}
+
+    counters: dict[str, float] = {}
+    latency_ms = optional_float(record.get("handler_duration_ms"))
+    if latency_ms is not None:
+        counters["latency_sum_ms"] = latency_ms
+        counters["latency_count"] = 1
+
+    if record_type == "response_summary":
+        counters["success"] = 1
+        usage = record.get("usage") or {}
+        if isinstance(usage, dict):
+            counters["output_tokens"] = token_count(usage, "outputTokens")
+        if str(record.get("stop_reason", "")).lower().replace("_", "") in MAX_TOKEN_STOP_REASONS:
+            counters["max_tokens"] = 1
+    elif record_type == "error_summary":
+        counters["errors"] = 1
+        if int(record.get("status_code", 0)) == 429 or str(record.get("error_code", "")) in THROTTLING_ERROR_CODES:
+            counters["throttled"] = 1
+
+    return counters
+
+
+def poll_log_events(
+    config: Config,
+    start_ms: int,
+    records_queue: queue.Queue[Any],
+    stop_event: threading.Event,
+) -> None:
+    # eventId -> timestamp。取得範囲より前のイベントは二度と返らないため、そこで忘れる。
+    seen_event_ids: dict[str, int] = {}
+    cursor_ms = start_ms
+
+    while not stop_event.is_set():
+        now_ms = int(time.time() * 1000)
+        try:
+            events = fetch_log_events(config, cursor_ms, now_ms, filter_pattern=FOLLOW_FILTER_PATTERN)
+        except RuntimeError as exc:
+            records_queue.put(exc)
+            stop_event.wait(config.poll_interval)
+            continue
+
+        new_events = []
+        for event in events:
+            event_id = str(event.get("eventId", ""))
+            if event_id in seen_event_ids:
+                continue
+            seen_event_ids[event_id] = int(event.get("timestamp") or now_ms)
+            new_events.append(event)
+
+        cursor_ms = max(cursor_ms, now_ms - FOLLOW_OVERLAP_MS)
+        seen_event_ids = {
+            event_id: timestamp_ms for event_id, timestamp_ms in seen_event_ids.items() if timestamp_ms >= cursor_ms
+        }
+
+        records_queue.put(parse_records(new_events))
+        stop_event.wait(config.poll_interval)
+
+
+def render_dashboard(
+    config: Config,
+    windows: list[SlidingWindowCounter],
+    last_poll_at: datetime | None,
+    last_error: str,
+) -> None:
+    lines = [
+        "==> Lambda request log live view (Ctrl+C で終了)",
+        f"Log group: {config.log_group_name}  Region: {config.aws_region}  Method filter: {config.method}",
+        f"Now: {datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')}"
+        f"  Last poll: {last_poll_at.isoformat(timespec='seconds').replace('+00:00', 'Z') if last_poll_at else '-'}",
+        "",
+        f"{'window':<7} {'req/s':>7} {'requests':>9} {'success':>8} {'errors':>7} {'err%':>6} {'429':>6} {'429%':>6} {'max_tok':>8} {'out_tok/s':>10} {'avg_ms':>8}",
+    ]
+
+    for window in windows:
+        totals = {name: int(value) for name, value in window.totals.items()}
+        total_requests = totals["requests"]
+        latency_count = totals["latency_count"]
+        average_latency = "-" if latency_count == 0 else f"{window.totals['latency_sum_ms'] / latency_count:.0f}"
+        lines.append(
+            f"{str(window.window_seconds // 60) + 'm':<7} {total_requests / window.window_seconds:>7.2f} {total_requests:>9} "
+            f"{totals['success']:>8} {totals['errors']:>7} {percent(totals['errors'], total_requests):>6} "
+            f"{totals['throttled']:>6} {percent(totals['throttled'], total_requests):>6} {totals['max_tokens']:>8} "
+            f"{window.totals['output_tokens'] / window.window_seconds:>10.1f} {average_latency:>8}"
+        )
+
+    if last_error:
+        lines.extend(["", f"Last error: {last_error}"])
+
+    # 画面全体を消してから描画し直す (ANSI エスケープシーケンス)。
+    sys.stdout.write("\033[H\033[J" + "\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+
+def follow_logs(config: Config) -> int:
+    windows = [SlidingWindowCounter(window_seconds) for window_seconds in FOLLOW_WINDOWS_SECONDS]
+    records_queue: queue.Queue[Any] = queue.Queue()
+    stop_event = threading.Event()
+    start_ms = int(time.time() * 1000) - max(FOLLOW_WINDOWS_SECONDS) * 1000
+    poller = threading.Thread(
+        target=poll_log_events,
+        args=(config, start_ms, records_queue, stop_event),
+        daemon=True,
+    )
+    poller.start()
+
+    last_poll_at: datetime | None = None
+    last_error = ""
+    try:
+        while True:
+            now_second = int(time.time())
+            while True:
+                try:
+                    item = records_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                if isinstance(item, Exception):
+                    last_error = str(item)
+                    continue
+
+                last_poll_at = datetime.now(timezone.utc)
+                last_error = ""
+                for record in item:
+                    if config.method != "ALL" and str(record.get("method", "")).upper() != config.method:
+                        continue
+                    timestamp_ms = record.get("log_timestamp_ms")
+                    if not isinstance(timestamp_ms, int):
+                        continue
+                    counters = follow_counters(record)
+                    for window in windows:
+                        window.add(timestamp_ms // 1000, counters, now_second)
+
+            for window in windows:
+                window.expire(now_second)
+
+            render_dashboard(config, windows, last_poll_at, last_error)
+            time.sleep(FOLLOW_REDRAW_INTERVAL_SECONDS)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        stop_event.set()
+
+
 def main() -> int:
     script_dir = Path(__file__).resolve().parent
 
@@ -345,12 +1296,28 @@ def main() -> int:
 
     try:
         config = parse_args(script_dir)
-        start_ms, end_ms, start_iso, end_iso = resolve_time_range(
-            start_time=config.start_time,
-            end_time=config.end_time,
-            since=config.since,
+        if config.follow:
+            return follow_logs(config)
+        k6_points = load_k6_points(Path(config.k6_results), config.method) if config.k6_results else []
+        if k6_points and not config.start_time and not config.end_time:
+            start_ms, end_ms, start_iso, end_iso = k6_time_range(k6_points)
+        else:
+            start_ms, end_ms, start_iso, end_iso = resolve_time_range(
+                start_time=config.start_time,
+                end_time=config.end_time,
+                since=config.since,
+            )
+        api_log_group_name = config.api_log_group_name if k6_points or config.authorizer else ""
+        authorizer_log_group_name = config.authorizer_log_group_name if config.authorizer else ""
+        events_by_group = fetch_log_groups(
+            config,
+            start_ms,
+            end_ms,
+            [config.log_group_name, api_log_group_name, authorizer_log_group_name],
         )
-        records = parse_records(fetch_log_events(config, start_ms, end_ms))
+        handler_events = events_by_group[config.log_group_name]
+        records = parse_records(handler_events)
+        access_entries = parse_access_log_entries(events_by_group.get(api_log_group_name, [])) if api_log_group_name else {}
     except ValueError as exc:
         print(str(exc), file=sys.stderr)
         return 1
@@ -366,6 +1333,23 @@ def main() -> int:
 
     summary = summarize_records(records, config.method)
     print_summary(summary, config, start_iso, end_iso)
+    print_token_usage(summarize_token_usage(records, config), config)
+
+    if config.k6_results:
+        if not k6_points:
+            print(f"\nk6 の結果に {K6_LATENCY_METRIC} メトリクスが見つかりませんでした。k6_api_test.js の最新版で取得してください。")
+        else:
+            print_stage_latencies(build_stage_latencies(k6_points, records, access_entries), config)
+
+    if config.authorizer:
+        overhead = summarize_authorizer_overhead(
+            records,
+            config.method,
+            parse_report_lines(handler_events),
+            parse_report_lines(events_by_group.get(authorizer_log_group_name, [])),
+            access_entries,
+        )
+        print_authorizer_overhead(overhead, config)
     return 0
 
 
@@ -204,15 +204,23 @@ resource "aws_apigatewayv2_stage" "default" {
 
     # API Gateway アクセスログの JSON 形式。
     # Lambda ログとは別物で、「Gateway に何が来てどう返したか」を確認するのに使う。
+    # *Latency / integrationRequestId は analyze_request_logs.py の k6 突合モードで
+    # 「API Gateway / Authorizer / Lambda のどこで時間を使ったか」を分解するために出力している。
+    # integrationRequestId は Lambda 側の aws_request_id と一致する。
     format = jsonencode({
-      requestId      = "$context.requestId"
-      ip             = "$context.identity.sourceIp"
-      requestTime    = "$context.requestTime"
-      httpMethod     = "$context.httpMethod"
-      routeKey       = "$context.routeKey"
-      status         = "$context.status"
-      protocol       = "$context.protocol"
-      responseLength = "$context.responseLength"
+      requestId            = "$context.requestId"
+      ip                   = "$context.identity.sourceIp"
+      requestTime          = "$context.requestTime"
+      requestTimeEpoch     = "$context.requestTimeEpoch"
+      httpMethod           = "$context.httpMethod"
+      routeKey             = "$context.routeKey"
+      status               = "$context.status"
+      protocol             = "$context.protocol"
+      responseLength       = "$context.responseLength"
+      responseLatency      = "$context.responseLatency"
+      integrationLatency   = "$context.integrationLatency"
+      authorizerLatency    = "$context.authorizer.latency"
+      integrationRequestId = "$context.integration.requestId"
     })
   }
 
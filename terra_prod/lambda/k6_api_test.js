@@ -1,7 +1,7 @@
 import http from 'k6/http';
 import exec from 'k6/execution';
 import { check, sleep } from 'k6';
-import { Counter, Rate } from 'k6/metrics';
+import { Counter, Rate, Trend } from 'k6/metrics';
 
 // k6 実行時に `-e API_URL=...` のように渡す環境変数を読み込む。
 // API_URL は必須で、負荷試験対象の API Gateway / Lambda エンドポイントを指す。
@@ -27,6 +27,11 @@ const expectedResponseStatuses = http.expectedStatuses(200, 429);
 const throttledResponses = new Rate('http_req_throttled');
 const unexpectedResponses = new Rate('http_req_unexpected');
 const throttledResponseCount = new Counter('http_req_throttled_count');
+// analyze_request_logs.py の k6 突合モード (--k6-results) 用の応答時間メトリクス。
+// `stage` タグでどのステージのリクエストかを、metadata の `lambda_request_id` で
+// CloudWatch Logs 側の要約ログ (request_id) と 1:1 で突合できるようにする。
+// request_id はリクエストごとに異なるため、時系列を増やさない metadata として付与する。
+const apiRequestDuration = new Trend('api_request_duration', true);
 
 let throttledLogCount = 0;
 const MAX_THROTTLED_LOGS = 5;
@@ -99,6 +104,43 @@ function buildStages(prefix, defaultTargets) {
 const getStages = buildStages('GET', DEFAULT_GET_STAGE_TARGETS);
 const postStages = buildStages('POST', DEFAULT_POST_STAGE_TARGETS);
 
+// '1m30s' / '500ms' / '10s' のような k6 の duration 文字列をミリ秒に変換する。
+function parseDurationMillis(value) {
+  const unitMillis = { ms: 1, s: 1000, m: 60 * 1000, h: 60 * 60 * 1000 };
+  const pattern = /(\d+(?:\.\d+)?)(ms|s|m|h)/g;
+  let total = 0;
+  let matched = false;
+  let match = pattern.exec(String(value));
+
+  while (match !== null) {
+    matched = true;
+    total += Number(match[1]) * unitMillis[match[2]];
+    match = pattern.exec(String(value));
+  }
+
+  if (!matched) {
+    throw new Error(`Invalid stage duration: ${value}`);
+  }
+
+  return total;
+}
+
+// シナリオ開始からの経過時間を元に、現在のステージ番号 (1 始まり) を求める。
+// 最終ステージを過ぎた後 (gracefulStop 中) のリクエストは最終ステージとして扱う。
+function currentStageNumber(stages) {
+  const elapsedMillis = Date.now() - exec.scenario.startTime;
+  let stageEndMillis = 0;
+
+  for (let index = 0; index < stages.length; index += 1) {
+    stageEndMillis += parseDurationMillis(stages[index].duration);
+    if (elapsedMillis < stageEndMillis) {
+      return index + 1;
+    }
+  }
+
+  return stages.length;
+}
+
 // k6 の実行オプション。
 // scenarios で「どの関数を」「どんなペースで」実行するかを定義し、
 // thresholds で「どの程度の失敗率・応答時間まで許容するか」を宣言する。
@@ -191,6 +233,24 @@ function buildRequestParams(requestType) {
   };
 }
 
+function recordApiRequestDuration(res, expectedMethod, body) {
+  const stages = expectedMethod === 'GET' ? getStages : postStages;
+  const lambdaRequestId = body?.request_id;
+
+  if (lambdaRequestId) {
+    exec.vu.metrics.metadata.lambda_request_id = String(lambdaRequestId);
+  }
+
+  apiRequestDuration.add(res.timings.duration, {
+    method: expectedMethod,
+    scenario: exec.scenario.name,
+    status: String(res.status),
+    stage: String(currentStageNumber(stages)),
+  });
+
+  delete exec.vu.metrics.metadata.lambda_request_id;
+}
+
 // API 応答の基本妥当性を検証する。
 function validateResponse(res, expectedMethod) {
   const isThrottled = res.status === 429;
@@ -221,6 +281,8 @@ function validateResponse(res, expectedMethod) {
     body = null;
   }
 
+  recordApiRequestDuration(res, expectedMethod, body);
+
   return check(res, {
     [`${expectedMethod}: status is 200 or 429`]: (r) => r.status === 200 || r.status === 429,
     [`${expectedMethod}: body is JSON when 200`]: (r) => r.status === 429 || body !== null,
@@ -130,6 +130,16 @@ output "log_group_arn" {
   value       = aws_cloudwatch_log_group.lambda_log_group.arn
 }
 
+output "authorizer_log_group_name" {
+  description = "Authorizer Lambda の CloudWatch Logs グループ名"
+  value       = aws_cloudwatch_log_group.authorizer_log_group.name
+}
+
+output "api_gateway_log_group_name" {
+  description = "API Gateway アクセスログの CloudWatch Logs グループ名"
+  value       = aws_cloudwatch_log_group.api_gateway_log_group.name
+}
+
 output "log_retention_days" {
   description = "ログの保持期間（日数）"
   value       = aws_cloudwatch_log_group.lambda_log_group.retention_in_days
@@ -84,11 +84,15 @@ def _log_structured_event(record_type, **payload):
 
 
 def _build_log_context(context, request_meta, method):
+    # HTTP API の Lambda Authorizer (simple response) が返した context は requestContext.authorizer.lambda に入る。
+    # authorizerRequestId を残しておくと、Authorizer Lambda の REPORT 行と本体のリクエストを突合できる。
+    authorizer_context = ((request_meta.get("request_context") or {}).get("authorizer") or {}).get("lambda") or {}
     return {
         "request_id": context.aws_request_id,
         "method": method,
         "source": request_meta.get("source"),
         "raw_path": request_meta.get("raw_path"),
+        "authorizer_request_id": authorizer_context.get("authorizerRequestId"),
     }
 
 
@@ -113,6 +117,8 @@ def _log_response_summary(
     retry_count=0,
     usage=None,
     bedrock_request_id=None,
+    bedrock_latency_ms=None,
+    handler_duration_ms=None,
 ):
     output_summary = _summarize_text_for_log(output_text)
     _log_structured_event(
@@ -126,6 +132,8 @@ def _log_response_summary(
         usage=usage or {},
         bedrock_request_id=bedrock_request_id,
         retry_count=retry_count,
+        bedrock_latency_ms=bedrock_latency_ms,
+        handler_duration_ms=handler_duration_ms,
     )
 
 
@@ -141,6 +149,7 @@ def _log_error_summary(
     retryable=False,
     upstream_status_code=None,
     bedrock_request_id=None,
+    handler_duration_ms=None,
 ):
     error_summary = _summarize_text_for_log(error_message)
     _log_structured_event(
@@ -155,9 +164,14 @@ def _log_error_summary(
         retryable=retryable,
         upstream_status_code=upstream_status_code,
         bedrock_request_id=bedrock_request_id,
+        handler_duration_ms=handler_duration_ms,
     )
 
 
+def _elapsed_ms(started_at):
+    return round((time.perf_counter() - started_at) * 1000, 2)
+
+
 def _extract_request_payload(event):
     if not isinstance(event, dict):
         return {}, {}
@@ -278,10 +292,13 @@ def _has_retry_time_remaining(context):
     return remaining_millis >= ((BEDROCK_RETRY_WAIT_SECONDS + 1) * 1000)
 
 
+# bedrock_latency_ms は converse 呼び出しそのものに掛かった時間の合計で、リトライ待機の sleep は含めない。
 def _invoke_bedrock_with_retry(model_id, prompt, max_tokens, temperature, context):
     last_exception = None
+    bedrock_latency_ms = 0.0
 
     for attempt in range(BEDROCK_MAX_RETRIES + 1):
+        call_started_at = time.perf_counter()
         try:
             response = bedrock_runtime.converse(
                 modelId=model_id,
@@ -296,8 +313,10 @@ def _invoke_bedrock_with_retry(model_id, prompt, max_tokens, temperature, contex
                     "temperature": temperature,
                 },
             )
-            return response, attempt
+            bedrock_latency_ms += _elapsed_ms(call_started_at)
+            return response, attempt, round(bedrock_latency_ms, 2)
         except ClientError as exc:
+            bedrock_latency_ms += _elapsed_ms(call_started_at)
             last_exception = exc
             should_retry = attempt < BEDROCK_MAX_RETRIES and _is_retryable_client_error(exc) and _has_retry_time_remaining(context)
             if not should_retry:
@@ -312,6 +331,7 @@ def _invoke_bedrock_with_retry(model_id, prompt, max_tokens, temperature, contex
             )
             time.sleep(BEDROCK_RETRY_WAIT_SECONDS)
         except BotoCoreError as exc:
+            bedrock_latency_ms += _elapsed_ms(call_started_at)
             last_exception = exc
             should_retry = attempt < BEDROCK_MAX_RETRIES and _has_retry_time_remaining(context)
             if not should_retry:
@@ -330,6 +350,7 @@ def _invoke_bedrock_with_retry(model_id, prompt, max_tokens, temperature, contex
 
 
 def lambda_handler(event, context):
+    handler_started_at = time.perf_counter()
     environment = os.environ.get("ENVIRONMENT", "unknown")
     app_name = os.environ.get("APP_NAME", "lambda-function")
     model_id = os.environ.get("BEDROCK_MODEL_ID", "amazon.nova-lite-v1:0")
@@ -359,6 +380,7 @@ def lambda_handler(event, context):
             status_code=200,
             model_id=model_id,
             output_text="",
+            handler_duration_ms=_elapsed_ms(handler_started_at),
         )
         return _response(200, health_payload)
 
@@ -372,6 +394,7 @@ def lambda_handler(event, context):
             error_code="MissingPrompt",
             error_message="prompt is required",
             model_id=model_id,
+            handler_duration_ms=_elapsed_ms(handler_started_at),
         )
         return _response(
             400,
@@ -382,7 +405,7 @@ def lambda_handler(event, context):
         )
 
     try:
-        bedrock_response, retry_count = _invoke_bedrock_with_retry(
+        bedrock_response, retry_count, bedrock_latency_ms = _invoke_bedrock_with_retry(
             model_id=model_id,
             prompt=prompt,
             max_tokens=max_tokens,
@@ -404,6 +427,7 @@ def lambda_handler(event, context):
             retryable=error_details["retryable"],
             upstream_status_code=error_details["upstream_status_code"],
             bedrock_request_id=error_details["bedrock_request_id"],
+            handler_duration_ms=_elapsed_ms(handler_started_at),
         )
         return error_response
     except BotoCoreError as exc:
@@ -418,6 +442,7 @@ def lambda_handler(event, context):
             error_message=str(exc),
             model_id=model_id,
             retryable=True,
+            handler_duration_ms=_elapsed_ms(handler_started_at),
         )
         return _response(
             502,
@@ -458,6 +483,8 @@ def lambda_handler(event, context):
         retry_count=retry_count,
         usage=bedrock_response.get("usage", {}),
         bedrock_request_id=((bedrock_response.get("ResponseMetadata") or {}).get("RequestId")),
+        bedrock_latency_ms=bedrock_latency_ms,
+        handler_duration_ms=_elapsed_ms(handler_started_at),
     )
     logger.info("Bedrock response prepared successfully")
     return _response(200, response_data)
\ No newline at end of file